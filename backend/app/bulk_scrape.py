@@ -0,0 +1,276 @@
+# bulk_scrape.py
+# Fans scrapes for many zip codes out across a worker pool. Scrapes share one
+# requests-per-second budget, failed attempts are retried with exponential backoff, and
+# each zip code's listings are written as soon as it finishes rather than at the end.
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from app.database import SessionLocal
+from app.ingest import upsert_listings
+from app.scraper import scrape_realtor_dot_com
+from app.sync_state import advance_watermark, mark_synced, sync_window_days, utcnow
+
+BULK_SCRAPE_WORKERS = int(os.getenv("BULK_SCRAPE_WORKERS", "4"))
+# Scrape calls started per second across all workers
+BULK_SCRAPE_RPS = float(os.getenv("BULK_SCRAPE_RPS", "1"))
+# Extra attempts after the first failure, and the first backoff delay (doubles each retry)
+BULK_SCRAPE_RETRIES = int(os.getenv("BULK_SCRAPE_RETRIES", "2"))
+BULK_SCRAPE_BACKOFF_SECONDS = float(os.getenv("BULK_SCRAPE_BACKOFF_SECONDS", "2"))
+# Time allowed per zip code, retries included
+BULK_SCRAPE_TIMEOUT_SECONDS = float(os.getenv("BULK_SCRAPE_TIMEOUT_SECONDS", "120"))
+
+# Finished runs kept for GET /sync/batch/{batch_id}
+MAX_TRACKED_RUNS = 20
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by every worker; acquire() blocks until a call may start."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class ZipResult:
+    """Outcome of one zip code within a bulk run."""
+
+    def __init__(self, zipcode):
+        self.zipcode = zipcode
+        self.state = "pending"
+        self.attempts = 0
+        self.elapsed = None
+        self.counts = None
+        self.error = None
+        self.started = None
+        self.past_days = None
+
+    def to_dict(self):
+        return {
+            "zipcode": self.zipcode,
+            "state": self.state,
+            "past_days": self.past_days,
+            "attempts": self.attempts,
+            "elapsed": self.elapsed,
+            "counts": self.counts,
+            "error": self.error,
+        }
+
+
+class BulkRun:
+    """Progress of one bulk scrape, readable while it runs."""
+
+    def __init__(self, zipcodes, listing_type):
+        self.id = uuid.uuid4().hex
+        self.listing_type = listing_type
+        self.results = OrderedDict((zipcode, ZipResult(zipcode)) for zipcode in dict.fromkeys(zipcodes))
+        self.state = "queued"
+        self.started_at = None
+        self.elapsed = None
+
+    def to_dict(self):
+        results = [result.to_dict() for result in self.results.values()]
+        return {
+            "batch_id": self.id,
+            "listing_type": self.listing_type,
+            "state": self.state,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "elapsed": self.elapsed,
+            "succeeded": sum(result["state"] == "done" for result in results),
+            "failed": sum(result["state"] in ("failed", "timeout") for result in results),
+            "zipcodes": results,
+        }
+
+
+class BulkScraper:
+    """
+    Scrapes many zip codes concurrently. Workers only scrape; the calling thread owns the
+    database session and upserts each zip code's listings as its future completes.
+
+    A scrape that overruns its timeout is abandoned: its result is discarded, but the
+    worker thread stays busy until the underlying call returns.
+    """
+
+    def __init__(self, session_factory=SessionLocal, workers=BULK_SCRAPE_WORKERS, rps=BULK_SCRAPE_RPS,
+                 retries=BULK_SCRAPE_RETRIES, backoff=BULK_SCRAPE_BACKOFF_SECONDS,
+                 timeout=BULK_SCRAPE_TIMEOUT_SECONDS, past_days=None):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.limiter = RateLimiter(rps)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        # None scrapes each zip code's window since its last successful sync
+        self.past_days = past_days
+        # Run started by start(); one at a time, so runs can't multiply the workers
+        self.active = None
+        self._start_lock = threading.Lock()
+
+    def _scrape(self, result, listing_type):
+        result.started = time.monotonic()
+        result.state = "running"
+        deadline = result.started + self.timeout
+        while True:
+            self.limiter.acquire()
+            result.attempts += 1
+            try:
+                return scrape_realtor_dot_com(result.zipcode, listing_type, result.past_days, raise_errors=True)
+            except Exception as e:
+                delay = self.backoff * 2 ** (result.attempts - 1) * random.uniform(0.5, 1.5)
+                if result.attempts > self.retries or time.monotonic() + delay >= deadline:
+                    raise
+                logger.info("Retrying %s in %.1fs after attempt %d: %s", result.zipcode, delay, result.attempts, e)
+                time.sleep(delay)
+
+    def start(self, zipcodes, listing_type="sold"):
+        """
+        Runs in a background thread. Returns (bulk_run, started): the new run and True, or
+        the unfinished earlier run and False, since every run draws on the same workers
+        and rate limit.
+        """
+        with self._start_lock:
+            if self.active is not None and self.active.state in ("queued", "running"):
+                return self.active, False
+            bulk_run = self.active = BulkRun(zipcodes, listing_type)
+        threading.Thread(target=self._run_in_background, args=(bulk_run,),
+                         name=f"bulk-scrape-{bulk_run.id[:8]}", daemon=True).start()
+        return bulk_run, True
+
+    def _run_in_background(self, bulk_run):
+        try:
+            self.run(list(bulk_run.results), bulk_run.listing_type, bulk_run)
+        except Exception:
+            # Leaves a final state, so the next batch isn't refused forever
+            logger.exception("Bulk run %s failed", bulk_run.id)
+            bulk_run.state = "failed"
+
+    def run(self, zipcodes, listing_type="sold", bulk_run=None, on_result=None):
+        """
+        Scrapes and stores every zip code, returning the finished BulkRun. on_result is
+        called with each ZipResult as it completes.
+        """
+        bulk_run = bulk_run or BulkRun(zipcodes, listing_type)
+        bulk_run.state = "running"
+        bulk_run.started_at = utcnow()
+        started = time.perf_counter()
+
+        def finish(result, state, error=None):
+            result.state = state
+            result.error = error
+            result.elapsed = round(time.monotonic() - result.started, 3) if result.started else None
+            if on_result is not None:
+                on_result(result)
+
+        db = self.session_factory()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-scrape")
+        try:
+            for result in bulk_run.results.values():
+                result.past_days = self.past_days or sync_window_days(db, result.zipcode, listing_type,
+                                                                      bulk_run.started_at)
+            pending = {executor.submit(self._scrape, result, listing_type): result
+                       for result in bulk_run.results.values()}
+            while pending:
+                done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = pending.pop(future)
+                    try:
+                        listings = future.result()
+                    except Exception as e:
+                        logger.error("Bulk scrape failed for %s after %d attempts: %s", result.zipcode,
+                                     result.attempts, e)
+                        finish(result, "failed", str(e))
+                        continue
+                    try:
+                        result.counts = upsert_listings(db, listings)
+                        mark_synced(db, result.zipcode, listing_type)
+                        # Every scrape started after the run did, so its start is a safe watermark
+                        advance_watermark(db, result.zipcode, listing_type, bulk_run.started_at)
+                    except Exception as e:
+                        db.rollback()
+                        logger.error("Storing %s failed: %s", result.zipcode, e)
+                        finish(result, "failed", str(e))
+                        continue
+                    finish(result, "done")
+
+                now = time.monotonic()
+                for future, result in list(pending.items()):
+                    if result.started is not None and now - result.started > self.timeout:
+                        del pending[future]
+                        logger.error("Bulk scrape for %s timed out after %ss", result.zipcode, self.timeout)
+                        finish(result, "timeout", f"Timed out after {self.timeout}s")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            db.close()
+
+        bulk_run.elapsed = round(time.perf_counter() - started, 3)
+        bulk_run.state = "done"
+        return bulk_run
+
+
+class BulkRuns:
+    """Recent bulk runs by id, for the status endpoint."""
+
+    def __init__(self, limit=MAX_TRACKED_RUNS):
+        self.limit = limit
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, bulk_run):
+        with self._lock:
+            self._runs[bulk_run.id] = bulk_run
+            while len(self._runs) > self.limit:
+                self._runs.popitem(last=False)
+
+    def get(self, batch_id):
+        with self._lock:
+            return self._runs.get(batch_id)
+
+
+bulk_scraper = BulkScraper()
+bulk_runs = BulkRuns()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scrape and store listings for many zip codes")
+    parser.add_argument("zipcodes", nargs="+")
+    parser.add_argument("--listing-type", default="sold", choices=["for_sale", "sold", "pending", "for_rent"])
+    parser.add_argument("--workers", type=int, default=BULK_SCRAPE_WORKERS)
+    parser.add_argument("--rps", type=float, default=BULK_SCRAPE_RPS)
+    parser.add_argument("--retries", type=int, default=BULK_SCRAPE_RETRIES)
+    parser.add_argument("--timeout", type=float, default=BULK_SCRAPE_TIMEOUT_SECONDS)
+    parser.add_argument("--past-days", type=int, help="fixed window (default: since each zip code's last sync)")
+    args = parser.parse_args()
+
+    scraper = BulkScraper(workers=args.workers, rps=args.rps, retries=args.retries, timeout=args.timeout,
+                          past_days=args.past_days)
+    summary = scraper.run(
+        args.zipcodes, args.listing_type,
+        on_result=lambda result: print(f"{result.zipcode}: {result.state} in {result.elapsed}s "
+                                       f"({result.attempts} attempts) {result.counts or result.error}"),
+    ).to_dict()
+    print(f"{summary['succeeded']} succeeded, {summary['failed']} failed in {summary['elapsed']}s")
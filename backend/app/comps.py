@@ -0,0 +1,185 @@
+# comps.py
+import math
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import select
+from app.models import Property
+
+# Rebuild a cluster after this long even without a local sync, so writes from other workers show up
+COMPS_INDEX_TTL_SECONDS = int(os.getenv("COMPS_INDEX_TTL_SECONDS", "600"))
+
+FEATURES = ("sqft", "lot_size", "year_built", "beds", "baths", "x_km", "y_km")
+
+# Relative importance of each feature in the distance; x_km/y_km share the location weight
+DEFAULT_WEIGHTS = {
+    "sqft": 3.0,
+    "lot_size": 1.0,
+    "year_built": 1.5,
+    "beds": 1.0,
+    "baths": 1.0,
+    "location": 2.0,
+}
+
+KM_PER_DEGREE = 111.32
+
+# Rows scanned around the subject's square footage before widening the search
+SCAN_WINDOW = 2048
+
+
+class CompsCluster:
+    """Normalized feature matrix for the sold listings of one (zipcode, home_type)."""
+
+    def __init__(self, ids, features, origin):
+        self.origin = origin
+        self.built_at = time.monotonic()
+
+        features = np.asarray(features, dtype=np.float64)
+        scale = features.std(axis=0) if len(features) else np.ones(len(FEATURES))
+        self.scale = np.where(scale > 0, scale, 1.0)
+
+        # Rows are kept sorted by square footage so a query can start near its own size
+        order = np.argsort(features[:, 0], kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.matrix = np.ascontiguousarray((features[order] / self.scale).astype(np.float32))
+        self.sqft_keys = np.ascontiguousarray(self.matrix[:, 0])
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds a cluster from (id, sqft, lot_size, year_built, beds, baths, latitude, longitude) rows."""
+        if not rows:
+            return cls([], np.empty((0, len(FEATURES))), (0.0, 0.0))
+
+        data = np.array([row[1:] for row in rows], dtype=np.float64)
+        data = np.nan_to_num(data)
+        located = (data[:, 5] != 0) & (data[:, 6] != 0)
+        origin = (data[located, 5].mean(), data[located, 6].mean()) if located.any() else (0.0, 0.0)
+
+        x_km, y_km = to_km(data[:, 5], data[:, 6], origin)
+        features = np.column_stack([data[:, :5], x_km, y_km])
+        return cls([row[0] for row in rows], features, origin)
+
+    def nearest(self, subject, k=10, weights=None):
+        """
+        Top-k rows by weighted Euclidean distance over the scaled features.
+        Returns (ids, distances) sorted from most to least similar.
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        located = subject.get("latitude") and subject.get("longitude")
+        x_km, y_km = to_km(subject.get("latitude") or 0.0, subject.get("longitude") or 0.0, self.origin)
+        values = [subject["sqft"], subject["lot_size"], subject["year_built"], subject["beds"],
+                  subject["baths"], x_km, y_km]
+
+        feature_weights = np.array([
+            weights["sqft"], weights["lot_size"], weights["year_built"], weights["beds"], weights["baths"],
+            weights["location"] if located else 0.0, weights["location"] if located else 0.0,
+        ], dtype=np.float32)
+        query = (np.asarray(values, dtype=np.float64) / self.scale).astype(np.float32)
+
+        def distances(lo, hi):
+            diff = self.matrix[lo:hi] - query
+            return (diff * diff) @ feature_weights
+
+        def top_k(block):
+            found = min(k, len(block))
+            top = np.argpartition(block, found - 1)[:found] if found < len(block) else np.arange(len(block))
+            return top[np.argsort(block[top], kind="stable")]
+
+        count = len(self)
+        k = min(k, count)
+        lo, hi = 0, count
+        if feature_weights[0] > 0 and count > 2 * SCAN_WINDOW:
+            # The k-th best distance around the subject's sqft bounds how far away in sqft a
+            # better match can be, since the sqft term alone is part of every distance.
+            position = int(np.searchsorted(self.sqft_keys, query[0]))
+            lo, hi = max(0, position - SCAN_WINDOW), min(count, position + SCAN_WINDOW)
+            block = distances(lo, hi)
+            reach = np.sqrt(block[top_k(block)].max() / feature_weights[0])
+            lo = int(np.searchsorted(self.sqft_keys, query[0] - reach, side="left"))
+            hi = int(np.searchsorted(self.sqft_keys, query[0] + reach, side="right"))
+
+        block = distances(lo, hi)
+        top = top_k(block)
+        return self.ids[lo + top], np.sqrt(block[top].astype(np.float64))
+
+
+def to_km(latitude, longitude, origin):
+    """Equirectangular projection to kilometres around the cluster's origin."""
+    lat0, lon0 = origin
+    x_km = (np.asarray(longitude) - lon0) * KM_PER_DEGREE * math.cos(math.radians(lat0))
+    y_km = (np.asarray(latitude) - lat0) * KM_PER_DEGREE
+    return x_km, y_km
+
+
+def similarity(distance):
+    """Maps a distance to a 0-1 score, 1 being identical."""
+    return 1 / (1 + distance)
+
+
+class CompsIndex:
+    """
+    In-memory clusters of sold listings per (zipcode, home_type), built lazily from the
+    database and dropped whenever sync_listings writes to that zipcode.
+    """
+
+    def __init__(self, ttl=COMPS_INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self._clusters = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, zipcode=None):
+        with self._lock:
+            if zipcode is None:
+                self._clusters.clear()
+            else:
+                for key in [key for key in self._clusters if key[0] == zipcode]:
+                    del self._clusters[key]
+
+    def cluster(self, db, zipcode, home_type):
+        key = (zipcode, home_type)
+        with self._lock:
+            cluster = self._clusters.get(key)
+        if cluster is not None and time.monotonic() - cluster.built_at < self.ttl:
+            return cluster
+
+        rows = db.execute(
+            select(Property.id, Property.sqft, Property.lot_size, Property.year_built, Property.beds,
+                   Property.baths, Property.latitude, Property.longitude)
+            .where(Property.zipcode == zipcode, Property.home_type == home_type,
+                   Property.listing_terms == 'sold')
+        ).all()
+        cluster = CompsCluster.from_rows(rows)
+        with self._lock:
+            self._clusters[key] = cluster
+        return cluster
+
+    def nearest(self, db, zipcode, home_type, subject, k=10, weights=None, exclude_address=None):
+        """
+        Returns up to k (Property, distance) pairs, most similar first. The subject's own
+        listing is skipped when exclude_address is given.
+        """
+        cluster = self.cluster(db, zipcode, home_type)
+        ids, distances = cluster.nearest(subject, k + 1 if exclude_address else k, weights)
+        if not len(ids):
+            return []
+
+        properties = db.execute(select(Property).where(Property.id.in_(ids.tolist()))).scalars().all()
+        by_id = {prop.id: prop for prop in properties}
+
+        results = []
+        for prop_id, distance in zip(ids.tolist(), distances.tolist()):
+            prop = by_id.get(prop_id)
+            if prop is None or (exclude_address and prop.address == exclude_address):
+                continue
+            results.append((prop, distance))
+        return results[:k]
+
+
+comps_index = CompsIndex()
@@ -1,8 +1,13 @@
 # app/database.py
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 load_dotenv()
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -12,5 +17,74 @@ if ENVIRONMENT == "production":
 else:
     DATABASE_URL = os.getenv("DATABASE_URL_DEV")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+# Connection pool settings; SQLite only honours pre-ping
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds before a pooled connection is replaced (RDS and proxies drop idle ones)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Read endpoints use the async engine; false runs their queries on the sync engine in the threadpool
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB_ENABLED", "true").lower() == "true"
+
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def pool_options(url):
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"pool_pre_ping": DB_POOL_PRE_PING}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def async_url(url):
+    """Same database through its async driver, e.g. postgresql:// -> postgresql+asyncpg://."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    if "sslmode" in url.query and backend == "postgresql":
+        # asyncpg spells libpq's sslmode as ssl
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": url.query["sslmode"]})
+    return url
+
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@lru_cache(maxsize=None)
+def async_session_factory(url=None):
+    """AsyncSession factory, created on first use so the async driver is only needed when enabled."""
+    url = url or DATABASE_URL
+    async_engine = create_async_engine(async_url(url), **pool_options(url))
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def dialect_insert(db):
+    """Pick the INSERT construct that supports ON CONFLICT for the bound database."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Bulk upsert is not supported on {dialect}")
+
+
+class ThreadedSession:
+    """
+    AsyncSession-style execute() over a sync Session: each statement runs in the threadpool
+    and its rows are buffered there, so results can be read on the event loop.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, stmt):
+        frozen = await run_in_threadpool(lambda: self.session.execute(stmt).freeze())
+        return frozen()
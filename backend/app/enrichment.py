@@ -0,0 +1,172 @@
+# enrichment.py
+# Default-assumption investment metrics stored on every listing, so /properties can rank
+# and filter by them in SQL. Each row records the version of the assumptions it was
+# computed with; changing the assumptions for a zip code only recomputes that zip's rows.
+import hashlib
+import json
+import os
+import numpy as np
+from sqlalchemy import bindparam, or_, select
+from app.models import Property
+from app.routes.calculations import analyze_buy_rent_batch, deal_columns
+from app.sync_state import bump_data_versions
+
+# Bump when the formulas below change so every row is recomputed
+METRICS_FORMULA_VERSION = 1
+
+# Financing and operating assumptions for a typical 20%-down rental purchase
+DEFAULT_ASSUMPTIONS = {
+    "rent_per_sqft": 1.25,  # monthly rent per square foot
+    "rent_to_price": 0.7,  # monthly rent as % of price, when sqft is unknown
+    "down_payment": 20,
+    "interest_rate": 7.0,
+    "years_amortized": 30,
+    "closing_costs": 3,  # % of price
+    "tax_rate": 1.0,  # yearly % of price, when the listing has no annual_tax
+    "insurance_rate": 0.35,  # yearly % of price
+    "vacancy": 5,
+    "maintenance": 5,
+    "capex": 5,
+    "managment": 8,
+}
+
+# JSON overrides, e.g. '{"default": {"interest_rate": 6.5}, "97478": {"rent_per_sqft": 1.1}}'
+ENRICHMENT_ASSUMPTIONS = json.loads(os.getenv("ENRICHMENT_ASSUMPTIONS", "{}"))
+
+METRIC_COLUMNS = ("est_rent", "est_noi", "est_cap_rate", "est_monthly_cash_flow", "est_coc_return")
+
+# Rows recomputed per UPDATE batch by refresh_metrics
+REFRESH_BATCH_SIZE = 2000
+
+
+def assumptions_for(zipcode, overrides=None):
+    overrides = ENRICHMENT_ASSUMPTIONS if overrides is None else overrides
+    return {**DEFAULT_ASSUMPTIONS, **overrides.get("default", {}), **overrides.get(zipcode, {})}
+
+
+def metrics_version(assumptions):
+    """Short, stable hash of the assumptions and formula version."""
+    payload = json.dumps([METRICS_FORMULA_VERSION, assumptions], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def compute_metrics(prices, sqft, annual_tax, hoa_fee, assumptions):
+    """
+    Estimated rent, NOI, cap rate, monthly cash flow and CoC return for arrays of listings,
+    through the same formulas as /analyze-buy-rent-deal. Listings without a price get NaN.
+    """
+    prices = np.asarray(prices, dtype=float)
+    sqft = np.nan_to_num(np.asarray(sqft, dtype=float))
+    annual_tax = np.nan_to_num(np.asarray(annual_tax, dtype=float))
+    hoa_fee = np.nan_to_num(np.asarray(hoa_fee, dtype=float))
+    a = assumptions
+    zeros = np.zeros_like(prices)
+
+    rent = np.where(sqft > 0, sqft * a["rent_per_sqft"], prices * a["rent_to_price"] / 100)
+    columns = {
+        "purchase_price": prices,
+        "closing_costs": prices * a["closing_costs"] / 100,
+        "rehab": zeros,
+        "cash": zeros,
+        "down_payment": np.full_like(prices, a["down_payment"]),
+        "interest_rate": np.full_like(prices, a["interest_rate"]),
+        "lender_charges": zeros,
+        "loan_fees_wrapped": zeros,
+        "pmi": zeros,
+        "years_amortized": np.full_like(prices, a["years_amortized"]),
+        "monthly_rent": rent,
+        "yearly_taxes": np.where(annual_tax > 0, annual_tax, prices * a["tax_rate"] / 100),
+        "monthly_insurance": prices * a["insurance_rate"] / 100 / 12,
+        "hoa_fees": hoa_fee,
+        "gas": zeros, "electricity": zeros, "watersewer": zeros, "garbage": zeros, "other": zeros,
+        "vacancy": np.full_like(prices, a["vacancy"]),
+        "maintenance": np.full_like(prices, a["maintenance"]),
+        "capex": np.full_like(prices, a["capex"]),
+        "managment": np.full_like(prices, a["managment"]),
+    }
+    results = analyze_buy_rent_batch(deal_columns(columns))
+
+    priced = prices > 0
+    metrics = {
+        "est_rent": rent,
+        "est_noi": results["noi"],
+        "est_cap_rate": results["cap_rate"],
+        "est_monthly_cash_flow": results["monthly_cash_flow"],
+        "est_coc_return": results["coc_return"],
+    }
+    return {name: np.where(priced, np.round(values, 2), np.nan) for name, values in metrics.items()}
+
+
+def _metric_values(metrics, i):
+    return {name: None if np.isnan(values[i]) else float(values[i]) for name, values in metrics.items()}
+
+
+def enrich_rows(rows, overrides=None):
+    """Adds the metric columns and metrics_version to listing dicts in place, one pass per zip code."""
+    by_zip = {}
+    for row in rows:
+        by_zip.setdefault(row["zipcode"], []).append(row)
+
+    for zipcode, group in by_zip.items():
+        assumptions = assumptions_for(zipcode, overrides)
+        metrics = compute_metrics(
+            [row.get("listing_price") or 0 for row in group],
+            [row.get("sqft") or 0 for row in group],
+            [row.get("annual_tax") or 0 for row in group],
+            [row.get("hoa_fee") or 0 for row in group],
+            assumptions,
+        )
+        version = metrics_version(assumptions)
+        for i, row in enumerate(group):
+            row.update(_metric_values(metrics, i))
+            row["metrics_version"] = version
+    return rows
+
+
+def refresh_metrics(db, overrides=None, batch_size=REFRESH_BATCH_SIZE):
+    """
+    Recomputes rows whose metrics_version does not match the current assumptions for their
+    zip code, leaving up-to-date rows alone. Returns the number of rows updated.
+    """
+    overrides = ENRICHMENT_ASSUMPTIONS if overrides is None else overrides
+    table = Property.__table__
+    zip_overrides = [zipcode for zipcode in overrides if zipcode != "default"]
+
+    # Zip codes with their own assumptions, then everything else under the defaults
+    scopes = [(table.c.zipcode == zipcode, metrics_version(assumptions_for(zipcode, overrides)))
+              for zipcode in zip_overrides]
+    scopes.append((table.c.zipcode.notin_(zip_overrides), metrics_version(assumptions_for(None, overrides))))
+
+    updated = 0
+    for scope, version in scopes:
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(table.c.id, table.c.zipcode, table.c.listing_price, table.c.sqft, table.c.annual_tax,
+                       table.c.hoa_fee)
+                .where(scope, or_(table.c.metrics_version.is_(None), table.c.metrics_version != version))
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+
+            rows = enrich_rows([dict(row) for row in rows], overrides)
+            db.execute(
+                table.update().where(table.c.id == bindparam("row_id")),
+                [{"row_id": row["id"], "metrics_version": row["metrics_version"],
+                  **{name: row[name] for name in METRIC_COLUMNS}} for row in rows],
+            )
+            bump_data_versions(db, {row["zipcode"] for row in rows})
+            db.commit()
+            updated += len(rows)
+    return updated
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    with SessionLocal() as db:
+        print(f"Recomputed metrics for {refresh_metrics(db)} listings")
@@ -0,0 +1,114 @@
+# geo.py
+# Geohash cells precomputed at ingest let radius and bounding-box searches narrow candidates
+# with plain btree range scans (no PostGIS), before exact haversine distances are computed.
+import math
+import numpy as np
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+
+# Most geohash cells a single search may expand to
+MAX_SEARCH_CELLS = 32
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        target, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if target >= mid:
+            value |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def has_location(latitude, longitude):
+    """Scrapes fill missing coordinates with 0, which we treat as unknown."""
+    return latitude is not None and longitude is not None and not (latitude == 0 and longitude == 0)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision - lon_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, min_lon, max_lat, max_lon) enclosing a circle."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lon_delta = min(math.degrees(radius_km / EARTH_RADIUS_KM / cos_lat), 180.0)
+    return (max(latitude - lat_delta, -90.0), max(longitude - lon_delta, -180.0),
+            min(latitude + lat_delta, 90.0), min(longitude + lon_delta, 180.0))
+
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_SEARCH_CELLS):
+    """
+    Geohash prefixes whose cells together cover the box, at the finest precision that
+    needs no more than max_cells of them.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        columns = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+        if rows * columns <= max_cells or precision == 1:
+            break
+
+    cells = set()
+    first_row, first_column = math.floor(min_lat / height), math.floor(min_lon / width)
+    for row in range(rows):
+        for column in range(columns):
+            # Encode the centre of each grid cell
+            latitude = min((first_row + row + 0.5) * height, 90.0 - 1e-9)
+            longitude = min((first_column + column + 0.5) * width, 180.0 - 1e-9)
+            cells.add(encode_geohash(latitude, longitude, precision))
+    return sorted(cells)
+
+
+def next_prefix(cell):
+    """
+    Smallest geohash after every one starting with cell, or None past the last cell, so
+    `cell <= geohash < next_prefix(cell)` selects the cell under any collation (unlike a
+    punctuation sentinel, which ICU and glibc collations skip when comparing).
+    """
+    cell = cell.rstrip(GEOHASH_ALPHABET[-1])
+    if not cell:
+        return None
+    return cell[:-1] + GEOHASH_ALPHABET[GEOHASH_ALPHABET.index(cell[-1]) + 1]
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distance from one point to arrays of points."""
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(np.asarray(latitudes, dtype=float)), np.radians(np.asarray(longitudes, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def within_radius(items, latitude, longitude, radius_km):
+    """
+    Exact haversine cut of candidates that have .latitude/.longitude.
+    Returns (item, distance_km) pairs, nearest first.
+    """
+    if not items:
+        return []
+    distances = haversine_km(latitude, longitude,
+                             [item.latitude for item in items], [item.longitude for item in items])
+    order = np.argsort(distances, kind="stable")
+    return [(items[i], float(distances[i])) for i in order if distances[i] <= radius_km]
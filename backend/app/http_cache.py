@@ -0,0 +1,132 @@
+# http_cache.py
+# Conditional GETs for the listing endpoints. ETags come from the per-zip data versions
+# that every write bumps in its own transaction (see sync_state.bump_data_versions), so a
+# client's copy is validated with one primary-key lookup before any listing query runs.
+# Serialized bodies are also kept in a byte-bounded in-process LRU, keyed by path and
+# normalized query, and served again for as long as their ETag is current.
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+from fastapi import Response
+from app.metrics import HTTP_CACHE
+from app.sync_state import data_versions_query, ANY_ZIPCODE
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+# Seconds clients may reuse a response without asking; 0 sends no-cache (always revalidate,
+# which costs a 304 while nothing changed)
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+# Bytes of serialized bodies kept in process; 0 keeps none
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Bodies above this share of the cache are served but not kept, so one huge result
+# doesn't flush everything else
+RESPONSE_CACHE_MAX_ENTRY_SHARE = 0.25
+
+
+class ResponseCache:
+    """LRU of serialized bodies by key, each stored with the ETag it was built under."""
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, etag):
+        """(body, media_type) stored for key under etag, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, key, etag, body, media_type):
+        if len(body) > self.max_bytes * RESPONSE_CACHE_MAX_ENTRY_SHARE:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self._entries[key] = (etag, body, media_type)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+response_cache = ResponseCache()
+
+
+def cache_key(request):
+    """Path plus query parameters in a fixed order, without empty ones."""
+    params = sorted((key, value) for key, value in request.query_params.multi_items() if value != "")
+    return f"{request.url.path}?{urlencode(params)}"
+
+
+def cache_control():
+    if HTTP_CACHE_MAX_AGE <= 0:
+        return "no-cache"
+    return f"max-age={HTTP_CACHE_MAX_AGE}, must-revalidate"
+
+
+async def data_etag(db, zipcode=None):
+    """
+    Weak ETag for listings in zipcode, or in every zip code when None. A zip code that was
+    never versioned falls back to the version of all listings.
+    """
+    versions = dict((await db.execute(data_versions_query(zipcode))).all())
+    if zipcode is not None and zipcode in versions:
+        return f'W/"{zipcode}.{versions[zipcode]}"'
+    return f'W/"all.{versions.get(ANY_ZIPCODE, 0)}"'
+
+
+def etag_matches(request, etag):
+    """If-None-Match comparison; weak, as RFC 9110 prescribes for it."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+async def conditional_get(request, db, zipcode=None, headers=None):
+    """
+    Validates a GET over zipcode's listings (all listings when None) before the route
+    queries anything. Returns (headers, response): response is a 304 when the client's copy
+    is current, the stored body when one was kept under the same ETag, or None when the
+    route has to build it (and then hands it to remember()).
+    """
+    headers = dict(headers or {})
+    if not HTTP_CACHE_ENABLED:
+        return headers, None
+    etag = await data_etag(db, zipcode)
+    headers.update({"ETag": etag, "Cache-Control": cache_control()})
+
+    if etag_matches(request, etag):
+        HTTP_CACHE.inc(result="not_modified")
+        return headers, Response(status_code=304, headers=headers)
+    cached = response_cache.get(cache_key(request), etag)
+    if cached is not None:
+        HTTP_CACHE.inc(result="hit")
+        body, media_type = cached
+        return headers, Response(body, media_type=media_type, headers=headers)
+    HTTP_CACHE.inc(result="miss")
+    return headers, None
+
+
+def remember(request, response):
+    """Keeps a built body for the next request with the same query. Streamed bodies are not kept."""
+    etag = response.headers.get("etag")
+    if etag is not None and response_cache.max_bytes > 0 and hasattr(response, "body"):
+        response_cache.put(cache_key(request), etag, response.body, response.media_type)
+    return response
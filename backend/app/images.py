@@ -0,0 +1,235 @@
+# images.py
+# Resolves listing images through Microlink after ingest, off the scrape path. Lookups
+# share one pooled async HTTP client with bounded concurrency, and every answer (including
+# "no image" and failures) is cached per property_url so it is not asked again until it expires.
+import asyncio
+import logging
+import os
+import queue
+import threading
+from datetime import timedelta
+import httpx
+from sqlalchemy import bindparam, or_, select
+from app.database import SessionLocal
+from app.models import ImageCache, Property
+from app.sync_state import bump_data_versions, utcnow
+
+MICROLINK_URL = os.getenv("MICROLINK_URL", "https://api.microlink.io/")
+# Opt-in: when true, every ingest queues lookups against the external Microlink API (a
+# third-party service with its own quotas). Off, listings keep the image the scrape gave them
+# and `python -m app.images [zipcode]` can still be run by hand.
+IMAGE_RESOLVER_ENABLED = os.getenv("IMAGE_RESOLVER_ENABLED", "false").lower() == "true"
+# Lookups in flight at once, and per-request timeout
+IMAGE_CONCURRENCY = int(os.getenv("IMAGE_CONCURRENCY", "8"))
+IMAGE_TIMEOUT_SECONDS = float(os.getenv("IMAGE_TIMEOUT_SECONDS", "10"))
+# How long each kind of answer is trusted
+IMAGE_FOUND_TTL_SECONDS = int(os.getenv("IMAGE_FOUND_TTL_SECONDS", str(30 * 24 * 3600)))
+IMAGE_MISSING_TTL_SECONDS = int(os.getenv("IMAGE_MISSING_TTL_SECONDS", str(24 * 3600)))
+IMAGE_ERROR_TTL_SECONDS = int(os.getenv("IMAGE_ERROR_TTL_SECONDS", "600"))
+
+# Listings looked up per pass
+IMAGE_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+TTL_BY_STATUS = {
+    "found": IMAGE_FOUND_TTL_SECONDS,
+    "missing": IMAGE_MISSING_TTL_SECONDS,
+    "error": IMAGE_ERROR_TTL_SECONDS,
+}
+
+
+def parse_image(data):
+    """Image URL from a Microlink response body, or None."""
+    if not isinstance(data, dict) or not isinstance(data.get("data"), dict):
+        return None
+    image = data["data"].get("image")
+    if isinstance(image, dict) and image.get("url"):
+        return image["url"]
+    return None
+
+
+async def fetch_image(client, semaphore, property_url, microlink_url=MICROLINK_URL):
+    """Returns (image_url, status) for one listing page."""
+    async with semaphore:
+        try:
+            response = await client.get(microlink_url, params={"url": property_url})
+            response.raise_for_status()
+            image_url = parse_image(response.json())
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("Image lookup failed for %s: %s", property_url, e)
+            return None, "error"
+    return image_url, "found" if image_url else "missing"
+
+
+async def fetch_images(property_urls, microlink_url=MICROLINK_URL, concurrency=IMAGE_CONCURRENCY,
+                       timeout=IMAGE_TIMEOUT_SECONDS):
+    """Looks up many listing pages over one connection pool. Returns {property_url: (image_url, status)}."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        results = await asyncio.gather(*[
+            fetch_image(client, semaphore, url, microlink_url) for url in property_urls
+        ])
+    return dict(zip(property_urls, results))
+
+
+def _store(db, found, now):
+    """Writes lookups to the cache, replacing expired entries."""
+    urls = list(found)
+    existing = {
+        entry.property_url: entry
+        for entry in db.execute(select(ImageCache).where(ImageCache.property_url.in_(urls))).scalars()
+    }
+    for url, (image_url, status) in found.items():
+        entry = existing.get(url) or ImageCache(property_url=url)
+        entry.image_url = image_url
+        entry.status = status
+        entry.fetched_at = now
+        entry.expires_at = now + timedelta(seconds=TTL_BY_STATUS[status])
+        db.add(entry)
+
+
+def resolve_property_images(db, zipcode=None, batch_size=IMAGE_BATCH_SIZE, microlink_url=MICROLINK_URL,
+                            concurrency=IMAGE_CONCURRENCY):
+    """
+    Fills image_url on listings that have none, using cached lookups where they are still
+    fresh and fetching the rest. Listings whose lookup came back empty keep an empty
+    image_url (the frontend falls back) until their negative entry expires.
+    Returns counts of cache hits, fetches by outcome, and listings updated.
+    """
+    counts = {"candidates": 0, "cached": 0, "found": 0, "missing": 0, "error": 0, "updated": 0}
+    now = utcnow()
+
+    stmt = (
+        select(Property.property_url)
+        .where(or_(Property.image_url.is_(None), Property.image_url == ""))
+        .where(Property.property_url.isnot(None), Property.property_url != "")
+        .distinct()
+        .order_by(Property.property_url)
+    )
+    if zipcode is not None:
+        stmt = stmt.where(Property.zipcode == zipcode)
+
+    last = None
+    while True:
+        page = stmt if last is None else stmt.where(Property.property_url > last)
+        urls = db.execute(page.limit(batch_size)).scalars().all()
+        if not urls:
+            break
+        last = urls[-1]
+        counts["candidates"] += len(urls)
+
+        cached = {
+            entry.property_url: entry.image_url
+            for entry in db.execute(
+                select(ImageCache).where(ImageCache.property_url.in_(urls), ImageCache.expires_at > now)
+            ).scalars()
+        }
+        counts["cached"] += len(cached)
+        images = {url: image for url, image in cached.items() if image}
+
+        to_fetch = [url for url in urls if url not in cached]
+        if to_fetch:
+            found = asyncio.run(fetch_images(to_fetch, microlink_url, concurrency))
+            _store(db, found, now)
+            for url, (image_url, status) in found.items():
+                counts[status] += 1
+                if image_url:
+                    images[url] = image_url
+
+        if images:
+            result = db.execute(
+                Property.__table__.update()
+                .where(Property.property_url == bindparam("url"))
+                .where(or_(Property.image_url.is_(None), Property.image_url == "")),
+                [{"url": url, "image_url": image} for url, image in images.items()],
+            )
+            counts["updated"] += result.rowcount
+            if result.rowcount:
+                zipcodes = [zipcode] if zipcode is not None else db.execute(
+                    select(Property.zipcode).where(Property.property_url.in_(list(images))).distinct()
+                ).scalars().all()
+                bump_data_versions(db, zipcodes)
+        db.commit()
+
+    return counts
+
+
+class ImageResolver:
+    """
+    Background worker that resolves images for zip codes as ingest writes them. notify()
+    never blocks the writer; repeated notifications for a queued zip code collapse.
+    """
+
+    def __init__(self, session_factory=SessionLocal, microlink_url=MICROLINK_URL, concurrency=IMAGE_CONCURRENCY):
+        self.session_factory = session_factory
+        self.microlink_url = microlink_url
+        self.concurrency = concurrency
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._loop, name="image-resolver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def notify(self, zipcode):
+        """Queues a pass over the zip code. Returns False when not running or already queued."""
+        if not self.running:
+            return False
+        with self._lock:
+            if zipcode in self._queued:
+                return False
+            self._queued.add(zipcode)
+        self._queue.put(zipcode)
+        return True
+
+    def wait(self):
+        """Blocks until every queued zip code has been processed."""
+        self._queue.join()
+
+    def _loop(self):
+        while True:
+            zipcode = self._queue.get()
+            try:
+                if zipcode is None:
+                    return
+                with self._lock:
+                    self._queued.discard(zipcode)
+                db = self.session_factory()
+                try:
+                    counts = resolve_property_images(db, zipcode, microlink_url=self.microlink_url,
+                                                     concurrency=self.concurrency)
+                    logger.info("Resolved images for %s: %s", zipcode, counts)
+                except Exception as e:
+                    db.rollback()
+                    logger.error("Image resolution failed for %s: %s", zipcode, e)
+                finally:
+                    db.close()
+            finally:
+                self._queue.task_done()
+
+
+image_resolver = ImageResolver()
+
+
+if __name__ == "__main__":
+    import sys
+
+    with SessionLocal() as db:
+        print(resolve_property_images(db, *sys.argv[1:2]))
@@ -0,0 +1,236 @@
+# importer.py
+# Offline import of homeharvest exports: the CSVs test.py writes
+# (realator_<zip>_<listing type>_<timestamp>.csv) or Parquet files with the same columns.
+# Files are streamed in fixed-size chunks through the scraper's normalization and
+# written with Postgres COPY (staging table + one INSERT ... SELECT ... ON CONFLICT) or
+# batched upserts elsewhere. Progress is committed with every chunk, so an interrupted
+# import resumes where it stopped, and re-running a file only rewrites the same rows.
+import ast
+import csv
+import hashlib
+import io
+import logging
+import os
+import re
+import time
+import pandas as pd
+from sqlalchemy import column, select, table as sql_table, text
+from sqlalchemy.dialects import postgresql
+from app.comps import comps_index
+from app.images import image_resolver
+from app.ingest import (
+    diff_listings, empty_counts, listing_columns, merge_counts, prepare_listings, record_changes, upsert_listings,
+    PRESERVED_COLUMNS,
+)
+from app.models import ImportProgress, Property
+from app.scraper import NUMERIC_COLS, STRING_COLS, normalize_listings
+from app.sync_state import bump_data_versions, utcnow
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional; only needed for Parquet files
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Rows read, normalized and written per transaction
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+
+FILENAME_PATTERN = re.compile(r"realator_(?P<zipcode>\d{5})_(?P<listing_type>for_sale|sold|pending|for_rent)_")
+
+# Read as text so zip codes and MLS ids keep their leading zeros
+CSV_DTYPES = {name: str for name in STRING_COLS + ["zip_code"]}
+
+STAGING_TABLE = "import_staging"
+# Marks NULL in the COPY stream, so empty strings stay empty strings
+COPY_NULL = r"\N"
+
+
+def infer_source(path):
+    """(zipcode, listing_type) from an export's file name, or (None, None)."""
+    match = FILENAME_PATTERN.search(os.path.basename(path))
+    return (match["zipcode"], match["listing_type"]) if match else (None, None)
+
+
+def fingerprint(path, head_bytes=1 << 16):
+    """Identifies the file's contents without reading all of it: name, size and a hash of its head."""
+    digest = hashlib.sha1(f"{os.path.basename(path)}:{os.path.getsize(path)}".encode())
+    with open(path, "rb") as handle:
+        digest.update(handle.read(head_bytes))
+    return digest.hexdigest()
+
+
+def read_chunks(path, chunk_size=IMPORT_CHUNK_SIZE, skip_rows=0):
+    """DataFrames of up to chunk_size rows, starting after the first skip_rows data rows."""
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError("Importing Parquet files needs pyarrow")
+        seen = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            if seen + batch.num_rows <= skip_rows:
+                seen += batch.num_rows
+                continue
+            frame = batch.to_pandas()
+            yield frame.iloc[max(skip_rows - seen, 0):]
+            seen += batch.num_rows
+        return
+
+    # A callable skips rows as they stream past instead of materializing a skip list
+    yield from pd.read_csv(path, chunksize=chunk_size, dtype=CSV_DTYPES,
+                           skiprows=lambda i: 0 < i <= skip_rows)
+
+
+def _tax_history(value):
+    """CSV exports hold tax_history as the repr of a list of dicts."""
+    if isinstance(value, str):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return None
+    return value
+
+
+def normalize_chunk(frame, zipcode, listing_type):
+    """Runs an export chunk through the scraper's normalization; missing columns count as empty."""
+    frame = frame.copy()
+    for name in STRING_COLS + NUMERIC_COLS:
+        if name not in frame.columns:
+            frame[name] = None
+    if "tax_history" in frame.columns:
+        frame["tax_history"] = frame["tax_history"].map(_tax_history)
+    if "zip_code" in frame.columns:
+        frame["zip_code"] = frame["zip_code"].fillna(zipcode or "")
+    return normalize_listings(frame, zipcode, listing_type).to_dict("records")
+
+
+def can_copy(db):
+    """COPY needs Postgres through psycopg2."""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return hasattr(db.connection().connection.cursor(), "copy_expert")
+
+
+def copy_listings(db, listings):
+    """
+    Postgres bulk path for one chunk: COPY the new and changed rows into a temporary staging
+    table, then move them into properties with one INSERT ... SELECT ... ON CONFLICT, keyed
+    and preserving columns like upsert_listings. Does not commit. Returns the counts.
+    """
+    counts = empty_counts()
+    rows = prepare_listings(listings, counts)
+    if not rows:
+        return counts
+    rows, previous, history = diff_listings(db, rows, counts)
+    if not rows:
+        return counts
+    columns = listing_columns()
+    names = ", ".join(columns)
+
+    db.execute(text(f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} AS "
+                    f"SELECT {names} FROM {Property.__tablename__} WITH NO DATA"))
+    db.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([COPY_NULL if row[name] is None else row[name] for name in columns])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert(f"COPY {STAGING_TABLE} ({names}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer)
+
+    staging = sql_table(STAGING_TABLE, *[column(name) for name in columns])
+    stmt = postgresql.insert(Property.__table__).from_select(columns, select(*staging.c))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["address", "zipcode"],
+        set_={name: stmt.excluded[name] for name in columns if name not in PRESERVED_COLUMNS},
+    )
+    db.execute(stmt)
+    record_changes(db, previous, rows, history)
+    bump_data_versions(db, {row["zipcode"] for row in rows})
+    return counts
+
+
+def import_file(db, path, zipcode=None, listing_type=None, chunk_size=IMPORT_CHUNK_SIZE, method="auto",
+                force=False):
+    """
+    Imports one export file, resuming from its last committed chunk. method is "copy",
+    "insert" or "auto" (COPY on Postgres with psycopg2, batched upserts otherwise).
+    force re-imports a file that already finished. Returns a summary with rows per second.
+    """
+    inferred_zipcode, inferred_type = infer_source(path)
+    zipcode = zipcode or inferred_zipcode
+    listing_type = listing_type or inferred_type
+    if listing_type is None:
+        raise ValueError(f"Cannot tell the listing type of {path}; pass listing_type")
+    use_copy = can_copy(db) if method == "auto" else method == "copy"
+
+    source = fingerprint(path)
+    progress = db.execute(select(ImportProgress).where(ImportProgress.source == source)).scalars().first()
+    if progress is None:
+        progress = ImportProgress(source=source, path=path, rows_done=0, status="running", started_at=utcnow())
+        db.add(progress)
+    elif force:
+        progress.rows_done, progress.status, progress.started_at = 0, "running", utcnow()
+    summary = {"path": path, "listing_type": listing_type, "method": "copy" if use_copy else "insert",
+               "resumed_from": progress.rows_done, "rows": 0, **empty_counts()}
+    if progress.status == "done":
+        summary["status"] = "already imported"
+        return summary
+    db.commit()
+
+    started = time.perf_counter()
+    for frame in read_chunks(path, chunk_size, progress.rows_done):
+        listings = normalize_chunk(frame, zipcode, listing_type)
+        # The chunk's rows and the new position commit together, so a crash never skips
+        # or half-applies a chunk
+        progress.rows_done += len(frame)
+        progress.updated_at = utcnow()
+        if use_copy:
+            counts = copy_listings(db, listings)
+            db.commit()
+            for changed in {row["zipcode"] for row in listings if row.get("zipcode")}:
+                comps_index.invalidate(changed)
+                image_resolver.notify(changed)
+        else:
+            # upsert_listings commits the session, progress included
+            counts = upsert_listings(db, listings)
+
+        summary["rows"] += len(frame)
+        merge_counts(summary, counts)
+        elapsed = time.perf_counter() - started
+        logger.info("Imported %d rows of %s (%.0f rows/s)", progress.rows_done, os.path.basename(path),
+                    summary["rows"] / elapsed if elapsed else 0)
+
+    progress.status = "done"
+    progress.finished_at = progress.updated_at = utcnow()
+    db.commit()
+
+    elapsed = time.perf_counter() - started
+    summary.update(status="done", elapsed=round(elapsed, 3),
+                   rows_per_second=round(summary["rows"] / elapsed, 1) if elapsed else None)
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    from app.database import SessionLocal, engine
+    from app.migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Import homeharvest CSV or Parquet exports")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--zipcode", help="for files without a zip_code column or a realator_<zip>_ name")
+    parser.add_argument("--listing-type", choices=["for_sale", "sold", "pending", "for_rent"])
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--method", default="auto", choices=["auto", "copy", "insert"])
+    parser.add_argument("--force", action="store_true", help="re-import files that already finished")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    migrate(engine)
+    with SessionLocal() as db:
+        for path in args.paths:
+            summary = import_file(db, path, args.zipcode, args.listing_type, args.chunk_size, args.method, args.force)
+            print(f"{path}: {summary['status']}, {summary['rows']} rows ({summary['inserted']} inserted, "
+                  f"{summary['updated']} updated, {summary['unchanged']} unchanged, "
+                  f"{summary['skipped']} skipped), "
+                  f"{summary.get('rows_per_second') or 0:,.0f} rows/s via {summary['method']}")
@@ -0,0 +1,252 @@
+# ingest.py
+import hashlib
+import json
+import logging
+import math
+from sqlalchemy import bindparam, select, tuple_
+from app.comps import comps_index
+from app.database import dialect_insert
+from app.enrichment import METRIC_COLUMNS, enrich_rows
+from app.geo import encode_geohash, has_location
+from app.images import image_resolver
+from app.market_stats import STAT_COLUMNS, apply_changes
+from app.metrics import record_sync
+from app.models import Property, PropertyHistory
+from app.scraper import scrape_realtor_dot_com
+from app.sync_state import advance_watermark, bump_data_versions, sync_window_days, utcnow
+
+logger = logging.getLogger(__name__)
+
+# Rows written per INSERT ... ON CONFLICT execution
+UPSERT_CHUNK_SIZE = 500
+
+# Columns an upsert never overwrites on an existing listing
+PRESERVED_COLUMNS = {"id", "address", "zipcode", "image_url"}
+
+# Columns derived at ingest or filled later, which don't make a re-scraped listing "changed"
+DERIVED_COLUMNS = {"image_url", "geohash", "content_hash", "metrics_version", *METRIC_COLUMNS}
+
+# Changes to these are appended to property_history
+HISTORY_COLUMNS = ("listing_price", "sold_price", "status", "listing_terms", "last_sold_date")
+
+
+def empty_counts():
+    # changes: rows changed per field, among the updated listings
+    return {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "changes": {}}
+
+
+def merge_counts(total, counts):
+    for key, value in counts.items():
+        if key == "changes":
+            for field, changed in value.items():
+                total["changes"][field] = total["changes"].get(field, 0) + changed
+        else:
+            total[key] += value
+    return total
+
+
+def listing_columns():
+    return [c.name for c in Property.__table__.columns if c.name != "id"]
+
+
+def hashed_columns():
+    return [name for name in listing_columns() if name not in DERIVED_COLUMNS]
+
+
+def _canonical(value):
+    """Same value whether it was just scraped or read back (3.0 == 3, NaN == NULL)."""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if value.is_integer():
+            return int(value)
+    return value
+
+
+def content_hash(row, columns=None):
+    values = [_canonical(row.get(name)) for name in columns or hashed_columns()]
+    return hashlib.sha1(json.dumps(values, default=str).encode()).hexdigest()[:20]
+
+
+def prepare_listings(listings, counts):
+    """
+    Property rows for scraped listings: rows without a key are dropped and repeated keys
+    collapse to the last one (both counted as skipped), then content hashes, geohashes and
+    default-assumption metrics are filled in.
+    """
+    columns = listing_columns()
+    hashed = hashed_columns()
+    rows = {}
+    for home in listings:
+        if not home.get("address") or not home.get("zipcode"):
+            counts["skipped"] += 1
+            continue
+        key = (home["address"], home["zipcode"])
+        if key in rows:
+            counts["skipped"] += 1
+        rows[key] = {col: home.get(col) for col in columns}
+    rows = list(rows.values())
+
+    for row in rows:
+        row["content_hash"] = content_hash(row, hashed)
+        if has_location(row["latitude"], row["longitude"]):
+            row["geohash"] = encode_geohash(row["latitude"], row["longitude"])
+    return enrich_rows(rows)
+
+
+def diff_listings(db, rows, counts):
+    """
+    Compares a chunk's content hashes with the stored ones in one query. Unchanged listings
+    are counted and dropped; for changed ones the stored values are read back to count
+    changes per field and build property_history rows.
+    Returns (rows to write, previous values of the changed rows, history rows).
+    """
+    table = Property.__table__
+    keys = [(row["address"], row["zipcode"]) for row in rows]
+    stored = {
+        (found.address, found.zipcode): found
+        for found in db.execute(
+            select(table.c.id, table.c.address, table.c.zipcode, table.c.content_hash)
+            .where(tuple_(table.c.address, table.c.zipcode).in_(keys))
+        )
+    }
+
+    write, changed = [], {}
+    for row in rows:
+        found = stored.get((row["address"], row["zipcode"]))
+        if found is None:
+            counts["inserted"] += 1
+            write.append(row)
+        elif found.content_hash == row["content_hash"]:
+            counts["unchanged"] += 1
+        else:
+            counts["updated"] += 1
+            write.append(row)
+            changed[found.id] = row
+    if not changed:
+        return write, [], []
+
+    hashed = hashed_columns()
+    previous = db.execute(
+        select(table.c.id, *[table.c[name] for name in hashed]).where(table.c.id.in_(list(changed)))
+    ).mappings().all()
+    now = utcnow()
+    history = []
+    for old in previous:
+        new = changed[old["id"]]
+        for name in hashed:
+            before, after = _canonical(old[name]), _canonical(new.get(name))
+            if before == after:
+                continue
+            counts["changes"][name] = counts["changes"].get(name, 0) + 1
+            if name in HISTORY_COLUMNS:
+                history.append({"property_id": old["id"], "field": name, "changed_at": now,
+                                "old_value": None if before is None else str(before),
+                                "new_value": None if after is None else str(after)})
+    return write, previous, history
+
+
+def record_changes(db, previous, written, history):
+    """Market stats deltas and price/status history for a written chunk, in the same transaction."""
+    apply_changes(db, previous, written)
+    if history:
+        db.execute(PropertyHistory.__table__.insert(), history)
+
+
+def upsert_listings(db, listings, chunk_size=UPSERT_CHUNK_SIZE):
+    """
+    Writes scraped listings in chunks, one executemany of a single INSERT ... ON CONFLICT
+    statement per chunk, keyed on the (address, zipcode) unique constraint. Listings whose
+    content hash matches the stored row are not written at all; changed ones are updated in
+    place, with market stats and history following in the same transaction.
+    Returns counts of inserted, updated, unchanged and skipped rows, and per-field changes.
+    """
+    counts = empty_counts()
+    table = Property.__table__
+    columns = listing_columns()
+    rows = prepare_listings(listings, counts)
+
+    # One statement for every chunk: compiled once and cached, where an inline
+    # VALUES list was recompiled for each chunk
+    stmt = dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["address", "zipcode"],
+        set_={col: stmt.excluded[col] for col in columns if col not in PRESERVED_COLUMNS},
+    )
+
+    written = set()
+    for start in range(0, len(rows), chunk_size):
+        write, previous, history = diff_listings(db, rows[start:start + chunk_size], counts)
+        if write:
+            db.execute(stmt, write)
+            record_changes(db, previous, write, history)
+            written.update(row["zipcode"] for row in write)
+    # Cached responses for these zip codes go stale with this commit
+    if written:
+        bump_data_versions(db, written)
+
+    db.commit()
+
+    # Sold listings feed the comparables index; rebuild those zip codes on next use.
+    # New listings have no image yet; the resolver picks them up in the background.
+    for zipcode in {row["zipcode"] for row in rows}:
+        comps_index.invalidate(zipcode)
+        image_resolver.notify(zipcode)
+    return counts
+
+
+def sync_listings(zipcode, listingtype, db, raise_errors=False, past_days=None):
+    """
+    Scrapes the key's window since its last successful sync (see sync_window_days) and
+    stores it. Once the listings are written the watermark moves to when this scrape
+    started; a failed scrape leaves it alone, so the next sync covers the gap.
+    past_days overrides the window.
+    """
+    started_at = utcnow()
+    if past_days is None:
+        past_days = sync_window_days(db, zipcode, listingtype, started_at)
+    try:
+        try:
+            listings = scrape_realtor_dot_com(zipcode, listingtype, past_days, raise_errors=True)
+        except Exception:
+            if raise_errors:
+                raise
+            record_sync(listingtype, "error")
+            return empty_counts()
+        logger.debug("Scraper returned %d results for %s over %d days", len(listings), zipcode, past_days)
+
+        counts = upsert_listings(db, listings) if listings else empty_counts()
+        advance_watermark(db, zipcode, listingtype, started_at)
+    except Exception:
+        record_sync(listingtype, "error")
+        raise
+    record_sync(listingtype, "ok" if listings else "empty", counts)
+    logger.info("Synced %s (%s, %d days): %s", zipcode, listingtype, past_days, counts)
+    return counts
+
+
+def backfill_geohashes(db, batch_size=1000):
+    """
+    Fills geohash on rows written before the column existed, bumping their zip codes' data
+    versions (radius results change). Returns the number updated.
+    """
+    table = Property.__table__
+    updated = 0
+    while True:
+        rows = db.execute(
+            select(table.c.id, table.c.zipcode, table.c.latitude, table.c.longitude)
+            .where(table.c.geohash.is_(None), table.c.latitude.isnot(None), table.c.longitude.isnot(None))
+            .where(~((table.c.latitude == 0) & (table.c.longitude == 0)))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        db.execute(
+            table.update().where(table.c.id == bindparam("row_id")),
+            [{"row_id": row.id, "geohash": encode_geohash(row.latitude, row.longitude)} for row in rows],
+        )
+        bump_data_versions(db, {row.zipcode for row in rows})
+        db.commit()
+        updated += len(rows)
+    return updated
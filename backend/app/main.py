@@ -1,14 +1,39 @@
 # app/main.py
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.models import Base
-from app.database import engine
-from app.routes import properties
+from app.metrics import METRICS_ENABLED, install_sql_hooks, instrument_requests
+from app.routes import properties, sync, analysis, market, metrics
+from app.scheduler import scheduler, SYNC_SCHEDULER_ENABLED
+from app.images import image_resolver, IMAGE_RESOLVER_ENABLED
 
-app = FastAPI()
+# DEBUG adds per-request query details; below the configured level log calls cost one check
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
-# DB table creation
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app):
+    # Background refresh of tracked zip codes
+    if SYNC_SCHEDULER_ENABLED:
+        scheduler.start()
+    # Listing images are looked up after ingest, outside the scrape
+    if IMAGE_RESOLVER_ENABLED:
+        image_resolver.start()
+    yield
+    scheduler.stop()
+    image_resolver.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+# Route latency and per-request SQL timings, exported on /metrics
+if METRICS_ENABLED:
+    install_sql_hooks()
+    app.middleware("http")(instrument_requests)
+
+# Tables, indexes and backfills are a deploy step (python -m app.migrations), run once
+# before the workers start rather than by every worker importing this module
 
 # CORS
 app.add_middleware(
@@ -18,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "X-Cache-Age", "X-Next-Cursor", "Server-Timing", "ETag"],
 )
 
 # Health check
@@ -26,4 +52,9 @@ def root():
     return {"message": "API is live."}
 
 # Include route(s)
-app.include_router(properties.router)
\ No newline at end of file
+app.include_router(properties.router)
+app.include_router(sync.router)
+app.include_router(analysis.router)
+app.include_router(market.router)
+if METRICS_ENABLED:
+    app.include_router(metrics.router)
\ No newline at end of file
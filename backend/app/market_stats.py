@@ -0,0 +1,287 @@
+# market_stats.py
+# Per (zipcode, home_type, listing_terms) market aggregates kept in the market_stats table.
+# Ingest applies each inserted or changed listing as a delta (remove the old values, add the
+# new ones), so /market-stats reads a handful of rows instead of scanning properties.
+import json
+import math
+from datetime import date
+from sqlalchemy import select, tuple_
+from app.models import MarketStats, Property
+from app.sync_state import utcnow
+
+# Relative error of the price, price/sqft and sold-to-list quantiles
+SKETCH_RELATIVE_ACCURACY = 0.005
+
+# Listing columns the aggregates are built from
+STAT_COLUMNS = ("zipcode", "home_type", "listing_terms", "listing_price", "sold_price", "price_per_sqft",
+                "listing_date", "last_sold_date")
+
+
+class QuantileSketch:
+    """
+    DDSketch-style log-bucketed counts: any quantile is within relative_accuracy of the
+    true value, the sketch stays small however many values it sees, and values can be
+    removed as well as added, which is what lets an updated listing swap its old price out.
+    """
+
+    def __init__(self, buckets=None, zeros=0, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = dict(buckets or {})
+        self.zeros = zeros
+
+    @property
+    def count(self):
+        return self.zeros + sum(self.buckets.values())
+
+    def key(self, value):
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value, weight=1):
+        if value <= 0:
+            self.zeros += weight
+            return
+        key = self.key(value)
+        count = self.buckets.get(key, 0) + weight
+        if count:
+            self.buckets[key] = count
+        else:
+            self.buckets.pop(key, None)
+
+    def merge(self, other):
+        self.zeros += other.zeros
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def quantile(self, q):
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(max(self.buckets))
+
+    def to_json(self):
+        return {"buckets": {str(key): count for key, count in self.buckets.items()}, "zeros": self.zeros}
+
+    @classmethod
+    def from_json(cls, data):
+        data = data or {}
+        return cls({int(key): count for key, count in data.get("buckets", {}).items()}, data.get("zeros", 0))
+
+
+class CountHistogram(QuantileSketch):
+    """Exact counts for small integers (days), with the same add/remove/quantile interface."""
+
+    def key(self, value):
+        return int(value)
+
+    def value(self, key):
+        return float(key)
+
+    def add(self, value, weight=1):
+        key = self.key(value)
+        count = self.buckets.get(key, 0) + weight
+        if count:
+            self.buckets[key] = count
+        else:
+            self.buckets.pop(key, None)
+
+
+# Sketch type for each statistic
+SKETCHES = {
+    "price": QuantileSketch,
+    "price_per_sqft": QuantileSketch,
+    "sold_to_list": QuantileSketch,
+    # Day ordinals of list dates: days on market for active listings depends on today
+    "list_day": CountHistogram,
+    # Days from listing to sale, for sold listings
+    "days_to_sell": CountHistogram,
+}
+
+
+def _day(value):
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def _positive(value):
+    return value is not None and not (isinstance(value, float) and math.isnan(value)) and value > 0
+
+
+def group_key(row):
+    return (row["zipcode"], row.get("home_type") or "", row.get("listing_terms") or "")
+
+
+def contributions(row):
+    """Values a listing adds to its group's sketches."""
+    values = {}
+    sold = row.get("listing_terms") == "sold"
+    price = row.get("sold_price") if sold and _positive(row.get("sold_price")) else row.get("listing_price")
+    if _positive(price):
+        values["price"] = price
+    if _positive(row.get("price_per_sqft")):
+        values["price_per_sqft"] = row["price_per_sqft"]
+
+    list_day = _day(row.get("listing_date"))
+    if sold:
+        sold_day = _day(row.get("last_sold_date"))
+        if list_day is not None and sold_day is not None and sold_day >= list_day:
+            values["days_to_sell"] = sold_day - list_day
+        if _positive(row.get("sold_price")) and _positive(row.get("listing_price")):
+            values["sold_to_list"] = row["sold_price"] / row["listing_price"]
+    elif list_day is not None:
+        values["list_day"] = list_day
+    return values
+
+
+class GroupStats:
+    """Decoded market_stats row."""
+
+    def __init__(self, count=0, sketches=None):
+        self.count = count
+        self.sketches = {name: kind.from_json((sketches or {}).get(name)) for name, kind in SKETCHES.items()}
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.count, json.loads(row.sketches) if row.sketches else None)
+
+    def apply(self, row, weight):
+        self.count += weight
+        for name, value in contributions(row).items():
+            self.sketches[name].add(value, weight)
+
+    def merge(self, other):
+        self.count += other.count
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+
+    def sketches_json(self):
+        return json.dumps({name: sketch.to_json() for name, sketch in self.sketches.items()},
+                          separators=(",", ":"), sort_keys=True)
+
+    def summary(self, today=None):
+        today = (today or date.today()).toordinal()
+        price, ppsf = self.sketches["price"], self.sketches["price_per_sqft"]
+        list_day, days_to_sell = self.sketches["list_day"], self.sketches["days_to_sell"]
+        ratio = self.sketches["sold_to_list"]
+
+        def rounded(value, digits=2):
+            return None if value is None else round(value, digits)
+
+        # Days on market of active listings: today minus the list date, so its median is
+        # today minus the median list date
+        median_list_day = list_day.quantile(0.5)
+        if days_to_sell.count:
+            days_on_market = days_to_sell.quantile(0.5)
+        elif median_list_day is not None:
+            days_on_market = max(today - median_list_day, 0)
+        else:
+            days_on_market = None
+
+        return {
+            "count": self.count,
+            "median_price": rounded(price.quantile(0.5), 0),
+            "p25_price": rounded(price.quantile(0.25), 0),
+            "p75_price": rounded(price.quantile(0.75), 0),
+            "median_price_per_sqft": rounded(ppsf.quantile(0.5)),
+            "median_days_on_market": rounded(days_on_market, 0),
+            "median_sold_to_list_ratio": rounded(ratio.quantile(0.5), 4),
+        }
+
+
+def apply_changes(db, old_rows, new_rows):
+    """
+    Moves the given listings' contributions from their old values to their new ones in
+    market_stats. old_rows are the previous values of updated listings, new_rows what was
+    written. Runs in the caller's transaction and does not commit.
+    """
+    deltas = {}
+    for rows, weight in ((old_rows, -1), (new_rows, 1)):
+        for row in rows:
+            deltas.setdefault(group_key(row), []).append((row, weight))
+    if not deltas:
+        return
+
+    table = MarketStats
+    existing = {
+        (row.zipcode, row.home_type, row.listing_terms): row
+        for row in db.execute(
+            select(table)
+            .where(tuple_(table.zipcode, table.home_type, table.listing_terms).in_(list(deltas)))
+            .with_for_update()
+        ).scalars()
+    }
+
+    now = utcnow()
+    for key, changes in deltas.items():
+        row = existing.get(key)
+        stats = GroupStats.from_row(row) if row is not None else GroupStats()
+        for listing, weight in changes:
+            stats.apply(listing, weight)
+        if row is None:
+            row = MarketStats(zipcode=key[0], home_type=key[1], listing_terms=key[2])
+            db.add(row)
+        row.count = stats.count
+        row.sketches = stats.sketches_json()
+        row.updated_at = now
+    # New groups must be visible to the next chunk's lookup
+    db.flush()
+
+
+def rebuild_market_stats(db, zipcode=None, batch_size=5000):
+    """Recomputes the aggregates from properties (all zip codes, or one) and commits."""
+    delete = MarketStats.__table__.delete()
+    if zipcode is not None:
+        delete = delete.where(MarketStats.zipcode == zipcode)
+    db.execute(delete)
+
+    columns = [Property.__table__.c[name] for name in STAT_COLUMNS]
+    stmt = select(*columns).execution_options(yield_per=batch_size)
+    if zipcode is not None:
+        stmt = stmt.where(Property.zipcode == zipcode)
+
+    groups = {}
+    for row in db.execute(stmt).mappings():
+        groups.setdefault(group_key(row), GroupStats()).apply(row, 1)
+
+    now = utcnow()
+    db.add_all([
+        MarketStats(zipcode=key[0], home_type=key[1], listing_terms=key[2], count=stats.count,
+                    sketches=stats.sketches_json(), updated_at=now)
+        for key, stats in groups.items()
+    ])
+    db.commit()
+    return len(groups)
+
+
+def market_summary(rows, today=None):
+    """
+    Summaries for the market_stats rows of one zip code: one per (home_type, listing_terms),
+    plus home_type "all" per listing_terms from the merged sketches.
+    """
+    results = []
+    combined = {}
+    for row in rows:
+        stats = GroupStats.from_row(row)
+        combined.setdefault(row.listing_terms, GroupStats()).merge(stats)
+        results.append({"home_type": row.home_type or None, "listing_terms": row.listing_terms,
+                        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+                        **stats.summary(today)})
+    for listing_terms, stats in combined.items():
+        results.append({"home_type": "all", "listing_terms": listing_terms,
+                        "updated_at": max((r["updated_at"] or "") for r in results
+                                          if r["listing_terms"] == listing_terms) or None,
+                        **stats.summary(today)})
+    return results
@@ -0,0 +1,242 @@
+# metrics.py
+# In-process counters and histograms exported in the Prometheus text format on /metrics,
+# plus a per-request timing breakdown (route, SQL, scrape) kept in a context variable.
+# SQL statements are timed through SQLAlchemy engine events, so every sync and async
+# engine is covered without touching the queries.
+import contextvars
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Adds a Server-Timing header with the request's breakdown to every response
+TIMING_HEADER_ENABLED = os.getenv("TIMING_HEADER_ENABLED", "false").lower() == "true"
+
+# Histogram bucket upper bounds, in seconds (latency) or counts (queries per request)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SCRAPE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # key -> [per-bucket counts..., sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        series = self._values.get(tuple(str(labels[name]) for name in self.labelnames))
+        return series[-1] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} "
+                                 f"{cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(float(series[-2]))}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status")))
+REQUEST_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("route",), COUNT_BUCKETS))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency by route (- outside requests) and statement type",
+    ("route", "operation")))
+SCRAPE_DURATION = registry.register(Histogram(
+    "scrape_duration_seconds", "Listing scrape latency", ("zipcode", "listing_type"), SCRAPE_BUCKETS))
+SCRAPE_ROWS = registry.register(Counter(
+    "scrape_rows_total", "Listings returned by scrapes", ("zipcode", "listing_type")))
+SCRAPE_FAILURES = registry.register(Counter(
+    "scrape_failures_total", "Scrapes that raised", ("zipcode", "listing_type")))
+SYNC_OUTCOMES = registry.register(Counter(
+    "sync_outcomes_total", "Listing syncs by outcome (ok, empty, error)", ("listing_type", "outcome")))
+SYNC_ROWS = registry.register(Counter(
+    "sync_rows_total", "Listings seen by syncs (inserted, updated, unchanged, skipped)", ("listing_type", "result")))
+SYNC_FIELD_CHANGES = registry.register(Counter(
+    "sync_field_changes_total", "Re-scraped listings with a changed value, by field", ("listing_type", "field")))
+HTTP_CACHE = registry.register(Counter(
+    "http_cache_total", "Conditional GETs on listing endpoints (not_modified, hit, miss)", ("result",)))
+LISTING_CACHE = registry.register(Counter(
+    "listing_cache_total", "Freshness of listings served by /properties (HIT, STALE, MISS)", ("status",)))
+
+
+class RequestTimings:
+    """What one request spent its time on; mutated from the threadpool and the event loop alike."""
+
+    def __init__(self):
+        self.route = "-"
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.scrape_seconds = 0.0
+        # (operation, seconds) per statement, labelled with the route once it is known
+        self.queries = []
+
+    def add_query(self, operation, elapsed):
+        self.db_queries += 1
+        self.db_seconds += elapsed
+        self.queries.append((operation, elapsed))
+
+    def server_timing(self, total):
+        return (f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries", '
+                f"scrape;dur={self.scrape_seconds * 1000:.1f}, total;dur={total * 1000:.1f}")
+
+
+# Timings of the request being handled, or None outside a request (scheduler, CLI)
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip()[:6].upper()
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add_query(operation, elapsed)
+    else:
+        DB_QUERY_DURATION.observe(elapsed, route="-", operation=operation)
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def install_sql_hooks():
+    """Times every statement on every engine (sync, async and ones created later)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def record_scrape(zipcode, listing_type, elapsed, rows=None):
+    """A scrape took elapsed seconds and returned rows listings (None when it failed)."""
+    SCRAPE_DURATION.observe(elapsed, zipcode=zipcode, listing_type=listing_type)
+    if rows is None:
+        SCRAPE_FAILURES.inc(zipcode=zipcode, listing_type=listing_type)
+    else:
+        SCRAPE_ROWS.inc(rows, zipcode=zipcode, listing_type=listing_type)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.scrape_seconds += elapsed
+
+
+def record_sync(listing_type, outcome, counts=None):
+    SYNC_OUTCOMES.inc(listing_type=listing_type, outcome=outcome)
+    counts = dict(counts or {})
+    for field, rows in counts.pop("changes", {}).items():
+        SYNC_FIELD_CHANGES.inc(rows, listing_type=listing_type, field=field)
+    for result, rows in counts.items():
+        if rows:
+            SYNC_ROWS.inc(rows, listing_type=listing_type, result=result)
+
+
+async def instrument_requests(request, call_next):
+    """HTTP middleware: route latency, SQL statements per request, optional Server-Timing header."""
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        current_timings.reset(token)
+        # The route template (/property/{property_id}/{strategy}), so ids don't explode the labels
+        route = request.scope.get("route")
+        timings.route = getattr(route, "path", "unmatched")
+        elapsed = time.perf_counter() - timings.started
+        REQUEST_DURATION.observe(elapsed, method=request.method, route=timings.route, status=status)
+        REQUEST_QUERIES.observe(timings.db_queries, route=timings.route)
+        for operation, seconds in timings.queries:
+            DB_QUERY_DURATION.observe(seconds, route=timings.route, operation=operation)
+    if TIMING_HEADER_ENABLED:
+        response.headers["Server-Timing"] = timings.server_timing(elapsed)
+    return response
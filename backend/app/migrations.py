@@ -0,0 +1,129 @@
+# migrations.py
+# create_all() only creates missing tables. This brings existing tables up to date with
+# the models by adding missing columns and indexes, which is all the schema changes need,
+# then backfills data the new columns depend on. It is a deploy step, run once before the
+# API workers start, never at import:
+#   python -m app.migrations            schema and data backfills
+#   python -m app.migrations --schema   schema only
+import logging
+import re
+import sys
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from app.enrichment import refresh_metrics
+from app.ingest import backfill_geohashes
+from app.market_stats import rebuild_market_stats
+from app.models import Base, MarketStats, Property
+
+logger = logging.getLogger(__name__)
+
+# Indexes replaced by wider ones under a new name, dropped where they still exist
+RETIRED_INDEXES = {
+    "properties": ["ix_properties_zip_terms_price"],
+}
+
+# pg_advisory_lock key, so concurrent deploys (or a deploy racing a manual run) migrate one at a time
+MIGRATION_LOCK_KEY = 48151623
+
+
+def missing_columns(inspector, table):
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    return [column for column in table.columns if column.name not in existing]
+
+
+def missing_indexes(inspector, table):
+    existing = {index["name"] for index in inspector.get_indexes(table.name)}
+    return [index for index in table.indexes if index.name not in existing]
+
+
+def invalid_indexes(conn):
+    """Postgres indexes left INVALID by an interrupted CREATE INDEX CONCURRENTLY."""
+    rows = conn.execute(text("SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                             "WHERE NOT i.indisvalid"))
+    return {name for name, in rows}
+
+
+def create_index_sql(index, dialect, concurrently=False):
+    """CREATE INDEX IF NOT EXISTS for index; CONCURRENTLY builds it on Postgres without blocking writes."""
+    sql = str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+    if concurrently:
+        sql = re.sub(r"^CREATE (UNIQUE )?INDEX ", r"CREATE \1INDEX CONCURRENTLY ", sql)
+    return sql
+
+
+def apply_schema(conn, concurrently=False):
+    """Creates missing tables, columns and indexes and drops retired indexes; returns what changed."""
+    Base.metadata.create_all(bind=conn)
+    inspector = inspect(conn)
+    postgres = conn.dialect.name == "postgresql"
+    applied = []
+
+    managed = {index.name for table in Base.metadata.sorted_tables for index in table.indexes}
+    invalid = invalid_indexes(conn) & managed if postgres else set()
+    for name in invalid:
+        # IF NOT EXISTS would keep a half-built index forever; drop it and build it again
+        conn.execute(text(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name}"))
+        applied.append(f"drop invalid index {name}")
+
+    for table in Base.metadata.sorted_tables:
+        for column in missing_columns(inspector, table):
+            column_type = column.type.compile(dialect=conn.dialect)
+            if_not_exists = "IF NOT EXISTS " if postgres else ""
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {if_not_exists}{column.name} {column_type}"))
+            applied.append(f"add column {table.name}.{column.name}")
+
+        for index in missing_indexes(inspector, table) + [i for i in table.indexes if i.name in invalid]:
+            conn.execute(text(create_index_sql(index, conn.dialect, concurrently)))
+            applied.append(f"create index {index.name}")
+
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for name in RETIRED_INDEXES.get(table.name, []):
+            if name in existing:
+                conn.execute(text(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name}"))
+                applied.append(f"drop index {name}")
+    return applied
+
+
+def migrate(engine):
+    """
+    Brings the schema up to date with the models. On Postgres this runs under an advisory
+    lock, outside a transaction, so indexes on the populated table are built CONCURRENTLY
+    while the running API keeps writing; elsewhere it is one transaction.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            try:
+                applied = apply_schema(conn, concurrently=True)
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    else:
+        with engine.begin() as conn:
+            applied = apply_schema(conn)
+
+    for change in applied:
+        logger.info("Migrate: %s", change)
+    return applied
+
+
+def backfill(db):
+    """
+    Data steps that follow schema changes: geohashes for rows scraped before they were
+    precomputed, metrics computed under older assumptions, and market stats for listings
+    that predate the table (ingest maintains them from then on). Each scans the listings.
+    """
+    logger.info("Backfill: %s geohashes", backfill_geohashes(db))
+    logger.info("Backfill: %s listing metrics", refresh_metrics(db))
+    if db.query(MarketStats.id).first() is None and db.query(Property.id).first() is not None:
+        rebuild_market_stats(db)
+        logger.info("Backfill: market stats")
+
+
+if __name__ == "__main__":
+    from app.database import engine, SessionLocal
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    migrate(engine)
+    if "--schema" not in sys.argv[1:]:
+        with SessionLocal() as db:
+            backfill(db)
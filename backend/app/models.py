@@ -1,6 +1,6 @@
 # models.py
 import math
-from sqlalchemy import Column, Integer, String, Float, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Index, Text, UniqueConstraint, text
 from sqlalchemy.orm import declarative_base
 Base = declarative_base()
 
@@ -37,6 +37,7 @@ class Property(Base):
     price_per_sqft = Column(Float)
     latitude = Column(Float)
     longitude = Column(Float)
+    geohash = Column(String, index=True)  # precomputed at ingest for radius searches
     stories = Column(Integer)
 
     has_hoa = Column(Boolean)
@@ -47,8 +48,33 @@ class Property(Base):
     utilities = Column(String)
     annual_tax = Column(Float)
 
+    # Default-assumption investment metrics, filled by app/enrichment.py at ingest
+    est_rent = Column(Float)
+    est_noi = Column(Float)
+    est_cap_rate = Column(Float)
+    est_monthly_cash_flow = Column(Float)
+    est_coc_return = Column(Float)
+    metrics_version = Column(String)
+
+    # Hash of the scraped fields (app/ingest.py), so re-scraped listings are only rewritten when they changed
+    content_hash = Column(String)
+
     __table_args__ = (
         UniqueConstraint('address', 'zipcode', name='uix_address_zipcode'),
+        # /properties: equality on zipcode + listing_terms, then price range; id makes it
+        # serve the (listing_price, id) keyset order too
+        Index('ix_properties_zip_terms_price_id', 'zipcode', 'listing_terms', 'listing_price', 'id'),
+        # /comparables: sold listings only, equality on zipcode + home_type, then sqft range
+        Index('ix_properties_sold_comps', 'zipcode', 'home_type', 'sqft',
+              postgresql_where=text("listing_terms = 'sold'"),
+              sqlite_where=text("listing_terms = 'sold'")),
+        # Keyset pagination on /properties: equality prefix, then (sort key, id)
+        Index('ix_properties_zip_terms_ppsf', 'zipcode', 'listing_terms', 'price_per_sqft', 'id'),
+        Index('ix_properties_zip_terms_date', 'zipcode', 'listing_terms', 'listing_date', 'id'),
+        # Ranking listings by the precomputed metrics
+        Index('ix_properties_zip_terms_cash_flow', 'zipcode', 'listing_terms', 'est_monthly_cash_flow', 'id'),
+        Index('ix_properties_zip_terms_cap_rate', 'zipcode', 'listing_terms', 'est_cap_rate', 'id'),
+        Index('ix_properties_zip_terms_coc', 'zipcode', 'listing_terms', 'est_coc_return', 'id'),
     )
     
     
@@ -88,4 +114,117 @@ class Property(Base):
             "utilities": self.utilities,
             "annual_tax": self.annual_tax,
             "unit": self.unit,
-        }
\ No newline at end of file
+            "est_rent": self.est_rent,
+            "est_noi": self.est_noi,
+            "est_cap_rate": self.est_cap_rate,
+            "est_monthly_cash_flow": self.est_monthly_cash_flow,
+            "est_coc_return": self.est_coc_return,
+        }
+
+
+class PropertyHistory(Base):
+    """Append-only log of price and status changes seen when a listing is re-scraped."""
+    __tablename__ = "property_history"
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, nullable=False)
+    field = Column(String, nullable=False)
+    old_value = Column(String)
+    new_value = Column(String)
+    changed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_property_history_property', 'property_id', 'changed_at'),
+    )
+
+    def to_dict(self):
+        return {
+            "field": self.field,
+            "old_value": self.old_value,
+            "new_value": self.new_value,
+            "changed_at": self.changed_at.isoformat() if self.changed_at else None,
+        }
+
+
+class DataVersion(Base):
+    """
+    Counter per zip code, bumped in the same transaction as any write to its listings; the
+    "*" row moves with every write. HTTP ETags are built from it (see app/http_cache.py).
+    """
+    __tablename__ = "data_versions"
+
+    zipcode = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+
+class SyncState(Base):
+    """
+    Tracks when each (zipcode, listing_type) pair was last scraped. watermark is the start
+    of the last scrape that succeeded: listings up to it are stored, so the next sync only
+    asks for the window since then.
+    """
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    zipcode = Column(String, nullable=False)
+    listing_type = Column(String, nullable=False)
+    last_synced_at = Column(DateTime)
+    watermark = Column(DateTime)
+
+    __table_args__ = (
+        UniqueConstraint('zipcode', 'listing_type', name='uix_sync_zipcode_listing_type'),
+    )
+
+
+class ImageCache(Base):
+    """
+    Resolved listing image per property_url. A null image_url is a negative entry (no
+    image, or the lookup failed) that is retried once it expires.
+    """
+    __tablename__ = "image_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_url = Column(String, nullable=False, unique=True)
+    image_url = Column(String)
+    status = Column(String, nullable=False)  # found, missing or error
+    fetched_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
+
+
+class MarketStats(Base):
+    """
+    Running market aggregates per (zipcode, home_type, listing_terms), maintained by ingest.
+    sketches holds the JSON-encoded quantile sketches of app/market_stats.py.
+    """
+    __tablename__ = "market_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    zipcode = Column(String, nullable=False)
+    home_type = Column(String, nullable=False, default="")
+    listing_terms = Column(String, nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+    sketches = Column(Text)
+    updated_at = Column(DateTime)
+
+    __table_args__ = (
+        UniqueConstraint('zipcode', 'home_type', 'listing_terms', name='uix_market_stats_group'),
+    )
+
+
+class ImportProgress(Base):
+    """
+    How far app/importer.py got through an export file, committed with each chunk so an
+    interrupted import resumes after the last chunk written. source is a fingerprint of the
+    file (name, size and a hash of its head), so a changed file starts over.
+    """
+    __tablename__ = "import_progress"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, nullable=False, unique=True)
+    path = Column(String)
+    rows_done = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="running")  # running or done
+    started_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
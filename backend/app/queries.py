@@ -0,0 +1,165 @@
+# queries.py
+# Statement builders for the hot read paths, shared by the routes and the EXPLAIN harness
+import base64
+import json
+from sqlalchemy import and_, or_, select, tuple_
+from app.geo import covering_cells, next_prefix
+from app.models import Property
+
+# Comparable search ranges
+SQFT_VARIANCE = 0.1  # ±10%
+LOT_SIZE_VARIANCE = 0.2  # ±20%
+YEAR_BUILT_RANGE = 10  # ±10 years
+
+# Fields a property response can contain, in to_dict() order
+PROPERTY_FIELDS = list(Property().to_dict())
+
+# Stable sort keys for keyset pagination; id breaks ties
+SORT_COLUMNS = {
+    "price": Property.listing_price,
+    "price_per_sqft": Property.price_per_sqft,
+    "listing_date": Property.listing_date,
+    "id": Property.id,
+    "cash_flow": Property.est_monthly_cash_flow,
+    "cap_rate": Property.est_cap_rate,
+    "coc_return": Property.est_coc_return,
+}
+
+# Sorts on precomputed metrics leave out listings that have none (no price)
+METRIC_SORTS = {"cash_flow", "cap_rate", "coc_return"}
+
+
+def cell_range(cell):
+    """Half-open geohash range of a cell; no upper bound after the last cell."""
+    upper = next_prefix(cell)
+    if upper is None:
+        return Property.geohash >= cell
+    return and_(Property.geohash >= cell, Property.geohash < upper)
+
+
+def within_box(stmt, box):
+    """
+    Narrows a statement to a (min_lat, min_lon, max_lat, max_lon) box. The geohash cell
+    ranges let the index pick candidates; the lat/lon bounds trim the cell edges.
+    """
+    min_lat, min_lon, max_lat, max_lon = box
+    cells = covering_cells(min_lat, min_lon, max_lat, max_lon)
+    return stmt.where(
+        or_(*[cell_range(cell) for cell in cells]),
+        Property.latitude.between(min_lat, max_lat),
+        Property.longitude.between(min_lon, max_lon),
+    )
+
+
+def properties_query(zipcode=None, minPrice=None, maxPrice=None, minsqft=None, bedrooms=None, homeType=None,
+                     box=None, minCapRate=None, minCashFlow=None, minCocReturn=None):
+    # Build the base query
+    stmt = select(Property).where(Property.listing_terms == 'for_sale')
+    if zipcode is not None:
+        stmt = stmt.where(Property.zipcode == zipcode)
+    if box is not None:
+        stmt = within_box(stmt, box)
+
+    # Apply filters if provided
+    if minPrice is not None:
+        stmt = stmt.where(Property.listing_price >= minPrice)
+    if maxPrice is not None:
+        stmt = stmt.where(Property.listing_price <= maxPrice)
+    if minsqft is not None:
+        stmt = stmt.where(Property.sqft >= minsqft)
+    if bedrooms is not None:
+        stmt = stmt.where(Property.beds >= bedrooms)
+    if homeType is not None:
+        stmt = stmt.where(Property.home_type == homeType)
+    if minCapRate is not None:
+        stmt = stmt.where(Property.est_cap_rate >= minCapRate)
+    if minCashFlow is not None:
+        stmt = stmt.where(Property.est_monthly_cash_flow >= minCashFlow)
+    if minCocReturn is not None:
+        stmt = stmt.where(Property.est_coc_return >= minCocReturn)
+    return stmt
+
+
+def comparables_query(zipcode, sqft, lot_size, year_built, beds, baths, home_type, address, box=None):
+    # Build the base query with exact matches
+    stmt = select(Property).where(
+        Property.home_type == home_type,
+        Property.address != address,
+        Property.listing_terms == 'sold'
+    )
+    if zipcode is not None:
+        stmt = stmt.where(Property.zipcode == zipcode)
+    if box is not None:
+        stmt = within_box(stmt, box)
+
+    # Apply range-based filters
+    return stmt.where(
+        Property.sqft >= sqft * (1 - SQFT_VARIANCE),
+        Property.sqft <= sqft * (1 + SQFT_VARIANCE),
+        Property.lot_size >= lot_size * (1 - LOT_SIZE_VARIANCE),
+        Property.lot_size <= lot_size * (1 + LOT_SIZE_VARIANCE),
+        Property.year_built >= year_built - YEAR_BUILT_RANGE,
+        Property.year_built <= year_built + YEAR_BUILT_RANGE,
+        Property.beds >= beds - 1,
+        Property.beds <= beds + 1,
+        Property.baths >= baths - 1,
+        Property.baths <= baths + 1,
+    )
+
+
+def project(stmt, fields):
+    """Selects only the given columns, so rows come back as plain tuples instead of ORM objects."""
+    columns = Property.__table__.c
+    return stmt.with_only_columns(*[columns[field] for field in fields])
+
+
+def encode_cursor(sort, descending, value, row_id):
+    payload = json.dumps([sort, descending, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns (sort, descending, value, id); raises ValueError for a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort, descending, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if sort not in SORT_COLUMNS or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return sort, bool(descending), value, row_id
+
+
+def keeps_nulls(sort):
+    """True for sorts on a nullable column that keep listings without a value, last in either order."""
+    return sort not in METRIC_SORTS and Property.__table__.c[SORT_COLUMNS[sort].key].nullable
+
+
+def order_by_key(stmt, sort, descending=False):
+    column = SORT_COLUMNS[sort]
+    if sort in METRIC_SORTS:
+        stmt = stmt.where(column.isnot(None))
+    order = column.desc() if descending else column.asc()
+    if keeps_nulls(sort):
+        order = order.nulls_last()
+    return stmt.order_by(order, Property.id.desc() if descending else Property.id.asc())
+
+
+def paginate(stmt, sort, descending, limit, after=None):
+    """
+    Keyset pagination: orders by (sort key, id) and resumes strictly after the
+    (value, id) of the previous page's last row, so every page costs the same.
+    Listings without a value come after all the others, ordered by id; a NULL
+    never compares greater or less, so they are matched separately.
+    Fetches one extra row to tell whether another page exists.
+    """
+    column = SORT_COLUMNS[sort]
+    if after is not None:
+        value, row_id = after
+        if value is None:
+            stmt = stmt.where(column.is_(None), Property.id < row_id if descending else Property.id > row_id)
+        else:
+            key = tuple_(column, Property.id)
+            beyond = key < tuple_(*after) if descending else key > tuple_(*after)
+            stmt = stmt.where(or_(beyond, column.is_(None)) if keeps_nulls(sort) else beyond)
+    return order_by_key(stmt, sort, descending).limit(limit + 1)
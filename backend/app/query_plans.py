@@ -0,0 +1,58 @@
+# query_plans.py
+# EXPLAIN harness for the hot queries. Run against a populated database to check that
+# they still use an index: python -m app.query_plans 97404
+import sys
+from sqlalchemy import text
+from app.queries import properties_query, comparables_query, paginate
+
+
+def hot_queries(zipcode="97404"):
+    """Representative statements for /properties and /comparables."""
+    return {
+        "properties": properties_query(zipcode),
+        "properties_filtered": properties_query(zipcode, minPrice=200000, maxPrice=600000,
+                                                minsqft=1200, bedrooms=3, homeType="Single Family"),
+        "comparables": comparables_query(zipcode, sqft=1500, lot_size=0.2, year_built=1990, beds=3,
+                                         baths=2, home_type="Single Family", address="1 Main St"),
+        "properties_top_cash_flow": paginate(properties_query(zipcode), "cash_flow", True, 50),
+        "properties_by_price": paginate(properties_query(zipcode), "price", False, 50, after=(300000, 10)),
+    }
+
+
+def explain(db, stmt):
+    """Returns the database's query plan for a statement as a list of lines."""
+    dialect = db.get_bind().dialect
+    sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+    if dialect.name == "sqlite":
+        rows = db.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        return [row[-1] for row in rows]
+    if dialect.name == "postgresql":
+        rows = db.execute(text(f"EXPLAIN {sql}")).all()
+        return [row[0] for row in rows]
+    raise NotImplementedError(f"EXPLAIN is not supported on {dialect.name}")
+
+
+def is_sequential_scan(plan, table="properties"):
+    """True if the plan reads the whole table instead of going through an index."""
+    for line in plan:
+        if line.startswith(f"SCAN {table}") and "INDEX" not in line:
+            return True
+        if f"Seq Scan on {table}" in line:
+            return True
+    return False
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        for name, stmt in hot_queries(*sys.argv[1:2]).items():
+            plan = explain(db, stmt)
+            flag = "SEQ SCAN" if is_sequential_scan(plan) else "ok"
+            print(f"--- {name} [{flag}]")
+            for line in plan:
+                print(f"    {line}")
+    finally:
+        db.close()
@@ -0,0 +1,208 @@
+# result_cache.py
+# Results of the deal analysis endpoints, keyed on a canonical hash of the validated
+# inputs and the strategy. The frontend re-posts the same DealInputs as users edit the
+# form, and the analyses are pure functions of them, so repeats are answered from a
+# byte-bounded in-process LRU and, when ANALYSIS_CACHE_REDIS_URL is set, from Redis
+# shared by every worker. Also provides memoize() for the pure scalar helpers.
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from app.metrics import registry, Counter
+
+try:
+    import redis
+except ImportError:  # optional; only needed for the shared backend
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+# Bytes of encoded results kept per process
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+# Shared cache across uvicorn workers, e.g. redis://localhost:6379/0; unset keeps it per process
+ANALYSIS_CACHE_REDIS_URL = os.getenv("ANALYSIS_CACHE_REDIS_URL")
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(24 * 3600)))
+# Part of every key; bump when a formula changes so shared entries from older code are ignored
+ANALYSIS_CACHE_VERSION = "1"
+
+# Entries per memoized helper
+MEMOIZE_MAXSIZE = int(os.getenv("MEMOIZE_MAXSIZE", "4096"))
+
+ANALYSIS_CACHE = registry.register(Counter(
+    "analysis_cache_total", "Deal analysis lookups by strategy and outcome (hit, shared_hit, miss)",
+    ("strategy", "result")))
+
+
+def _canonical(value):
+    if isinstance(value, float):
+        return value + 0.0  # -0.0 and 0.0 are the same input
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def canonical_key(strategy, inputs):
+    """
+    Key for a validated pydantic model: after validation 5, "5" and 5.0 are all 5.0, so
+    equal inputs hash equally whatever the client sent.
+    """
+    payload = json.dumps(_canonical(inputs.model_dump()), sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    return f"analysis:{ANALYSIS_CACHE_VERSION}:{strategy}:{digest}"
+
+
+class LocalResults:
+    """LRU of results by key, bounded by the size of their JSON encoding."""
+
+    def __init__(self, max_bytes=ANALYSIS_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, result, size):
+        size += len(key)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (result, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class RedisResults:
+    """Results shared across workers. Errors count as misses, so Redis going away only costs speed."""
+
+    def __init__(self, client, ttl=ANALYSIS_CACHE_TTL_SECONDS):
+        self.client = client
+        self.ttl = ttl
+
+    @classmethod
+    def from_url(cls, url, ttl=ANALYSIS_CACHE_TTL_SECONDS):
+        if redis is None:
+            raise RuntimeError("ANALYSIS_CACHE_REDIS_URL needs the redis package")
+        # A slow cache must not be slower than recomputing
+        return cls(redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05), ttl)
+
+    def get(self, key):
+        try:
+            body = self.client.get(key)
+        except Exception as e:
+            logger.debug("Shared analysis cache read failed: %s", e)
+            return None
+        return json.loads(body) if body is not None else None
+
+    def put(self, key, body):
+        try:
+            self.client.set(key, body, ex=self.ttl)
+        except Exception as e:
+            logger.debug("Shared analysis cache write failed: %s", e)
+
+
+class AnalysisCache:
+    """The local LRU in front of the optional shared backend."""
+
+    def __init__(self, local=None, shared=None, enabled=ANALYSIS_CACHE_ENABLED):
+        self.local = local if local is not None else LocalResults()
+        self.shared = shared
+        self.enabled = enabled
+
+    def get_or_compute(self, strategy, inputs, compute):
+        """compute()'s result for these inputs, computed at most once per process (or cluster)."""
+        if not self.enabled:
+            return compute()
+        key = canonical_key(strategy, inputs)
+        result = self.local.get(key)
+        if result is not None:
+            ANALYSIS_CACHE.inc(strategy=strategy, result="hit")
+            return dict(result)
+
+        if self.shared is not None:
+            result = self.shared.get(key)
+            if result is not None:
+                ANALYSIS_CACHE.inc(strategy=strategy, result="shared_hit")
+                self.local.put(key, result, len(json.dumps(result)))
+                return dict(result)
+
+        ANALYSIS_CACHE.inc(strategy=strategy, result="miss")
+        result = compute()
+        body = json.dumps(result)
+        self.local.put(key, result, len(body))
+        if self.shared is not None:
+            self.shared.put(key, body)
+        # Callers get their own copy; the cached one must not change under other requests
+        return dict(result)
+
+
+analysis_cache = AnalysisCache(
+    shared=RedisResults.from_url(ANALYSIS_CACHE_REDIS_URL) if ANALYSIS_CACHE_REDIS_URL else None,
+)
+
+
+def cached_analysis(strategy, cache=None):
+    """
+    Decorates an analysis endpoint taking `inputs`, so repeated inputs skip the computation.
+    The wrapper keeps the signature, so FastAPI still validates the body.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(inputs):
+            return (cache or analysis_cache).get_or_compute(strategy, inputs, lambda: func(inputs))
+        return wrapper
+    return decorate
+
+
+class MemoizedCalls:
+    """Exports the functools cache counters of memoize()d helpers on /metrics."""
+    name = "memoized_calls_total"
+
+    def __init__(self):
+        self.functions = []
+
+    def render(self):
+        lines = [f"# HELP {self.name} Calls of memoized helpers by outcome (hit, miss)",
+                 f"# TYPE {self.name} counter"]
+        for func in self.functions:
+            info = func.cache_info()
+            for result, count in (("hit", info.hits), ("miss", info.misses)):
+                lines.append(f'{self.name}{{function="{func.__name__}",result="{result}"}} {count}')
+        return lines
+
+
+memoized_calls = registry.register(MemoizedCalls())
+
+
+def memoize(maxsize=MEMOIZE_MAXSIZE):
+    """functools.lru_cache for pure helpers of hashable (scalar) arguments, counted on /metrics."""
+    def decorate(func):
+        cached = functools.lru_cache(maxsize=maxsize)(func)
+        memoized_calls.functions.append(cached)
+        return cached
+    return decorate
@@ -0,0 +1,150 @@
+# amortization.py
+import numpy as np
+from functools import lru_cache
+from .simulation import loan_terms
+
+# Schedules kept by the (principal, rate, term, ...) memo
+AMORTIZATION_CACHE_SIZE = 1024
+
+# PMI is cancelled once the balance reaches this share of the original value
+PMI_LTV_CUTOFF = 0.78
+
+SCHEDULE_COLUMNS = ("payment", "principal", "interest", "pmi", "balance")
+
+
+def amortize(principal, annual_rate, months, interest_only_months=0, pmi=0.0, home_value=0.0,
+             pmi_ltv_cutoff=PMI_LTV_CUTOFF):
+    """
+    Month-by-month schedules for many loans at once. Every argument is a scalar or a
+    (loans,) array. Returns {column: (loans, max(months)) array}; months past a loan's
+    term are zero.
+
+    The first interest_only_months pay interest only, then the loan amortizes with a level
+    payment over the rest of its term. Balances come from the closed form
+    B_k = P * ((1+r)^n - (1+r)^k) / ((1+r)^n - 1), so no month depends on a Python loop.
+    PMI is charged while the balance at the start of a month is above
+    pmi_ltv_cutoff * home_value.
+    """
+    principal, annual_rate, months, interest_only_months, pmi, home_value = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(value, dtype=float))
+          for value in (principal, annual_rate, months, interest_only_months, pmi, home_value)]
+    )
+    months = months.astype(np.int64)
+    io_months = np.minimum(interest_only_months.astype(np.int64), months)
+
+    rate = (annual_rate / 100 / 12)[:, None]
+    amortizing = (months - io_months)[:, None]
+    principal_col = principal[:, None]
+
+    horizon = int(months.max()) if months.size else 0
+    month = np.arange(1, horizon + 1)[None, :]
+    active = month <= months[:, None]
+
+    def balance_after(paid):
+        """Balance once `paid` amortizing payments have been made."""
+        paid = np.clip(paid, 0, amortizing)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            growth = (1 + rate) ** amortizing
+            level = principal_col * (growth - (1 + rate) ** paid) / (growth - 1)
+            linear = principal_col * (1 - paid / amortizing)
+        return np.where(amortizing == 0, principal_col, np.where(rate > 0, level, linear))
+
+    start = balance_after(month - 1 - io_months[:, None])
+    end = balance_after(month - io_months[:, None])
+    start = np.where(active, start, 0.0)
+    end = np.where(active, end, 0.0)
+
+    interest = start * rate
+    principal_paid = start - end
+    insured = active & (home_value[:, None] > 0) & (start > pmi_ltv_cutoff * home_value[:, None])
+    pmi_paid = np.where(insured, pmi[:, None], 0.0)
+
+    return {
+        "payment": interest + principal_paid,
+        "principal": principal_paid,
+        "interest": interest,
+        "pmi": pmi_paid,
+        "balance": end,
+    }
+
+
+@lru_cache(maxsize=AMORTIZATION_CACHE_SIZE)
+def cached_schedule(principal, annual_rate, months, interest_only_months=0, pmi=0.0, home_value=0.0,
+                    pmi_ltv_cutoff=PMI_LTV_CUTOFF):
+    """Memoized single-loan schedule. The arrays are shared between callers, so they are read-only."""
+    schedule = amortize(principal, annual_rate, months, interest_only_months, pmi, home_value, pmi_ltv_cutoff)
+    schedule = {name: values[0] for name, values in schedule.items()}
+    for values in schedule.values():
+        values.flags.writeable = False
+    return schedule
+
+
+def loan_schedule(principal, annual_rate, years, interest_only_months=0, pmi=0.0, home_value=0.0,
+                  pmi_ltv_cutoff=PMI_LTV_CUTOFF):
+    return cached_schedule(float(principal), float(annual_rate), int(round(years * 12)),
+                           int(interest_only_months), float(pmi), float(home_value), float(pmi_ltv_cutoff))
+
+
+def deal_schedule(inputs, refinance_month=None):
+    """
+    Schedule of a DealInputs financing plan: the purchase loan, interest-only through the
+    rehab when interest_only is set, then the refinance loan (if any) from refinance_month
+    (defaults to the end of the rehab). PMI is measured against the purchase price before
+    the refinance and against the ARV after it.
+    Returns (schedule, summary).
+    """
+    loan_amount, _, _ = loan_terms(inputs)
+    io_months = int(round(inputs.rehab_months)) if inputs.interest_only else 0
+    purchase = loan_schedule(loan_amount, inputs.interest_rate if loan_amount else 0, inputs.years_amortized,
+                             io_months, 0 if inputs.cash else inputs.pmi, inputs.purchase_price)
+
+    refinance_amount = inputs.refinance_loan_amount
+    if inputs.refinance_loan_fees_wrapped:
+        refinance_amount += inputs.refinance_lender_charges
+    refinancing = inputs.refinance_loan_amount > 0 and inputs.refinance_years_amortized > 0
+
+    if not refinancing:
+        return dict(purchase), summarize(purchase, loan_amount)
+
+    month = int(round(inputs.rehab_months)) if refinance_month is None else refinance_month
+    month = min(month, len(purchase["balance"]))
+    payoff = purchase["balance"][month - 1] if month > 0 else loan_amount
+    refinance = loan_schedule(refinance_amount, inputs.refinance_interest_rate, inputs.refinance_years_amortized,
+                              0, inputs.refinance_pmi, inputs.arv)
+
+    schedule = {name: np.concatenate([purchase[name][:month], refinance[name]]) for name in SCHEDULE_COLUMNS}
+    summary = summarize(schedule, loan_amount)
+    summary.update({
+        "refinance_month": month,
+        "refinance_payoff": round(float(payoff), 2),
+        "cash_out": round(float(inputs.refinance_loan_amount - payoff), 2),
+        "refinance_monthly_payment": round(float(refinance["payment"][0] + refinance["pmi"][0]), 2),
+    })
+    return schedule, summary
+
+
+def summarize(schedule, loan_amount):
+    payments = schedule["payment"]
+    insured = np.flatnonzero(schedule["pmi"] > 0)
+    return {
+        "loan_amount": round(float(loan_amount), 2),
+        "months": len(payments),
+        "monthly_payment": round(float(payments[0] + schedule["pmi"][0]), 2) if len(payments) else 0.0,
+        "total_interest": round(float(schedule["interest"].sum()), 2),
+        "total_pmi": round(float(schedule["pmi"].sum()), 2),
+        # First month without PMI after it was being charged
+        "pmi_drop_month": int(insured[-1]) + 2 if len(insured) and insured[-1] + 1 < len(payments) else None,
+    }
+
+
+def yearly(schedule):
+    """
+    Sums flows into 12-month buckets; balance is the balance at the end of each year.
+    Works on single (months,) or batch (loans, months) schedules.
+    """
+    months = schedule["balance"].shape[-1]
+    starts = np.arange(0, months, 12)
+    buckets = {name: np.add.reduceat(schedule[name], starts, axis=-1) if months else schedule[name]
+               for name in SCHEDULE_COLUMNS if name != "balance"}
+    buckets["balance"] = schedule["balance"][..., np.minimum(starts + 11, months - 1)] if months else schedule["balance"]
+    return buckets
@@ -0,0 +1,279 @@
+# analysis.py
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from .calculations import deal_columns, analyze_buy_rent_batch
+from .simulation import simulate_buy_rent
+from .amortization import PMI_LTV_CUTOFF, SCHEDULE_COLUMNS, amortize, deal_schedule, loan_schedule, summarize, yearly
+from .properties import DealInputs
+from app.result_cache import cached_analysis
+
+router = APIRouter()
+
+# Largest number of deals evaluated in a single batch request
+MAX_BATCH_SIZE = 100_000
+# Largest grid evaluated by a single sweep request, and how many parameters it may vary
+MAX_SWEEP_POINTS = 250_000
+MAX_SWEEP_PARAMETERS = 4
+# Upper bound on paths x years kept for a simulation's percentiles (float32, three metrics)
+MAX_SIMULATION_CELLS = 2_000_000
+# Upper bound on loans x months computed by one amortization batch
+MAX_AMORTIZATION_CELLS = 5_000_000
+
+DEAL_FIELDS = list(DealInputs.model_fields)
+NUMERIC_DEAL_FIELDS = [name for name, field in DealInputs.model_fields.items() if field.annotation is float]
+
+
+# Pydantic model for batch input: either a list of deals or one list per DealInputs field
+class BatchDealInputs(BaseModel):
+    deals: Optional[List[DealInputs]] = None
+    columns: Optional[Dict[str, List[float]]] = None
+
+
+def batch_columns(payload: BatchDealInputs):
+    """Turns either payload shape into {field: list} columns, validating the columnar form."""
+    if (payload.deals is None) == (payload.columns is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of 'deals' or 'columns'")
+
+    if payload.deals is not None:
+        return {field: [getattr(deal, field) for deal in payload.deals] for field in DEAL_FIELDS}
+
+    missing = [field for field in DEAL_FIELDS if field not in payload.columns]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing columns: {', '.join(missing)}")
+    lengths = {len(payload.columns[field]) for field in DEAL_FIELDS}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=422, detail="All columns must have the same length")
+    return {field: payload.columns[field] for field in DEAL_FIELDS}
+
+
+@router.post("/analyze-buy-rent-deal/batch")
+def analyze_buy_rent_deal_batch(payload: BatchDealInputs):
+    columns = batch_columns(payload)
+    count = len(columns[DEAL_FIELDS[0]])
+    if count > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size is limited to {MAX_BATCH_SIZE} deals")
+
+    results = analyze_buy_rent_batch(deal_columns(columns))
+
+    response = {"count": count}
+    for name, values in results.items():
+        response[name] = np.round(values, 2).tolist()
+    return response
+
+
+# Pydantic models for sweep input: a base deal plus up to four varied parameters
+class SweepParameter(BaseModel):
+    name: str
+    values: Optional[List[float]] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: Optional[int] = Field(default=None, ge=1)
+
+    def axis(self):
+        if self.name not in NUMERIC_DEAL_FIELDS:
+            raise HTTPException(status_code=422, detail=f"Cannot sweep '{self.name}'")
+        if self.values is not None:
+            return np.asarray(self.values, dtype=float)
+        if None in (self.start, self.stop, self.steps):
+            raise HTTPException(status_code=422, detail=f"'{self.name}' needs values or start/stop/steps")
+        return np.linspace(self.start, self.stop, self.steps)
+
+
+class SweepInputs(BaseModel):
+    base: DealInputs
+    parameters: List[SweepParameter] = Field(min_length=1, max_length=MAX_SWEEP_PARAMETERS)
+
+
+def calculate_break_even_rent(cols, monthly_mortgage):
+    """
+    Monthly rent at which monthly cash flow is zero. Cash flow is linear in rent:
+    rent * (1 - percentage expenses) - fixed monthly expenses - mortgage.
+    """
+    rent_share_kept = 1 - (cols.maintenance + cols.vacancy + cols.capex + cols.managment) / 100
+    fixed_monthly = (cols.yearly_taxes / 12 + cols.monthly_insurance + cols.hoa_fees + cols.gas
+                     + cols.electricity + cols.watersewer + cols.garbage + cols.other)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rent_share_kept > 0, (fixed_monthly + monthly_mortgage) / rent_share_kept, np.nan)
+
+
+def sweep_buy_rent(base, axes):
+    """
+    Evaluates the buy & rent analysis over the cartesian grid of the given axes
+    ({field: 1-D values}). Every returned array has one dimension per axis.
+    """
+    grids = np.meshgrid(*axes.values(), indexing="ij")
+    shape = grids[0].shape
+    columns = {field: np.broadcast_to(float(getattr(base, field)), shape) for field in DEAL_FIELDS}
+    columns.update(zip(axes, grids))
+
+    cols = deal_columns(columns)
+    results = analyze_buy_rent_batch(cols)
+    return {
+        "monthly_cash_flow": results["monthly_cash_flow"],
+        "coc_return": results["coc_return"],
+        "cap_rate": results["cap_rate"],
+        "break_even_rent": calculate_break_even_rent(cols, results["monthly_mortgage"]),
+    }
+
+
+def tensor_to_json(values):
+    """Rounds to cents and swaps non-finite entries for None so the tensor is valid JSON."""
+    values = np.round(values, 2)
+    finite = np.isfinite(values)
+    if finite.all():
+        return values.tolist()
+    return np.where(finite, values, None).tolist()
+
+
+@router.post("/analyze-buy-rent-deal/sweep")
+def analyze_buy_rent_deal_sweep(inputs: SweepInputs):
+    names = [parameter.name for parameter in inputs.parameters]
+    if len(set(names)) != len(names):
+        raise HTTPException(status_code=422, detail="Each parameter can only be swept once")
+
+    axes = {parameter.name: parameter.axis() for parameter in inputs.parameters}
+    points = int(np.prod([len(axis) for axis in axes.values()]))
+    if points > MAX_SWEEP_POINTS:
+        raise HTTPException(status_code=413, detail=f"Sweeps are limited to {MAX_SWEEP_POINTS} grid points")
+
+    results = sweep_buy_rent(inputs.base, axes)
+
+    # Returned directly so the tensors skip FastAPI's per-element encoder
+    return JSONResponse({
+        "axes": {name: axis.tolist() for name, axis in axes.items()},
+        "shape": [len(axis) for axis in axes.values()],
+        **{name: tensor_to_json(values) for name, values in results.items()},
+    })
+
+
+# Pydantic models for Monte Carlo input
+class Distribution(BaseModel):
+    kind: Literal["fixed", "normal", "uniform", "triangular", "lognormal"] = "fixed"
+    mean: float = 0
+    std: float = Field(default=0, ge=0)
+    low: Optional[float] = None
+    mode: Optional[float] = None
+    high: Optional[float] = None
+
+    def as_dict(self):
+        required = {"uniform": ("low", "high"), "triangular": ("low", "mode", "high")}.get(self.kind, ())
+        missing = [name for name in required if getattr(self, name) is None]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"{self.kind} distribution needs {', '.join(missing)}")
+        return self.model_dump()
+
+
+class SimulationInputs(BaseModel):
+    base: DealInputs
+    years: int = Field(default=10, ge=1, le=40)
+    paths: int = Field(default=10_000, ge=1, le=200_000)
+    seed: int = 0
+
+    # Annual percentages drawn per path and year; rate_reset is the new interest rate
+    rent_growth: Distribution = Distribution(mean=3)
+    vacancy: Optional[Distribution] = None
+    maintenance: Optional[Distribution] = None
+    capex: Optional[Distribution] = None
+    appreciation: Distribution = Distribution(mean=3)
+    rate_reset: Optional[Distribution] = None
+    rate_reset_year: Optional[int] = Field(default=None, ge=1)
+
+
+@router.post("/analyze-buy-rent-deal/simulate")
+@cached_analysis("simulate")
+def analyze_buy_rent_deal_simulate(inputs: SimulationInputs):
+    if inputs.paths * inputs.years > MAX_SIMULATION_CELLS:
+        raise HTTPException(status_code=413, detail=f"paths x years is limited to {MAX_SIMULATION_CELLS}")
+
+    draws = {}
+    for name in ("rent_growth", "appreciation", "vacancy", "maintenance", "capex", "rate_reset"):
+        distribution = getattr(inputs, name)
+        if distribution is not None:
+            draws[name] = distribution.as_dict()
+
+    return simulate_buy_rent(
+        inputs.base, draws,
+        years=inputs.years,
+        paths=inputs.paths,
+        seed=inputs.seed,
+        rate_reset_year=inputs.rate_reset_year if inputs.rate_reset is not None else None,
+    )
+
+
+# Pydantic models for amortization schedules
+class LoanInputs(BaseModel):
+    principal: float = Field(ge=0)
+    annual_rate: float = Field(ge=0, le=100)
+    years: float = Field(gt=0, le=50)
+    interest_only_months: int = Field(default=0, ge=0)
+    pmi: float = Field(default=0, ge=0)
+    home_value: float = Field(default=0, ge=0)
+    pmi_ltv_cutoff: float = Field(default=PMI_LTV_CUTOFF, gt=0, le=1)
+
+
+class AmortizationInputs(LoanInputs):
+    granularity: Literal["monthly", "yearly"] = "monthly"
+
+
+class DealAmortizationInputs(BaseModel):
+    base: DealInputs
+    refinance_month: Optional[int] = Field(default=None, ge=0)
+    granularity: Literal["monthly", "yearly"] = "monthly"
+
+
+class BatchAmortizationInputs(BaseModel):
+    loans: List[LoanInputs] = Field(min_length=1)
+    granularity: Literal["monthly", "yearly"] = "yearly"
+
+
+def schedule_to_json(schedule, granularity):
+    """Schedule columns (single or batch), bucketed by year when asked, as JSON-ready lists."""
+    if granularity == "yearly":
+        schedule = yearly(schedule)
+    periods = schedule["balance"].shape[-1]
+    return {"period": list(range(1, periods + 1)),
+            **{name: tensor_to_json(schedule[name]) for name in SCHEDULE_COLUMNS}}
+
+
+@router.post("/amortization")
+def amortization_schedule(inputs: AmortizationInputs):
+    schedule = loan_schedule(inputs.principal, inputs.annual_rate, inputs.years, inputs.interest_only_months,
+                             inputs.pmi, inputs.home_value, inputs.pmi_ltv_cutoff)
+    return JSONResponse({
+        "summary": summarize(schedule, inputs.principal),
+        "schedule": schedule_to_json(schedule, inputs.granularity),
+    })
+
+
+@router.post("/amortization/batch")
+def amortization_schedule_batch(inputs: BatchAmortizationInputs):
+    months = [int(round(loan.years * 12)) for loan in inputs.loans]
+    if len(months) * max(months) > MAX_AMORTIZATION_CELLS:
+        raise HTTPException(status_code=413, detail=f"loans x months is limited to {MAX_AMORTIZATION_CELLS}")
+
+    columns = {field: [getattr(loan, field) for loan in inputs.loans]
+               for field in ("principal", "annual_rate", "interest_only_months", "pmi", "home_value")}
+    # One cutoff per request keeps the batch a single array expression
+    cutoffs = {loan.pmi_ltv_cutoff for loan in inputs.loans}
+    if len(cutoffs) > 1:
+        raise HTTPException(status_code=422, detail="All loans in a batch must share pmi_ltv_cutoff")
+
+    schedule = amortize(columns["principal"], columns["annual_rate"], months, columns["interest_only_months"],
+                        columns["pmi"], columns["home_value"], cutoffs.pop())
+    return JSONResponse({
+        "count": len(months),
+        "months": months,
+        "schedule": schedule_to_json(schedule, inputs.granularity),
+    })
+
+
+@router.post("/analyze-buy-rent-deal/amortization")
+def analyze_buy_rent_deal_amortization(inputs: DealAmortizationInputs):
+    schedule, summary = deal_schedule(inputs.base, inputs.refinance_month)
+    return JSONResponse({
+        "summary": summary,
+        "schedule": schedule_to_json(schedule, inputs.granularity),
+    })
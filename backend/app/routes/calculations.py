@@ -1,3 +1,12 @@
+import numpy as np
+from types import SimpleNamespace
+from app.result_cache import memoize
+
+@memoize()
+def compound_growth(monthly_interest_rate, number_of_payments):
+    """(1 + r) ** n of the level payment factor; deals share a handful of rates and terms."""
+    return (1 + monthly_interest_rate) ** number_of_payments
+
 def calculate_noi(inputs):
     # Calculate annual
     annual_gross_income = inputs.monthly_rent * 12
@@ -39,8 +48,8 @@ def calculate_monthly_mortgage(inputs):
     if loan_amount > 0 and inputs.interest_rate > 0 and inputs.years_amortized > 0:
         monthly_interest_rate = inputs.interest_rate / 100 / 12
         number_of_payments = inputs.years_amortized * 12
-        principal_and_interest = loan_amount * (monthly_interest_rate * (1 + monthly_interest_rate)**number_of_payments) / \
-                        ((1 + monthly_interest_rate)**number_of_payments - 1)
+        growth = compound_growth(monthly_interest_rate, number_of_payments)
+        principal_and_interest = loan_amount * (monthly_interest_rate * growth) / (growth - 1)
     else:
         principal_and_interest = 0
 
@@ -58,4 +67,75 @@ def calculate_CoC_return(annual_cash_flow, total_cash_invested):
     return (annual_cash_flow / total_cash_invested) * 100 if total_cash_invested > 0 else 0
 
 def calculate_suggested_purchase_price(expected_profit, expected_cash_invested, purchase_price):
-    return purchase_price - (expected_profit + expected_cash_invested) 
\ No newline at end of file
+    return purchase_price - (expected_profit + expected_cash_invested)
+
+
+#--------------------------------- Vectorized Versions ---------------------------------
+# Same formulas as above, evaluated over NumPy arrays (one element per deal).
+# calculate_noi and calculate_cash_flow are plain arithmetic and work on arrays as-is.
+
+def deal_columns(columns):
+    """Wraps a {field: array} mapping so the attribute-based formulas can read it."""
+    return SimpleNamespace(**{name: np.asarray(values, dtype=float) for name, values in columns.items()})
+
+def calculate_cap_rate_batch(noi, purchase_price):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(purchase_price > 0, (noi / purchase_price) * 100, 0.0)
+
+def calculate_monthly_mortgage_batch(cols):
+    cash = cols.cash.astype(bool)
+    wrapped = cols.loan_fees_wrapped.astype(bool)
+
+    # Calculate down payment
+    down_payment = cols.purchase_price * (cols.down_payment / 100)
+
+    # Wrap loan fees
+    loan_amount = np.where(wrapped,
+                           cols.purchase_price + cols.lender_charges - down_payment,
+                           cols.purchase_price - down_payment)
+    closing_costs = np.where(wrapped, cols.closing_costs, cols.closing_costs + cols.lender_charges)
+
+    amortized = (loan_amount > 0) & (cols.interest_rate > 0) & (cols.years_amortized > 0)
+    monthly_interest_rate = cols.interest_rate / 100 / 12
+    number_of_payments = cols.years_amortized * 12
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        growth = (1 + monthly_interest_rate) ** number_of_payments
+        principal_and_interest = loan_amount * (monthly_interest_rate * growth) / (growth - 1)
+    principal_and_interest = np.where(amortized, principal_and_interest, 0.0)
+
+    total_monthly_payment = principal_and_interest + cols.pmi
+
+    # Cash purchases carry no mortgage and no down payment
+    return (np.where(cash, 0.0, total_monthly_payment),
+            np.where(cash, 0.0, down_payment),
+            np.where(cash, cols.closing_costs, closing_costs))
+
+def calculate_CoC_return_batch(annual_cash_flow, total_cash_invested):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total_cash_invested > 0, (annual_cash_flow / total_cash_invested) * 100, 0.0)
+
+def analyze_buy_rent_batch(cols):
+    """Array version of the /analyze-buy-rent-deal computation. Returns unrounded arrays."""
+    noi, annual_gross_income, annual_operating_expenses = calculate_noi(cols)
+    cap_rate = calculate_cap_rate_batch(noi, cols.purchase_price)
+    monthly_mortgage, down_payment_amount, closing_costs = calculate_monthly_mortgage_batch(cols)
+    annual_cash_flow, monthly_cash_flow, annual_mortgage = calculate_cash_flow(noi, monthly_mortgage)
+
+    total_cash_invested = np.where(cols.cash.astype(bool),
+                                   cols.purchase_price + cols.closing_costs + cols.rehab,
+                                   down_payment_amount + closing_costs + cols.rehab)
+    coc_return = calculate_CoC_return_batch(annual_cash_flow, total_cash_invested)
+
+    return {
+        "noi": noi,
+        "cap_rate": cap_rate,
+        "coc_return": coc_return,
+        "monthly_cash_flow": monthly_cash_flow,
+        "annual_gross_income": annual_gross_income,
+        "annual_operating_expenses": annual_operating_expenses,
+        "purchase_price": cols.purchase_price,
+        "annual_cash_flow": annual_cash_flow,
+        "total_cash_invested": total_cash_invested,
+        "annual_mortgage": annual_mortgage,
+        "monthly_mortgage": monthly_mortgage,
+    }
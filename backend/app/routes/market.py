@@ -0,0 +1,28 @@
+# market.py
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from typing import Annotated, Literal, Optional
+from app.market_stats import market_summary
+from app.models import MarketStats
+from .properties import get_async_db
+
+router = APIRouter()
+
+
+@router.get("/market-stats")
+async def get_market_stats(
+    zipcode: Annotated[str, Query(pattern=r"^\d{5}$")],
+    home_type: Optional[str] = None,
+    listing_terms: Optional[Literal["for_sale", "sold", "pending", "for_rent"]] = None,
+    db = Depends(get_async_db),
+    ):
+    # One indexed read of the zip's aggregate rows; no scan of properties
+    stmt = select(MarketStats).where(MarketStats.zipcode == zipcode)
+    if listing_terms is not None:
+        stmt = stmt.where(MarketStats.listing_terms == listing_terms)
+    rows = (await db.execute(stmt.order_by(MarketStats.listing_terms, MarketStats.home_type))).scalars().all()
+
+    groups = market_summary(rows)
+    if home_type is not None:
+        groups = [group for group in groups if group["home_type"] == home_type]
+    return {"zipcode": zipcode, "groups": groups}
@@ -0,0 +1,12 @@
+# metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,17 +1,37 @@
 # properties.py
+import logging
 import requests
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from app.database import SessionLocal
+from app.database import SessionLocal, ASYNC_DB_ENABLED, ThreadedSession, async_session_factory
 from typing import Optional
 from app.models import Property
-from app.scraper import scrape_realtor_dot_com
+from app.queries import (
+    properties_query, comparables_query, project, order_by_key, paginate, encode_cursor, decode_cursor,
+    PROPERTY_FIELDS, SORT_COLUMNS,
+)
+from app.comps import comps_index, similarity
+from app.serialization import FastJSONResponse, ndjson_response
+from app.geo import bounding_box, within_radius
+from app.http_cache import conditional_get, remember
+from app.result_cache import cached_analysis
+from app.ingest import sync_listings
+from app.metrics import LISTING_CACHE
+from app.scheduler import scheduler
+from app.sync_state import age_of, is_fresh, last_synced_query, mark_synced
 from pydantic import BaseModel, constr
-from typing import Annotated, Optional
+from typing import Annotated, Literal, Optional
 from .calculations import *
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Page sizes for keyset pagination on /properties
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
 # Dependency
 def get_db():
@@ -22,71 +42,273 @@ def get_db():
         db.close()
 
 
-def sync_listings(zipcode, listingtype, db):
-    listings = scrape_realtor_dot_com(zipcode, listingtype, 10)
+# Dependency for routes that only sometimes write: they open a sync session (in the
+# threadpool) when they need one, instead of holding a pooled connection per request
+def get_session_factory():
+    return SessionLocal
 
-    print(f"[DEBUG] Scraper returned {len(listings) if listings else 0} results for {zipcode}")
 
-    if not listings:
-        return []
-    
-    for home in listings:
-        # Ensure home doenst already exist in database
+# Dependency for the read endpoints: an AsyncSession, or the sync session behind the
+# same execute() API when ASYNC_DB_ENABLED is off
+async def get_async_db():
+    if not ASYNC_DB_ENABLED:
+        db = SessionLocal()
         try:
-            db.add(Property(**home))
-            db.commit()
-        except IntegrityError:
-            db.rollback()
-            print(f"[SKIP] Duplicate: {home['address']} ({zipcode})")
+            yield ThreadedSession(db)
+        finally:
+            await run_in_threadpool(db.close)
+        return
+
+    async with async_session_factory()() as db:
+        yield db
+
+
+async def sync_if_stale(zipcode, listingtype, read_db, session_factory):
+    """
+    Only scrapes when the (zipcode, listingtype) key is older than SYNC_TTL_SECONDS; the
+    freshness check runs on the read session. While the background scheduler runs, stale
+    keys are served as-is and refreshed off the request thread; only keys that were never
+    synced are scraped inline, on a sync session opened for it in the threadpool.
+    Returns the cache status ("HIT", "STALE" or "MISS") and the age of the data in seconds.
+    """
+    age = age_of((await read_db.execute(last_synced_query(zipcode, listingtype))).scalar())
+    if is_fresh(age):
+        return "HIT", age
+
+    if age is not None and scheduler.running:
+        scheduler.enqueue(zipcode, listingtype)
+        return "STALE", age
+
+    return await run_in_threadpool(sync_inline, zipcode, listingtype, age, session_factory)
+
 
-    db.commit()
+def sync_inline(zipcode, listingtype, age, session_factory):
+    """
+    Scrapes and stores a key on the request's behalf. A failed scrape is not recorded as a
+    sync, so the next request tries again; meanwhile whatever is stored is served.
+    """
+    db = session_factory()
+    try:
+        sync_listings(zipcode, listingtype, db, raise_errors=True)
+        mark_synced(db, zipcode, listingtype)
+    except Exception as e:
+        db.rollback()
+        logger.warning("Inline sync failed for %s (%s): %s", zipcode, listingtype, e)
+        return ("STALE", age) if age is not None else ("MISS", 0.0)
+    finally:
+        db.close()
+    if scheduler.running:
+        scheduler.track(zipcode, listingtype)
+    return "MISS", 0.0
+
+
+def location_box(lat, lon, radiusKm, minLat, minLon, maxLat, maxLon):
+    """
+    Turns the radius (lat, lon, radiusKm) or bounding box (minLat..maxLon) query
+    parameters into a (min_lat, min_lon, max_lat, max_lon) box, or None if neither was given.
+    """
+    radius = (lat, lon, radiusKm)
+    bbox = (minLat, minLon, maxLat, maxLon)
+    if any(value is not None for value in radius):
+        if any(value is None for value in radius):
+            raise HTTPException(status_code=422, detail="lat, lon and radiusKm must be given together")
+        return bounding_box(lat, lon, radiusKm)
+    if any(value is not None for value in bbox):
+        if any(value is None for value in bbox):
+            raise HTTPException(status_code=422, detail="minLat, minLon, maxLat and maxLon must be given together")
+        if minLat > maxLat or minLon > maxLon:
+            raise HTTPException(status_code=422, detail="Bounding box minimums must not exceed maximums")
+        return bbox
+    return None
+
+
+def parse_fields(fields):
+    """Validates a comma separated fields= projection. None means every field."""
+    if fields is None:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in PROPERTY_FIELDS]
+    if unknown or not requested:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown) or fields}")
+    return list(dict.fromkeys(requested))
+
+
+def to_payload(row, fields=None):
+    """
+    ORM objects go through to_dict(). Projected rows are zipped with `fields`, so they
+    must be selected with those columns first (see project()).
+    """
+    if fields is None:
+        return row.to_dict()
+    return dict(zip(fields, row))
+
+
+def cache_headers(response):
+    """X-Cache headers set on the injected Response, for routes that return their own."""
+    return {key: value for key, value in response.headers.items() if key.startswith("x-")}
+
+
+def with_distances(rows, lat, lon, radiusKm, fields=None):
+    """Exact radius cut when searching by radius; rows gain distance_km and come back nearest first."""
+    if radiusKm is None:
+        return [to_payload(row, fields) for row in rows]
+    return [
+        {**to_payload(row, fields), "distance_km": round(distance, 3)}
+        for row, distance in within_radius(rows, lat, lon, radiusKm)
+    ]
 
 
 @router.get("/properties")
-def get_properties(
-    zipcode: Annotated[str, Query(pattern=r"^\d{5}$")],
+async def get_properties(
+    request: Request,
+    response: Response,
+    zipcode: Annotated[Optional[str], Query(pattern=r"^\d{5}$")] = None,
     minPrice: Optional[float] = None,
     maxPrice: Optional[float] = None,
     minsqft: Optional[int] = None,
     bedrooms: Optional[int] = None,
     homeType: Optional[str] = None,
-    db: Session = Depends(get_db)
+    lat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    lon: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    radiusKm: Annotated[Optional[float], Query(gt=0, le=200)] = None,
+    minLat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    minLon: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    maxLat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    maxLon: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    minCapRate: Optional[float] = None,
+    minCashFlow: Optional[float] = None,
+    minCocReturn: Optional[float] = None,
+    sort: Optional[Literal["price", "price_per_sqft", "listing_date", "id", "cash_flow", "cap_rate",
+                           "coc_return"]] = None,
+    order: Literal["asc", "desc"] = "asc",
+    limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    read_db = Depends(get_async_db),
+    session_factory = Depends(get_session_factory),
     ):
-    zipcode = "97404"
+    logger.debug("Received zipcode: %s, minPrice: %s, maxPrice: %s, minsqft: %s, bedrooms: %s, homeType: %s",
+                 zipcode, minPrice, maxPrice, minsqft, bedrooms, homeType)
+
+    box = location_box(lat, lon, radiusKm, minLat, minLon, maxLat, maxLon)
+    if zipcode is None and box is None:
+        raise HTTPException(status_code=422, detail="Provide a zipcode or a location (radius or bounding box)")
 
-    print(f"[DEBUG] Received zipcode: {zipcode}, minPrice: {minPrice}, maxPrice: {maxPrice}, minsqft: {minsqft}, bedrooms: {bedrooms}, homeType: {homeType}")
+    requested = parse_fields(fields)
+    paged = limit is not None or cursor is not None
+    if paged and radiusKm is not None:
+        raise HTTPException(status_code=422, detail="Radius results are ordered by distance and cannot be paged")
+
+    after = None
+    if cursor is not None:
+        try:
+            cursor_sort, cursor_descending, value, row_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+        if sort not in (None, cursor_sort) or (order == "desc") != cursor_descending:
+            raise HTTPException(status_code=422, detail="Cursor does not match sort and order")
+        sort, after = cursor_sort, (value, row_id)
 
     # Sync new listings
     # sync_listings(zipcode, 'for_sale', db)
 
-    # Sync sold listings
-    sync_listings(zipcode, 'sold', db)
+    # Sync sold listings (skipped while the last scrape is still fresh). Any inline scrape
+    # stays off the event loop.
+    if zipcode is not None:
+        cache_status, cache_age = await sync_if_stale(zipcode, 'sold', read_db, session_factory)
+        LISTING_CACHE.inc(status=cache_status)
+        response.headers["X-Cache"] = cache_status
+        response.headers["X-Cache-Age"] = str(int(cache_age))
+
+    # A location search spans zip codes, so the zipcode only filters when no location is given
+    scope = zipcode if box is None else None
+    # Answered from the client's or our cached copy while the zip code's data is unchanged
+    headers, cached = await conditional_get(request, read_db, scope, cache_headers(response))
+    if cached is not None:
+        return cached
+
+    stmt = properties_query(scope, minPrice, maxPrice, minsqft, bedrooms, homeType,
+                            box=box, minCapRate=minCapRate, minCashFlow=minCashFlow, minCocReturn=minCocReturn)
+
+    if paged:
+        sort = sort or "id"
+        page_size = limit or DEFAULT_PAGE_SIZE
+        stmt = paginate(stmt, sort, order == "desc", page_size, after)
+    elif sort is not None:
+        stmt = order_by_key(stmt, sort, order == "desc")
+    sort_field = SORT_COLUMNS[sort or "id"].key
+
+    # Select plain columns (plus what paging and distances need) rather than ORM objects;
+    # rows go straight to the encoder without to_dict()
+    output = requested or PROPERTY_FIELDS
+    extra = ["id", sort_field] + (["latitude", "longitude"] if radiusKm is not None else [])
+    properties = (await read_db.execute(project(stmt, list(dict.fromkeys(output + extra))))).all()
+
+    logger.debug("Query returned %d rows", len(properties))
+
+    if not paged:
+        payloads = with_distances(properties, lat, lon, radiusKm, output)
+        if format == "ndjson":
+            return ndjson_response(payloads, headers=headers)
+        return remember(request, FastJSONResponse(payloads, headers=headers))
+
+    next_cursor = None
+    if len(properties) > page_size:
+        properties = properties[:page_size]
+        last = properties[-1]
+        next_cursor = encode_cursor(sort, order == "desc", getattr(last, sort_field), last.id)
+
+    if format == "ndjson":
+        # The cursor travels in a header so every line stays a property
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = next_cursor
+        return ndjson_response((to_payload(row, output) for row in properties), headers=headers)
+    return remember(request, FastJSONResponse(
+        {"items": [to_payload(row, output) for row in properties], "next_cursor": next_cursor},
+        headers=headers,
+    ))
 
-    # Build the base query
-    query = db.query(Property).filter(Property.zipcode == zipcode, Property.listing_terms == 'for_sale')
 
-    # Apply filters if provided
-    if minPrice is not None:
-        query = query.filter(Property.listing_price >= minPrice)
-    if maxPrice is not None:
-        query = query.filter(Property.listing_price <= maxPrice)
-    if minsqft is not None:
-        query = query.filter(Property.sqft >= minsqft)
-    if bedrooms is not None:
-        query = query.filter(Property.beds >= bedrooms)
-    if homeType is not None:
-        query = query.filter(Property.home_type == homeType)
+@router.get("/comparables")
+async def get_comparables(
+    request: Request,
+    sqft: int,
+    lot_size: float,
+    year_built: int,
+    beds: int,
+    baths: float,
+    home_type: str,
+    address: str,
+    zipcode: Optional[str] = None,
+    lat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    lon: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    radiusKm: Annotated[Optional[float], Query(gt=0, le=200)] = None,
+    minLat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    minLon: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    maxLat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    maxLon: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    db = Depends(get_async_db)
+    ):
+    box = location_box(lat, lon, radiusKm, minLat, minLon, maxLat, maxLon)
+    if zipcode is None and box is None:
+        raise HTTPException(status_code=422, detail="Provide a zipcode or a location (radius or bounding box)")
 
-    # Execute the query
-    properties = query.all()
+    scope = zipcode if box is None else None
+    headers, cached = await conditional_get(request, db, scope)
+    if cached is not None:
+        return cached
 
-    print(f"[QUERY RESULT] {properties}")
+    stmt = comparables_query(scope, sqft, lot_size, year_built, beds, baths, home_type, address, box=box)
 
-    return [prop.to_dict() for prop in properties]
+    # Execute the query and return results
+    properties = (await db.execute(stmt)).scalars().all()
+    logger.debug("Comparables query returned %d rows", len(properties))
+    return remember(request, FastJSONResponse(with_distances(properties, lat, lon, radiusKm), headers=headers))
 
 
-@router.get("/comparables")
-def get_comparables(
+@router.get("/comparables/similar")
+def get_similar_comparables(
     zipcode: str,
     sqft: int,
     lot_size: float,
@@ -94,47 +316,44 @@ def get_comparables(
     beds: int,
     baths: float,
     home_type: str,
-    address: str,
+    address: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    k: Annotated[int, Query(ge=1, le=100)] = 10,
     db: Session = Depends(get_db)
     ):
+    subject = {
+        "sqft": sqft,
+        "lot_size": lot_size,
+        "year_built": year_built,
+        "beds": beds,
+        "baths": baths,
+        "latitude": latitude,
+        "longitude": longitude,
+    }
 
-    # Build the base query with exact matches
-    query = db.query(Property).filter(
-        Property.zipcode == zipcode,
-        Property.home_type == home_type,
-        Property.address != address,
-        Property.listing_terms == 'sold'
-    )
-
-    # Define variance and range constants
-    sqft_variance = 0.1  # 10% variance
-    lot_size_variance = 0.2  # 10% variance
-    year_built_range = 10  # ±5 years
-
-    # Apply range-based filters
-    query = query.filter(Property.sqft >= sqft * (1 - sqft_variance))
-    query = query.filter(Property.sqft <= sqft * (1 + sqft_variance))
-    query = query.filter(Property.lot_size >= lot_size * (1 - lot_size_variance))
-    query = query.filter(Property.lot_size <= lot_size * (1 + lot_size_variance))
-    query = query.filter(Property.year_built >= year_built - year_built_range)
-    query = query.filter(Property.year_built <= year_built + year_built_range)
-    query = query.filter(Property.beds >= beds - 1)
-    query = query.filter(Property.beds <= beds + 1)
-    query = query.filter(Property.baths >= baths - 1)
-    query = query.filter(Property.baths <= baths + 1)
-
-    # Execute the query and return results
-    properties = query.all()
-    print(f"[QUERY COMP RESULT] {properties}")
-    return [prop.to_dict() for prop in properties]
+    # Ranked k-nearest sold listings instead of the fixed box filter
+    matches = comps_index.nearest(db, zipcode, home_type, subject, k=k, exclude_address=address)
+    return [
+        {**prop.to_dict(), "similarity": round(similarity(distance), 4), "distance": round(distance, 4)}
+        for prop, distance in matches
+    ]
 
 
 @router.get("/property/{property_id}/{strategy}")
-def get_property_by_id(property_id: int, db: Session = Depends(get_db)):
-    property = db.query(Property).filter(Property.id == property_id).first()
+async def get_property_by_id(property_id: int, request: Request, db = Depends(get_async_db)):
+    # The listing's zip code picks its data version; the row itself is only loaded on a miss
+    found = (await db.execute(select(Property.zipcode).where(Property.id == property_id))).first()
+    if found is None:
+        raise HTTPException(status_code=404, detail="Property not found")
+    headers, cached = await conditional_get(request, db, found.zipcode)
+    if cached is not None:
+        return cached
+
+    property = (await db.execute(select(Property).where(Property.id == property_id))).scalars().first()
     if not property:
         raise HTTPException(status_code=404, detail="Property not found")
-    return property
+    return remember(request, FastJSONResponse(jsonable_encoder(property), headers=headers))
 
 
 # Pydantic model for input validation
@@ -185,6 +404,7 @@ class DealInputs(BaseModel):
 
 # Endpoint to analyze the deals
 @router.post("/analyze-buy-rent-deal")
+@cached_analysis("buy-rent")
 def analyze_buy_rent_deal(inputs: DealInputs):
     #print("Received Inputs:", inputs.dict())
 
@@ -224,8 +444,9 @@ def analyze_buy_rent_deal(inputs: DealInputs):
 
 
 @router.post("/analyze-fix-flip")
+@cached_analysis("fix-flip")
 def analyze_fix_flip(inputs: DealInputs):
-    print("Received Inputs:", inputs.dict())
+    logger.debug("Received inputs: %s", inputs)
 
     # Calculate holding costs
     total_monthly_holding_costs = (
@@ -264,8 +485,8 @@ def analyze_fix_flip(inputs: DealInputs):
         else:
             # Fully amortized monthly payment (standard mortgage calculation)
             if loan_term_months > 0 and monthly_interest_rate > 0:
-                monthly_payment = loan_amount * (monthly_interest_rate * (1 + monthly_interest_rate) ** loan_term_months) / \
-                                  ((1 + monthly_interest_rate) ** loan_term_months - 1)
+                growth = compound_growth(monthly_interest_rate, loan_term_months)
+                monthly_payment = loan_amount * (monthly_interest_rate * growth) / (growth - 1)
             else:
                 monthly_payment = 0  # Handle zero rate or term to avoid division by zero
 
@@ -276,8 +497,9 @@ def analyze_fix_flip(inputs: DealInputs):
         mao = mao_initial - loan_costs
 
     # Return all required values
-    print("Output:")
-    print(f"mao:{round(mao, 2)} arv: {round(inputs.arv, 2)} inputs.expected_profit: {round(inputs.expected_profit, 2)} rehab: {round(inputs.rehab, 2)} closing_costs: {round(inputs.closing_costs, 2)} holding_costs: {round(holding_costs, 2)} loan_costs: {round(loan_costs, 2)}")
+    logger.debug("mao: %.2f arv: %.2f expected_profit: %.2f rehab: %.2f closing_costs: %.2f holding_costs: %.2f "
+                 "loan_costs: %.2f", mao, inputs.arv, inputs.expected_profit, inputs.rehab, inputs.closing_costs,
+                 holding_costs, loan_costs)
     
     return {
         "mao": round(mao, 2),
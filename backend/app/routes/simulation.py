@@ -0,0 +1,158 @@
+# simulation.py
+import numpy as np
+from types import SimpleNamespace
+from .calculations import calculate_noi, calculate_monthly_mortgage
+
+# Paths simulated per chunk; intermediate arrays are (chunk, years)
+SIMULATION_CHUNK_SIZE = 20_000
+
+# Inputs that are drawn per path and per year (percentages)
+YEARLY_DRAWS = ("rent_growth", "vacancy", "maintenance", "capex", "appreciation")
+
+
+def sample(distribution, rng, size):
+    """Draws from a {"kind": ..., params} distribution. A missing distribution means "fixed"."""
+    kind = distribution.get("kind", "fixed")
+    if kind == "fixed":
+        return np.full(size, float(distribution.get("mean", 0.0)))
+    if kind == "normal":
+        return rng.normal(distribution["mean"], distribution["std"], size)
+    if kind == "uniform":
+        return rng.uniform(distribution["low"], distribution["high"], size)
+    if kind == "triangular":
+        return rng.triangular(distribution["low"], distribution["mode"], distribution["high"], size)
+    if kind == "lognormal":
+        # mean/std describe the underlying normal
+        return rng.lognormal(distribution["mean"], distribution["std"], size)
+    raise ValueError(f"Unknown distribution kind: {kind}")
+
+
+def loan_terms(inputs):
+    """Loan amount, monthly rate and number of payments, following calculate_monthly_mortgage."""
+    if inputs.cash:
+        return 0.0, 0.0, 0
+    down_payment = inputs.purchase_price * (inputs.down_payment / 100)
+    if inputs.loan_fees_wrapped:
+        loan_amount = inputs.purchase_price + inputs.lender_charges - down_payment
+    else:
+        loan_amount = inputs.purchase_price - down_payment
+    if loan_amount > 0 and inputs.interest_rate > 0 and inputs.years_amortized > 0:
+        return loan_amount, inputs.interest_rate / 100 / 12, int(round(inputs.years_amortized * 12))
+    # No amortization: the balance never moves
+    return max(loan_amount, 0.0), 0.0, 0
+
+
+def level_payment(balance, monthly_rate, payments):
+    """Level monthly payment; works on scalars or arrays of rates."""
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        growth = (1 + monthly_rate) ** payments
+        payment = balance * monthly_rate * growth / (growth - 1)
+    return np.where((monthly_rate > 0) & (payments > 0), payment, 0.0)
+
+
+def remaining_balance(balance, monthly_rate, payments, months_paid):
+    """Balance left after months_paid level payments; zero once the loan is paid off."""
+    months_paid = np.minimum(months_paid, payments)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        growth = (1 + monthly_rate) ** payments
+        left = balance * (growth - (1 + monthly_rate) ** months_paid) / (growth - 1)
+    return np.where((monthly_rate > 0) & (payments > 0), left, balance)
+
+
+def simulate_chunk(inputs, draws, years, rate_reset_year, rng, paths):
+    """Simulates `paths` yearly paths. Returns (annual cash flow, equity), each (paths, years)."""
+    shape = (paths, years)
+    # Expense percentages without a distribution stay fixed at the deal's own values
+    defaults = {"vacancy": inputs.vacancy, "maintenance": inputs.maintenance, "capex": inputs.capex}
+    sampled = {name: sample(draws.get(name, {"mean": defaults.get(name, 0.0)}), rng, shape)
+               for name in YEARLY_DRAWS}
+    reset_rate = sample(draws.get("rate_reset", {"mean": inputs.interest_rate}), rng, paths)
+
+    for name in ("vacancy", "maintenance", "capex"):
+        sampled[name] = np.clip(sampled[name], 0, 100)
+    reset_rate = np.clip(reset_rate, 0, None)
+
+    # Rent grows from year two onward; property value grows every year
+    rent_growth = 1 + sampled["rent_growth"] / 100
+    rent_growth[:, 0] = 1
+    monthly_rent = inputs.monthly_rent * np.cumprod(rent_growth, axis=1)
+    value = inputs.purchase_price * np.cumprod(1 + sampled["appreciation"] / 100, axis=1)
+
+    cols = SimpleNamespace(**inputs.model_dump())
+    cols.monthly_rent = monthly_rent
+    cols.vacancy = sampled["vacancy"]
+    cols.maintenance = sampled["maintenance"]
+    cols.capex = sampled["capex"]
+    noi, _, _ = calculate_noi(cols)
+
+    # Debt service: level payment on the original loan, re-amortized at reset_rate after the reset year
+    loan_amount, monthly_rate, payments = loan_terms(inputs)
+    payment = level_payment(loan_amount, monthly_rate, payments)
+    months = 12 * np.arange(1, years + 1)
+    balance = np.broadcast_to(remaining_balance(loan_amount, monthly_rate, payments, months), shape).copy()
+    debt_service = np.broadcast_to(np.where(months - 12 < payments, payment * 12, 0.0), shape).copy()
+
+    if rate_reset_year is not None and 0 < rate_reset_year < years and payments > 12 * rate_reset_year:
+        reset_month = 12 * rate_reset_year
+        reset_balance = remaining_balance(loan_amount, monthly_rate, payments, reset_month)
+        new_rate = (reset_rate / 100 / 12)[:, None]
+        left = payments - reset_month
+        new_payment = level_payment(reset_balance, new_rate, left)
+        after = months > reset_month
+        balance[:, after] = remaining_balance(reset_balance, new_rate, left, months[after] - reset_month)
+        debt_service[:, after] = np.where(months[after] - 12 < payments, new_payment * 12, 0.0)
+
+    if not inputs.cash:
+        debt_service = debt_service + inputs.pmi * 12
+
+    return noi - debt_service, value - balance
+
+
+def simulate_buy_rent(inputs, draws, years=10, paths=10_000, seed=0, rate_reset_year=None,
+                      percentiles=(5, 25, 50, 75, 95), chunk_size=SIMULATION_CHUNK_SIZE):
+    """
+    Monte Carlo simulation of a buy & rent deal over `years`. `draws` maps rent_growth,
+    vacancy, maintenance, capex, appreciation (percent per year) and rate_reset (new
+    interest rate) to distributions. Paths are simulated in chunks so intermediate arrays
+    stay bounded; each chunk gets its own child seed, so a given seed, path count and
+    chunk size always reproduce the same result.
+    """
+    _, down_payment_amount, closing_costs = calculate_monthly_mortgage(inputs)
+    if inputs.cash:
+        total_cash_invested = inputs.purchase_price + inputs.closing_costs + inputs.rehab
+    else:
+        total_cash_invested = down_payment_amount + closing_costs + inputs.rehab
+
+    cash_flow = np.empty((paths, years), dtype=np.float32)
+    equity = np.empty((paths, years), dtype=np.float32)
+
+    chunk_starts = range(0, paths, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_starts))
+    for start, child_seed in zip(chunk_starts, seeds):
+        count = min(chunk_size, paths - start)
+        rng = np.random.default_rng(child_seed)
+        chunk_cash_flow, chunk_equity = simulate_chunk(inputs, draws, years, rate_reset_year, rng, count)
+        cash_flow[start:start + count] = chunk_cash_flow
+        equity[start:start + count] = chunk_equity
+
+    if total_cash_invested > 0:
+        coc_return = cash_flow / np.float32(total_cash_invested) * 100
+    else:
+        coc_return = np.zeros_like(cash_flow)
+
+    def percentile_table(values):
+        table = np.percentile(values, percentiles, axis=0)
+        return {str(p): np.round(row, 2).tolist() for p, row in zip(percentiles, table)}
+
+    negative = cash_flow < 0
+    return {
+        "years": list(range(1, years + 1)),
+        "paths": paths,
+        "seed": seed,
+        "total_cash_invested": round(total_cash_invested, 2),
+        "annual_cash_flow": percentile_table(cash_flow),
+        "coc_return": percentile_table(coc_return),
+        "equity": percentile_table(equity),
+        "prob_negative_cash_flow": np.round(negative.mean(axis=0), 4).tolist(),
+        "prob_any_negative_year": round(float(negative.any(axis=1).mean()), 4),
+    }
@@ -0,0 +1,60 @@
+# sync.py
+from fastapi import APIRouter, HTTPException, Path
+from pydantic import BaseModel, Field, constr
+from typing import Annotated, List, Literal
+from app.bulk_scrape import bulk_runs, bulk_scraper
+from app.scheduler import scheduler
+
+router = APIRouter()
+
+# Zip codes accepted by one POST /sync/batch
+MAX_BATCH_ZIPCODES = 200
+
+ListingType = Literal["for_sale", "sold", "pending", "for_rent"]
+
+
+class BatchSyncInputs(BaseModel):
+    zipcodes: Annotated[List[constr(pattern=r"^\d{5}$")], Field(min_length=1, max_length=MAX_BATCH_ZIPCODES)]
+    listing_type: ListingType = "sold"
+
+
+@router.get("/sync/status")
+def get_sync_status():
+    return {
+        "running": scheduler.running,
+        "interval": scheduler.interval,
+        "max_workers": scheduler.max_workers,
+        "jobs": scheduler.status(),
+    }
+
+
+# Declared before /sync/{zipcode} so "batch" is not read as a zip code
+@router.post("/sync/batch", status_code=202)
+def enqueue_batch_sync(inputs: BatchSyncInputs):
+    # One batch at a time shares the worker pool and requests-per-second budget
+    bulk_run, started = bulk_scraper.start(inputs.zipcodes, inputs.listing_type)
+    if not started:
+        raise HTTPException(status_code=409, detail=f"Batch {bulk_run.id} is still running",
+                            headers={"Location": f"/sync/batch/{bulk_run.id}"})
+    bulk_runs.add(bulk_run)
+    return bulk_run.to_dict()
+
+
+@router.get("/sync/batch/{batch_id}")
+def get_batch_sync(batch_id: str):
+    bulk_run = bulk_runs.get(batch_id)
+    if bulk_run is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return bulk_run.to_dict()
+
+
+@router.post("/sync/{zipcode}", status_code=202)
+def enqueue_sync(
+    zipcode: Annotated[str, Path(pattern=r"^\d{5}$")],
+    listing_type: ListingType = "sold",
+    ):
+    if not scheduler.running:
+        raise HTTPException(status_code=503, detail="Sync scheduler is not running")
+
+    queued = scheduler.enqueue(zipcode, listing_type)
+    return {"zipcode": zipcode, "listing_type": listing_type, "queued": queued}
@@ -0,0 +1,185 @@
+# scheduler.py
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from app.database import SessionLocal
+from app.ingest import sync_listings
+from app.sync_state import get_sync_age, is_fresh, mark_synced, utcnow
+
+# Opt-in: the scheduler runs inside whichever process starts the app, so under
+# `uvicorn --workers N` every worker would scrape the same zip codes on the same schedule.
+# Enable it for exactly one process (e.g. a single-worker instance); POST /sync/{zipcode}
+# answers 503 where it is off.
+SYNC_SCHEDULER_ENABLED = os.getenv("SYNC_SCHEDULER_ENABLED", "false").lower() == "true"
+# How often tracked zip codes are checked for staleness
+SYNC_INTERVAL_SECONDS = int(os.getenv("SYNC_INTERVAL_SECONDS", "300"))
+# Upper bound on scrapes running at the same time
+SYNC_MAX_WORKERS = int(os.getenv("SYNC_MAX_WORKERS", "2"))
+# Comma separated zipcode[:listing_type] pairs to keep warm, e.g. "97404:sold,97478"
+TRACKED_ZIPCODES = os.getenv("TRACKED_ZIPCODES", "")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_tracked(value, default_listing_type="sold"):
+    keys = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        zipcode, _, listing_type = item.partition(":")
+        keys.append((zipcode.strip(), listing_type.strip() or default_listing_type))
+    return keys
+
+
+class SyncJob:
+    """Status of the background sync for one (zipcode, listing_type) key."""
+
+    def __init__(self, zipcode, listing_type):
+        self.zipcode = zipcode
+        self.listing_type = listing_type
+        self.state = "idle"
+        self.runs = 0
+        self.last_run = None
+        self.duration = None
+        self.rows_changed = None
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            "zipcode": self.zipcode,
+            "listing_type": self.listing_type,
+            "state": self.state,
+            "runs": self.runs,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "duration": self.duration,
+            "rows_changed": self.rows_changed,
+            "last_error": self.last_error,
+        }
+
+
+class SyncScheduler:
+    """
+    Keeps a registry of tracked (zipcode, listing_type) keys and refreshes them off the
+    request thread. Stale keys are re-scraped on a fixed interval and at most
+    max_workers scrapes run at once.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_workers=SYNC_MAX_WORKERS,
+                 interval=SYNC_INTERVAL_SECONDS):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.interval = interval
+        self._jobs = {}
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._executor is not None
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sync")
+        self._thread = threading.Thread(target=self._loop, name="sync-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        if not self.running:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+        self._executor = None
+        self._thread = None
+
+    def track(self, zipcode, listing_type):
+        with self._lock:
+            key = (zipcode, listing_type)
+            if key not in self._jobs:
+                self._jobs[key] = SyncJob(zipcode, listing_type)
+            return self._jobs[key]
+
+    def untrack(self, zipcode, listing_type):
+        with self._lock:
+            self._jobs.pop((zipcode, listing_type), None)
+
+    def enqueue(self, zipcode, listing_type):
+        """Queues a refresh for the key. Returns False if one is already queued or running."""
+        if not self.running:
+            raise RuntimeError("Sync scheduler is not running")
+
+        job = self.track(zipcode, listing_type)
+        with self._lock:
+            if job.state in ("queued", "running"):
+                return False
+            job.state = "queued"
+            future = self._executor.submit(self._run, job)
+            self._futures.add(future)
+            future.add_done_callback(self._futures.discard)
+        return True
+
+    def run_due(self):
+        """Queues every tracked key whose last sync is older than the TTL."""
+        with self._lock:
+            keys = list(self._jobs)
+
+        db = self.session_factory()
+        try:
+            due = [key for key in keys if not is_fresh(get_sync_age(db, *key))]
+        finally:
+            db.close()
+
+        return [key for key in due if self.enqueue(*key)]
+
+    def wait(self, timeout=None):
+        """Blocks until every queued refresh has finished."""
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures, timeout=timeout)
+
+    def status(self):
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def _run(self, job):
+        job.state = "running"
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            counts = sync_listings(job.zipcode, job.listing_type, db, raise_errors=True)
+            mark_synced(db, job.zipcode, job.listing_type)
+            job.rows_changed = counts["inserted"] + counts["updated"]
+            job.last_error = None
+        except Exception as e:
+            db.rollback()
+            job.last_error = str(e)
+            logger.error("Background sync failed for %s (%s): %s", job.zipcode, job.listing_type, e)
+        finally:
+            db.close()
+            job.runs += 1
+            job.last_run = utcnow()
+            job.duration = round(time.perf_counter() - started, 3)
+            job.state = "idle"
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.exception("Sync scheduler tick failed: %s", e)
+            self._stop.wait(self.interval)
+
+
+scheduler = SyncScheduler()
+
+for _zipcode, _listing_type in parse_tracked(TRACKED_ZIPCODES):
+    scheduler.track(_zipcode, _listing_type)
@@ -1,10 +1,14 @@
 # scraper.py
+import logging
 import math
-import requests
+import time
 import pandas as pd
 import os
 import homeharvest
 from homeharvest import scrape_property
+from app.metrics import record_scrape
+
+logger = logging.getLogger(__name__)
 
 
 #--------------------------------- Helper Functions ---------------------------------
@@ -68,33 +72,6 @@ def add_dash(val):
         return "--"
     return val
 
-def get_property_image(property_url):
-    """
-    Fetch the Open Graph image URL for a given property URL using Microlink.
-    Returns a fallback image URL if no image is found.
-    """
-    if not property_url:
-        return "/fallback.png"
-    print(f"[DEBUG] Fetching image for {property_url}")
-
-    microlink_url = f"https://api.microlink.io/?url={property_url}"
-    try:
-        response = requests.get(microlink_url)
-        response.raise_for_status()  # Raise an error for bad responses
-        data = response.json()
-        # print(f"DATA: {data}")
-        if data and "data" in data and data["data"] is not None:
-            image_data = data["data"].get("image", {})
-            if image_data:
-                return image_data.get("url", "/fallback.png")
-        return "/fallback.png"
-    except requests.RequestException as e:
-        print(f"Error fetching image for {property_url}: {e}")
-        return "/fallback.png"
-    except ValueError as e:
-        print(f"JSON decode error for {property_url}: {e}")
-        return "/fallback.png"
-
 def extract_latest_tax(tax_history: list) -> int:
     try:
         current_year = max([entry['year'] for entry in tax_history if 'tax' in entry and entry['tax'] is not None])
@@ -105,114 +82,155 @@ def extract_latest_tax(tax_history: list) -> int:
         pass
     return 0
 
+#--------------------------------- Column-wise Normalization ---------------------------------
+# Vectorized equivalents of the per-row helpers above, applied to whole DataFrame columns
+
+HOME_TYPES = {
+    "MOBILE": "Mobile",
+    "SINGLE_FAMILY": "Single Family",
+    "LAND": "Land",
+    "MULTI_FAMILY": "Multi Family",
+    "APARTMENT": "Apartment",
+}
+
+STRING_COLS = [
+    "street", "unit", "city", "state", "list_date", "status", "style",
+    "property_url", "mls", "mls_id", "last_sold_date", "parking_garage"
+]
+NUMERIC_COLS = [
+    "list_price", "beds", "full_baths", "half_baths", "sqft", "lot_sqft",
+    "year_built", "sold_price", "price_per_sqft", "latitude", "longitude",
+    "stories", "hoa_fee"
+]
+
+def remove_none_column(col):
+    """Column version of remove_none: drops standalone "none" words, falls back to "--"."""
+    cleaned = (
+        col.astype(str)
+        .str.replace(r"(?i)(?<!\S)none(?!\S)", " ", regex=True)
+        .str.split()
+        .str.join(" ")
+    )
+    empty = ~col.astype(bool) | (cleaned == "")
+    return cleaned.where(~empty, "--")
+
+def acres_column(col):
+    """Column version of acres: lot size in square feet to acres, 0.0 when missing or unparseable."""
+    if pd.api.types.is_numeric_dtype(col):
+        sqft = col.astype(float)
+    else:
+        clean_lot = (
+            col.astype(str)
+            .str.replace(",", "", regex=False)
+            .str.replace("sqft", "", regex=False)
+            .str.replace("acres", "", regex=False)
+            .str.strip()
+        )
+        sqft = pd.to_numeric(clean_lot, errors="coerce")
+        sqft = sqft.where(col.astype(bool), 0.0)
+
+    sqft = sqft.fillna(0.0)
+    # Python's round() rather than numpy's keeps results identical to acres()
+    return (sqft / 43560).map(lambda val: round(val, 4))
+
+def land_type_column(col):
+    mapped = col.map(HOME_TYPES)
+    return mapped.astype(object).where(mapped.notna(), None)
+
+def normalize_listings(listings: pd.DataFrame, zip_code: str, listingtype: str) -> pd.DataFrame:
+    """
+    Turns a homeharvest DataFrame into one row per Property, column-wise.
+    Columns match the Property model; call .to_dict("records") to get the rows.
+    """
+    # Handle missing data at DataFrame level
+    listings = listings.copy()
+    listings[STRING_COLS] = listings[STRING_COLS].fillna("")
+    listings[NUMERIC_COLS] = listings[NUMERIC_COLS].fillna(0).infer_objects(copy=False)
+
+    def numeric(name):
+        return listings[name].astype(float)
+
+    def optional(name, default):
+        return listings[name] if name in listings.columns else default
+
+    hoa_fee = numeric("hoa_fee")
+    if "tax_history" in listings.columns:
+        annual_tax = listings["tax_history"].map(extract_latest_tax)
+    else:
+        annual_tax = 0
+
+    return pd.DataFrame({
+        "address": remove_none_column(listings["street"]),
+        "zipcode": optional("zip_code", zip_code),
+        "state": listings["state"],
+        "city": listings["city"],
+        "unit": listings["unit"],
+
+        "listing_price": numeric("list_price").astype("int64"),
+        "listing_date": listings["list_date"],
+        "listing_terms": optional("listingtype", listingtype),
+        "status": listings["status"],
+
+        "beds": numeric("beds"),
+        "baths": numeric("full_baths") + numeric("half_baths") * 0.5,
+        "sqft": numeric("sqft").astype("int64"),
+        "lot_size": acres_column(listings["lot_sqft"]),
+        "year_built": numeric("year_built").astype("int64"),
+        "home_type": land_type_column(listings["style"]),
+        "subtype": None,
+
+        "image_url": "",
+        "property_url": listings["property_url"],
+        "mls": listings["mls"],
+        "mls_id": listings["mls_id"],
+        "sold_price": numeric("sold_price").astype("int64"),
+        "last_sold_date": listings["last_sold_date"],
+
+        "price_per_sqft": numeric("price_per_sqft"),
+        "latitude": numeric("latitude"),
+        "longitude": numeric("longitude"),
+        "stories": numeric("stories").astype("int64"),
+
+        "has_hoa": hoa_fee > 0,
+        "hoa_fee": hoa_fee.astype("int64"),
+        "parking_garage": listings["parking_garage"],
+        "sewer": None,
+        "water": None,
+        "utilities": None,
+        "annual_tax": annual_tax,
+    }, index=listings.index)
+
 #--------------------------------- Main Functions ---------------------------------
-def scrape_realtor_dot_com(zip_code: str, listingtype: str, pastdays: int):
+def scrape_realtor_dot_com(zip_code: str, listingtype: str, pastdays: int, raise_errors: bool = False):
 
+    started = time.perf_counter()
+    listings = None
     try:
         listings = scrape_property(
             location=zip_code,
             listing_type=listingtype,
             past_days=pastdays
         )
+        record_scrape(zip_code, listingtype, time.perf_counter() - started, len(listings))
 
-        # Add debugging prints
-        print("[DEBUG] Columns in listings:", listings.columns.tolist())
-        if 'tax_history' in listings.columns:
-            print("tax_history exists")
-            print("Sample tax_history:", listings['tax_history'].iloc[0])
-        else:
-            print("tax_history not in columns")
-
-        # Handle missing data at DataFrame level
-        string_cols = [
-            "street", "unit", "city", "state", "list_date", "status", "style",
-            "property_url", "mls", "mls_id", "last_sold_date", "parking_garage"
-        ]
-        numeric_cols = [
-            "list_price", "beds", "full_baths", "half_baths", "sqft", "lot_sqft",
-            "year_built", "sold_price", "price_per_sqft", "latitude", "longitude",
-            "stories", "hoa_fee"
-        ]
-        # Fill missing values and ensure correct dtypes
-        listings[string_cols] = listings[string_cols].fillna("")
-        listings[numeric_cols] = listings[numeric_cols].fillna(0).infer_objects(copy=False)
-
-        # Transform into list of dicts
-        results = []
-        for _, row in listings.iterrows():
-
-            image_url = "" # get_property_image(row["property_url"])
-
-            results.append({
-                "address": remove_none(row.get("street", "Unknown")),
-                "zipcode": row.get("zip_code", zip_code),
-                "state": row.get("state"),
-                "city": row.get("city"),
-                "unit": row.get("unit"),
-
-                "listing_price": int(safe_float(row.get("list_price"))),
-                "listing_date": row.get("list_date"),
-                "listing_terms": row.get("listingtype", listingtype),
-                "status": row.get("status"),
-
-                "beds": safe_float(row.get("beds")),
-                "baths": bath_sum(row.get("full_baths"), row.get("half_baths")),
-                "sqft": int(safe_float(row.get("sqft"))),
-                "lot_size": acres(row.get("lot_sqft")),
-                "year_built": int(safe_float(row.get("year_built"))),
-                "home_type": land_type(row.get("style")),
-                "subtype": None,
-
-                "image_url": image_url,
-                "property_url": row.get("property_url"),
-                "mls": row.get("mls"),
-                "mls_id": row.get("mls_id"),
-                "sold_price": int(safe_float(row.get("sold_price"))),
-                "last_sold_date": row.get("last_sold_date"),
-
-                "price_per_sqft": safe_float(row.get("price_per_sqft")),
-                "latitude": safe_float(row.get("latitude")),
-                "longitude": safe_float(row.get("longitude")),
-                "stories": int(safe_float(row.get("stories"))),
-                
-                "has_hoa": True if safe_float(row.get("hoa_fee")) > 0 else False,
-                "hoa_fee": int(safe_float(row.get("hoa_fee"))),
-                "parking_garage": row.get("parking_garage"),
-                "sewer": None,
-                "water": None,
-                "utilities": None,
-                "annual_tax": extract_latest_tax(row.get("tax_history", [])),
-            })
-
-        return results
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Columns in listings: %s", listings.columns.tolist())
+            if 'tax_history' in listings.columns and len(listings):
+                logger.debug("Sample tax_history: %s", listings['tax_history'].iloc[0])
+            else:
+                logger.debug("tax_history not in columns")
+
+        return normalize_listings(listings, zip_code, listingtype).to_dict("records")
 
     except Exception as e:
-        print(f"[ERROR] Scraping failed: {e}")
+        if listings is None:
+            record_scrape(zip_code, listingtype, time.perf_counter() - started)
+        logger.error("Scraping %s (%s) failed: %s", zip_code, listingtype, e)
+        if raise_errors:
+            raise
         return []
     
 
-# # Function to fetch the Open Graph image URL using Microlink
-# def get_property_image(property_url):
-#     """
-#     Fetch the Open Graph image URL for a given property URL using Microlink.
-#     Returns a fallback image URL if no image is found.
-#     """
-#     microlink_url = f"https://api.microlink.io/?url={property_url}"
-#     try:
-#         response = requests.get(microlink_url)
-#         response.raise_for_status()  # Raise an error for bad responses
-#         data = response.json()
-#         # Extract the image URL from the response, default to fallback if missing
-#         return data.get("data", {}).get("image", {}).get("url", "/fallback.png")
-#     except requests.RequestException as e:
-#         print(f"Error fetching image for {property_url}: {e}")
-#         return "/fallback.png"
-    
-
-# if __name__ == "__main__":
-#     url = 'https://www.realtor.com/realestateandhomes-detail/2721082437'
-#     print(get_property_image(url))
-    
 if __name__ == "__main__":
     # 🔧 Set test inputs
     test_zip = "97404"
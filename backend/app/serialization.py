@@ -0,0 +1,72 @@
+# serialization.py
+# Property payloads are encoded straight from result tuples to JSON bytes, skipping
+# to_dict() and FastAPI's generic jsonable_encoder pass over every value.
+import json
+import math
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces equivalent JSON values, not
+    # identical bytes (float spelling differs: 1e16 vs 1e+16)
+    orjson = None
+
+# Rows encoded per chunk when streaming NDJSON
+NDJSON_CHUNK_ROWS = 500
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _finite(value):
+    """NaN/inf have no JSON form; orjson writes them as null, and the fallback does it here."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _clean(payload):
+    if isinstance(payload, dict):
+        return {key: _clean(value) for key, value in payload.items()}
+    if isinstance(payload, list):
+        return [_clean(value) for value in payload]
+    return _finite(payload)
+
+
+def dumps(payload):
+    """Compact UTF-8 JSON bytes; keys keep their insertion order."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(_clean(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_rows(fields, rows):
+    """
+    JSON array of row objects as bytes. Each row (tuple or Row) must start with the
+    columns named in `fields`, in that order; trailing columns are ignored.
+    """
+    fields = tuple(fields)
+    return dumps([dict(zip(fields, row)) for row in rows])
+
+
+def iter_ndjson(payloads, chunk_rows=NDJSON_CHUNK_ROWS):
+    """Yields newline-delimited JSON in chunks of chunk_rows documents."""
+    lines = []
+    for payload in payloads:
+        lines.append(dumps(payload))
+        if len(lines) >= chunk_rows:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+class FastJSONResponse(Response):
+    """JSONResponse that encodes with dumps() instead of json.dumps over jsonable_encoder output."""
+    media_type = "application/json"
+
+    def render(self, content):
+        return content if isinstance(content, bytes) else dumps(content)
+
+
+def ndjson_response(payloads, headers=None):
+    return StreamingResponse(iter_ndjson(payloads), media_type=NDJSON_MEDIA_TYPE, headers=headers)
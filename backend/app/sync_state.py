@@ -0,0 +1,109 @@
+# sync_state.py
+import math
+import os
+from datetime import datetime, timezone
+from sqlalchemy import select
+from app.database import dialect_insert
+from app.models import DataVersion, SyncState
+
+# How long a (zipcode, listing_type) scrape stays fresh before we hit Realtor.com again
+SYNC_TTL_SECONDS = int(os.getenv("SYNC_TTL_SECONDS", "3600"))
+# Days scraped for a key with no successful sync yet; also the widest window ever asked for
+SYNC_BACKFILL_DAYS = int(os.getenv("SYNC_BACKFILL_DAYS", "90"))
+# Scraped again before the watermark, for listings that show up on Realtor.com late
+SYNC_OVERLAP_SECONDS = int(os.getenv("SYNC_OVERLAP_SECONDS", str(6 * 3600)))
+
+# DataVersion row bumped by every write, for responses that span zip codes
+ANY_ZIPCODE = "*"
+
+
+def utcnow():
+    """Naive UTC timestamp, matching what we store in SyncState."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def get_sync_state(db, zipcode, listing_type):
+    return db.query(SyncState).filter(
+        SyncState.zipcode == zipcode,
+        SyncState.listing_type == listing_type
+    ).first()
+
+
+def get_sync_age(db, zipcode, listing_type):
+    """Seconds since the key was last synced, or None if it never was."""
+    state = get_sync_state(db, zipcode, listing_type)
+    return age_of(state.last_synced_at if state is not None else None)
+
+
+def age_of(synced_at):
+    return None if synced_at is None else (utcnow() - synced_at).total_seconds()
+
+
+def last_synced_query(zipcode, listing_type):
+    """last_synced_at of a key as a plain select, for the async read sessions."""
+    return select(SyncState.last_synced_at).where(
+        SyncState.zipcode == zipcode,
+        SyncState.listing_type == listing_type,
+    )
+
+
+def is_fresh(age, ttl=None):
+    ttl = SYNC_TTL_SECONDS if ttl is None else ttl
+    return age is not None and age < ttl
+
+
+def mark_synced(db, zipcode, listing_type, synced_at=None):
+    state = get_sync_state(db, zipcode, listing_type)
+    if state is None:
+        state = SyncState(zipcode=zipcode, listing_type=listing_type)
+        db.add(state)
+    state.last_synced_at = synced_at or utcnow()
+    db.commit()
+    return state
+
+
+def sync_window_days(db, zipcode, listing_type, now=None):
+    """
+    past_days for the next scrape of the key: the time since its watermark plus the
+    overlap, in whole days (the scraper's resolution), or a full backfill for a cold key.
+    """
+    state = get_sync_state(db, zipcode, listing_type)
+    if state is None or state.watermark is None:
+        return SYNC_BACKFILL_DAYS
+    seconds = ((now or utcnow()) - state.watermark).total_seconds() + SYNC_OVERLAP_SECONDS
+    return min(max(math.ceil(seconds / 86400), 1), SYNC_BACKFILL_DAYS)
+
+
+def advance_watermark(db, zipcode, listing_type, scraped_at):
+    """Records a successful scrape that started at scraped_at. Never moves the watermark back."""
+    state = get_sync_state(db, zipcode, listing_type)
+    if state is None:
+        state = SyncState(zipcode=zipcode, listing_type=listing_type)
+        db.add(state)
+    if state.watermark is None or scraped_at > state.watermark:
+        state.watermark = scraped_at
+    db.commit()
+    return state
+
+
+def bump_data_versions(db, zipcodes):
+    """
+    Moves the data version of each zip code, and of ANY_ZIPCODE, on by one. Runs in the
+    caller's transaction and does not commit, so the new version is visible exactly when
+    the rows are.
+    """
+    table = DataVersion.__table__
+    now = utcnow()
+    stmt = dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["zipcode"],
+        set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+    db.execute(stmt, [{"zipcode": zipcode, "version": 1, "updated_at": now}
+                      for zipcode in sorted({*zipcodes, ANY_ZIPCODE})])
+
+
+def data_versions_query(zipcode=None):
+    """(zipcode, version) rows for zipcode and ANY_ZIPCODE; see http_cache.data_etag."""
+    scopes = [ANY_ZIPCODE] if zipcode is None else [zipcode, ANY_ZIPCODE]
+    return select(DataVersion.zipcode, DataVersion.version).where(DataVersion.zipcode.in_(scopes))
@@ -0,0 +1,64 @@
+# bench_calculations.py
+# Usage (from backend/): python -m benchmarks.bench_calculations --deals 100000
+import argparse
+import time
+import numpy as np
+from app.routes.calculations import deal_columns, analyze_buy_rent_batch
+from app.routes.properties import DealInputs, analyze_buy_rent_deal
+
+BASE_DEAL = {field: 0 for field in DealInputs.model_fields}
+BASE_DEAL.update({
+    "purchase_price": 300000, "closing_costs": 6500, "rehab": 25000, "arv": 390000,
+    "down_payment": 20, "interest_rate": 6.5, "pmi": 81, "years_amortized": 30,
+    "monthly_rent": 2650, "yearly_taxes": 2450, "monthly_insurance": 110,
+    "vacancy": 5, "maintenance": 5, "capex": 5, "managment": 8,
+})
+
+
+def synthetic_columns(count, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {field: np.full(count, float(value)) for field, value in BASE_DEAL.items()}
+    columns["purchase_price"] = rng.uniform(100_000, 900_000, count)
+    columns["interest_rate"] = rng.uniform(3, 9, count)
+    columns["monthly_rent"] = rng.uniform(1_000, 5_000, count)
+    columns["cash"] = rng.random(count) < 0.1
+    columns["loan_fees_wrapped"] = rng.random(count) < 0.5
+    return columns
+
+
+def bench_scalar(columns, count):
+    deals = [DealInputs(**{field: values[i].item() for field, values in columns.items()}) for i in range(count)]
+    start = time.perf_counter()
+    for deal in deals:
+        analyze_buy_rent_deal(deal)
+    return time.perf_counter() - start
+
+
+def bench_batch(columns, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analyze_buy_rent_batch(deal_columns(columns))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Buy & rent calculation throughput")
+    parser.add_argument("--deals", type=int, default=100_000)
+    parser.add_argument("--scalar-sample", type=int, default=10_000,
+                        help="deals timed through the scalar endpoint function")
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.deals)
+    scalar_count = min(args.scalar_sample, args.deals)
+    scalar = bench_scalar(columns, scalar_count)
+    batch = bench_batch(columns)
+
+    print(f"scalar: {scalar_count / scalar:,.0f} deals/s ({scalar_count} deals)")
+    print(f"batch:  {args.deals / batch:,.0f} deals/s ({args.deals} deals)")
+    print(f"speedup: {(args.deals / batch) / (scalar_count / scalar):,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_serialization.py
+# Usage (from backend/): python -m benchmarks.bench_serialization --rows 5000
+import argparse
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.ingest import upsert_listings
+from app.models import Base, Property
+from app.queries import PROPERTY_FIELDS, project
+from app.serialization import encode_rows, iter_ndjson, orjson
+
+
+def synthetic_listings(count):
+    return [{
+        "address": f"{i} Synthetic Ave", "zipcode": "97478", "city": "Springfield", "state": "OR",
+        "listing_price": 250_000 + i * 7, "listing_date": "2025-04-01", "listing_terms": "for_sale",
+        "status": "FOR_SALE", "beds": 3.0, "baths": 2.0, "sqft": 1400 + i % 900, "lot_size": 0.18,
+        "year_built": 1960 + i % 60, "home_type": "Single Family", "subtype": None,
+        "image_url": "", "property_url": f"https://www.realtor.com/realestateandhomes-detail/{i}",
+        "mls": "ORRMLS", "mls_id": str(9_000_000 + i), "price_per_sqft": 180.0 + i % 100 / 3,
+        "latitude": 44.04 + i % 500 / 10_000, "longitude": -123.0 - i % 500 / 10_000, "stories": 1,
+        "has_hoa": False, "hoa_fee": 0, "annual_tax": 2450.5,
+    } for i in range(count)]
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Property payload serialization throughput")
+    parser.add_argument("--rows", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    upsert_listings(db, synthetic_listings(args.rows))
+
+    def to_dict_path():
+        # What /properties used to do: ORM objects, to_dict(), jsonable_encoder, json.dumps
+        db.expunge_all()
+        properties = db.execute(select(Property)).scalars().all()
+        JSONResponse(jsonable_encoder([prop.to_dict() for prop in properties])).body
+
+    def fast_path():
+        encode_rows(PROPERTY_FIELDS, db.execute(project(select(Property), PROPERTY_FIELDS)).all())
+
+    def ndjson_path():
+        rows = db.execute(project(select(Property), PROPERTY_FIELDS)).all()
+        b"".join(iter_ndjson(dict(zip(PROPERTY_FIELDS, row)) for row in rows))
+
+    baseline = best_of(args.repeat, to_dict_path)
+    fast = best_of(args.repeat, fast_path)
+    ndjson = best_of(args.repeat, ndjson_path)
+
+    print(f"encoder: {'orjson' if orjson else 'json (stdlib)'}, {args.rows} rows, query included")
+    print(f"to_dict + jsonable_encoder: {args.rows / baseline:,.0f} rows/s")
+    print(f"tuples + encode_rows:       {args.rows / fast:,.0f} rows/s ({baseline / fast:,.1f}x)")
+    print(f"tuples + ndjson:            {args.rows / ndjson:,.0f} rows/s ({baseline / ndjson:,.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
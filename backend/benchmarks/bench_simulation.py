@@ -0,0 +1,37 @@
+# bench_simulation.py
+# Usage (from backend/): python -m benchmarks.bench_simulation --paths 100000 --years 20
+import argparse
+import time
+from app.routes.properties import DealInputs
+from app.routes.simulation import simulate_buy_rent
+from benchmarks.bench_calculations import BASE_DEAL
+
+DRAWS = {
+    "rent_growth": {"kind": "normal", "mean": 3, "std": 2},
+    "vacancy": {"kind": "triangular", "low": 2, "mode": 5, "high": 15},
+    "maintenance": {"kind": "uniform", "low": 3, "high": 10},
+    "capex": {"kind": "uniform", "low": 3, "high": 8},
+    "appreciation": {"kind": "normal", "mean": 3.5, "std": 4},
+    "rate_reset": {"kind": "uniform", "low": 5, "high": 10},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation throughput")
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    inputs = DealInputs(**BASE_DEAL)
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        simulate_buy_rent(inputs, DRAWS, years=args.years, paths=args.paths, seed=0, rate_reset_year=5)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"simulate: {args.paths / best:,.0f} paths/s ({args.paths} paths x {args.years} years, {best:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# load_test.py
+# Concurrency of the read endpoints with the sync and async database layers.
+# Usage (from backend/): DATABASE_URL_DEV=postgresql://... python -m benchmarks.load_test --concurrency 1,16,64
+# Seeds synthetic listings, then starts uvicorn once with ASYNC_DB_ENABLED=false ("before")
+# and once with true ("after"), and drives both with the same request mix.
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import httpx
+import numpy as np
+from app.database import SessionLocal, engine
+from app.ingest import upsert_listings
+from app.migrations import migrate
+from app.models import Property
+from app.sync_state import mark_synced
+from benchmarks.bench_serialization import synthetic_listings
+
+ZIPCODE = "97478"
+
+
+def seed(rows):
+    migrate(engine)
+    with SessionLocal() as db:
+        if db.query(Property).filter(Property.zipcode == ZIPCODE).count() < rows:
+            upsert_listings(db, synthetic_listings(rows))
+        # Fresh sync state so /properties never scrapes during the run
+        mark_synced(db, ZIPCODE, "sold")
+        return [row.id for row in db.query(Property.id).filter(Property.zipcode == ZIPCODE).limit(1000)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(async_db, port):
+    env = dict(os.environ, ASYNC_DB_ENABLED=str(async_db).lower(),
+               SYNC_SCHEDULER_ENABLED="false", IMAGE_RESOLVER_ENABLED="false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+def request_mix(ids):
+    """(path, params) pairs cycling over the three read endpoints."""
+    rng = random.Random(0)
+    while True:
+        yield "/properties", {"zipcode": ZIPCODE, "limit": 50, "sort": "price"}
+        yield "/comparables", {"zipcode": ZIPCODE, "sqft": 1800, "lot_size": 0.18, "year_built": 1990,
+                               "beds": 3, "baths": 2, "home_type": "Single Family", "address": "none"}
+        yield f"/property/{rng.choice(ids)}/buy-rent", {}
+
+
+async def drive(base_url, ids, concurrency, total):
+    latencies = []
+    mix = request_mix(ids)
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def one(path, params):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, params=params)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one(*next(mix)) for _ in range(total)])
+        elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies) * 1000
+    return total / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read endpoint throughput, sync vs async database layer")
+    parser.add_argument("--rows", type=int, default=5_000)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", default="1,8,32,64")
+    args = parser.parse_args()
+
+    ids = seed(args.rows)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    print(f"database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{'layer':<6} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+
+    for async_db in (False, True):
+        port = free_port()
+        server = start_server(async_db, port)
+        try:
+            for level in levels:
+                throughput, p50, p95 = asyncio.run(drive(f"http://127.0.0.1:{port}", ids, level, args.requests))
+                label = "async" if async_db else "sync"
+                print(f"{label:<6} {level:>5} {throughput:>9,.0f} {p50:>9.1f} {p95:>9.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
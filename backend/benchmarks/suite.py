@@ -0,0 +1,362 @@
+# suite.py
+# Reproducible benchmark suite with machine-readable results.
+# Usage (from backend/): python -m benchmarks.suite --sizes 1000,100000 --output results.json
+#                        python -m benchmarks.suite --output new.json --compare results.json
+# Runs against a throwaway SQLite file by default, or --database-url postgresql://... (a local
+# database the suite may fill; migrated like a deploy, never dropped). Every case draws its data
+# from the seeded generator in benchmarks.synthetic, so two runs of the same commit on the same
+# machine measure the same work. --compare exits non-zero when a case regressed by more than
+# --threshold.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+# app.database creates its engine on import; the suite binds its own, so any URL will do there
+os.environ.setdefault("DATABASE_URL_DEV", "sqlite://")
+
+import app.scraper
+from app import http_cache
+from app.comps import CompsCluster
+from app.database import ASYNC_DB_ENABLED, ThreadedSession, async_session_factory, pool_options
+from app.ingest import sync_listings, upsert_listings
+from app.main import app as api
+from app.migrations import migrate
+from app.models import Property
+from app.queries import PROPERTY_FIELDS, project
+from app.routes.analysis import sweep_buy_rent
+from app.routes.calculations import analyze_buy_rent_batch, deal_columns
+from app.routes.properties import DealInputs, get_async_db, get_db, get_session_factory
+from app.scraper import normalize_listings
+from app.serialization import encode_rows
+from app.sync_state import mark_synced
+from benchmarks.bench_calculations import BASE_DEAL, synthetic_columns
+from benchmarks.synthetic import homeharvest_frame, synthetic_rows, zipcode_for
+
+SCHEMA_VERSION = 1
+CASES = ("calculations", "normalize", "ingest", "api", "serialization", "comps")
+
+# The ingest case writes to its own zip code, apart from the seeded table
+INGEST_ZIPCODE = "96000"
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def result(name, value, unit, higher_is_better=True, **params):
+    return {"name": name, "params": params, "value": round(float(value), 4), "unit": unit,
+            "higher_is_better": higher_is_better}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --------------------------------- Cases ---------------------------------
+
+def bench_calculations(args, db):
+    columns = synthetic_columns(args.deals, seed=args.seed)
+    elapsed = best_of(args.repeat, lambda: analyze_buy_rent_batch(deal_columns(columns)))
+
+    # /analyze-buy-rent-deal/sweep over a 50 x 40 x 50 grid around one deal
+    base = DealInputs(**BASE_DEAL)
+    axes = {"interest_rate": np.linspace(3, 9, 50), "down_payment": np.linspace(0, 30, 40),
+            "monthly_rent": np.linspace(1500, 3500, 50)}
+    points = 50 * 40 * 50
+    sweep = best_of(args.repeat, lambda: sweep_buy_rent(base, axes))
+    return [result("calculations.buy_rent_batch", args.deals / elapsed, "deals/s", deals=args.deals),
+            result("calculations.buy_rent_sweep", points / sweep, "points/s", points=points)]
+
+
+def bench_normalize(args, db):
+    frame = homeharvest_frame(args.scrape_rows, seed=args.seed)
+    elapsed = best_of(args.repeat, lambda: normalize_listings(frame, "97478", "for_sale").to_dict("records"))
+    return [result("scraper.normalize_listings", args.scrape_rows / elapsed, "rows/s", rows=args.scrape_rows)]
+
+
+def bench_ingest(args, db):
+    """sync_listings end to end with scrape_property answering from the generator."""
+    zipcode = INGEST_ZIPCODE
+    frames = {"first": homeharvest_frame(args.scrape_rows, zipcode, seed=args.seed)}
+    # The second pass re-scrapes the same listings with new prices, i.e. all updates; the
+    # third re-scrapes them as they are, which the content hashes turn into no writes
+    frames["update"] = frames["first"].assign(list_price=frames["first"]["list_price"] + 1_000)
+    frames["unchanged"] = frames["update"]
+
+    results = []
+    original = app.scraper.scrape_property
+    try:
+        for phase in ("first", "update", "unchanged"):
+            app.scraper.scrape_property = lambda location, listing_type, past_days: frames[phase]
+            start = time.perf_counter()
+            counts = sync_listings(zipcode, "for_sale", db)
+            elapsed = time.perf_counter() - start
+            results.append(result("ingest.sync_listings", args.scrape_rows / elapsed, "rows/s",
+                                  rows=args.scrape_rows, phase=phase, inserted=counts["inserted"],
+                                  updated=counts["updated"], unchanged=counts["unchanged"]))
+    finally:
+        app.scraper.scrape_property = original
+    return results
+
+
+def seed_table(db, size, seed):
+    """Grows the properties table (outside the ingest zip) to size rows."""
+    have = db.scalar(select(func.count()).select_from(Property).where(Property.zipcode != INGEST_ZIPCODE))
+    batch = 50_000
+    for start in range(have, size, batch):
+        upsert_listings(db, synthetic_rows(min(batch, size - start), seed=seed, start=start))
+        print(f"  seeded {min(start + batch, size):,} / {size:,} rows", file=sys.stderr)
+
+
+def latency(client, path, params, requests, headers=None):
+    client.get(path, params=params).raise_for_status()  # warm-up
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path, params=params, headers=headers)
+        if response.is_error:
+            response.raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def bench_api(args, db):
+    """
+    /properties and /comparables latency as the table grows through --sizes: built from
+    the database, replayed from the response cache, and revalidated (304).
+    """
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+
+    def override_get_db():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def override_get_async_db():
+        if ASYNC_DB_ENABLED:
+            async with async_session_factory(args.database_url)() as session:
+                yield session
+            return
+        session = factory()
+        try:
+            yield ThreadedSession(session)
+        finally:
+            session.close()
+
+    api.dependency_overrides[get_db] = override_get_db
+    api.dependency_overrides[get_async_db] = override_get_async_db
+    api.dependency_overrides[get_session_factory] = lambda: factory
+    client = TestClient(api)
+    cache_bytes = http_cache.response_cache.max_bytes
+    zipcode = zipcode_for(0)
+    requests = {
+        "properties": ("/properties", {"zipcode": zipcode}),
+        "properties_page": ("/properties", {"zipcode": zipcode, "sort": "price", "limit": 50}),
+        "comparables": ("/comparables", {"zipcode": zipcode, "sqft": 1800, "lot_size": 0.18, "year_built": 1990,
+                                         "beds": 3, "baths": 2, "home_type": "Single Family",
+                                         "address": "none"}),
+    }
+
+    results = []
+    try:
+        for size in args.sizes:
+            seed_table(db, size, args.seed)
+            # Fresh sync state so /properties never scrapes during the run
+            mark_synced(db, zipcode, "sold")
+            for name, (path, params) in requests.items():
+                # seed_table doesn't bump data versions, so nothing cached may outlive a size
+                http_cache.response_cache.clear()
+                http_cache.response_cache.max_bytes = 0
+                p50, p95 = latency(client, path, params, args.requests)
+                results.append(result(f"api.{name}.p50", p50, "ms", False, rows=size))
+                results.append(result(f"api.{name}.p95", p95, "ms", False, rows=size))
+
+                http_cache.response_cache.max_bytes = cache_bytes
+                p50, _ = latency(client, path, params, args.requests)
+                results.append(result(f"api.{name}.cached.p50", p50, "ms", False, rows=size))
+                etag = {"If-None-Match": client.get(path, params=params).headers["ETag"]}
+                p50, _ = latency(client, path, params, args.requests, etag)
+                results.append(result(f"api.{name}.not_modified.p50", p50, "ms", False, rows=size))
+            http_cache.response_cache.clear()
+    finally:
+        http_cache.response_cache.max_bytes = cache_bytes
+        api.dependency_overrides.pop(get_db, None)
+        api.dependency_overrides.pop(get_async_db, None)
+        api.dependency_overrides.pop(get_session_factory, None)
+    return results
+
+
+def bench_serialization(args, db):
+    zipcode = zipcode_for(0)
+    stmt = select(Property).where(Property.zipcode == zipcode).limit(args.serialize_rows)
+    seed_table(db, args.serialize_rows, args.seed)
+
+    def to_dict_path():
+        db.expunge_all()
+        properties = db.execute(stmt).scalars().all()
+        JSONResponse(jsonable_encoder([prop.to_dict() for prop in properties])).body
+
+    def fast_path():
+        encode_rows(PROPERTY_FIELDS, db.execute(project(stmt, PROPERTY_FIELDS)).all())
+
+    rows = len(db.execute(project(stmt, ["id"])).all())
+    return [
+        result("serialization.to_dict", rows / best_of(args.repeat, to_dict_path), "rows/s", rows=rows),
+        result("serialization.encode_rows", rows / best_of(args.repeat, fast_path), "rows/s", rows=rows),
+    ]
+
+
+def bench_comps(args, db):
+    """CompsCluster.nearest on one cluster of --comps-rows sold listings."""
+    rng = np.random.default_rng(args.seed)
+    count = args.comps_rows
+    cluster = CompsCluster.from_rows(list(zip(
+        range(count), rng.uniform(600, 4000, count), rng.uniform(0.05, 2, count),
+        rng.integers(1900, 2024, count), rng.integers(1, 6, count), rng.integers(1, 4, count),
+        44 + rng.normal(0, 0.02, count), -123 + rng.normal(0, 0.02, count))))
+    subjects = [{"sqft": sqft, "lot_size": 0.2, "year_built": 1990, "beds": 3, "baths": 2,
+                 "latitude": 44.01, "longitude": -123.0} for sqft in rng.uniform(600, 4000, 50)]
+
+    def queries():
+        for subject in subjects:
+            cluster.nearest(subject, k=10)
+
+    elapsed = best_of(args.repeat, queries)
+    return [result("comps.nearest", elapsed / len(subjects) * 1000, "ms", higher_is_better=False,
+                   rows=count, k=10)]
+
+
+BENCHMARKS = {
+    "calculations": bench_calculations,
+    "normalize": bench_normalize,
+    "ingest": bench_ingest,
+    "api": bench_api,
+    "serialization": bench_serialization,
+    "comps": bench_comps,
+}
+
+
+# --------------------------------- Comparison ---------------------------------
+
+def case_key(entry):
+    return entry["name"], json.dumps(entry["params"], sort_keys=True)
+
+
+def compare(baseline, current, threshold):
+    """Rows of (name, params, before, after, change, regressed) for cases present in both runs."""
+    before = {case_key(entry): entry for entry in baseline["results"]}
+    rows = []
+    for entry in current["results"]:
+        old = before.get(case_key(entry))
+        if old is None or not old["value"]:
+            continue
+        change = entry["value"] / old["value"] - 1
+        worse = -change if entry["higher_is_better"] else change
+        rows.append((entry["name"], entry["params"], old["value"], entry["value"], change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite with JSON results")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"comma-separated subset of {', '.join(CASES)}")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="table sizes for the api case")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per endpoint and size")
+    parser.add_argument("--deals", type=int, default=100_000)
+    parser.add_argument("--scrape-rows", type=int, default=5_000)
+    parser.add_argument("--serialize-rows", type=int, default=5_000)
+    parser.add_argument("--comps-rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown, 0.1 = 10%%")
+    args = parser.parse_args()
+    args.sizes = sorted(int(size) for size in args.sizes.split(","))
+    cases = [case.strip() for case in args.cases.split(",")]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    scratch = None
+    if args.database_url is None:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        scratch.close()
+        args.database_url = f"sqlite:///{scratch.name}"
+    engine = create_engine(args.database_url, **pool_options(args.database_url))
+    migrate(engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    run = {
+        "schema": SCHEMA_VERSION,
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "async_db": ASYNC_DB_ENABLED,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+    try:
+        for case in cases:
+            print(f"[INFO] Running {case}", file=sys.stderr)
+            run["results"].extend(BENCHMARKS[case](args, db))
+    finally:
+        db.close()
+        engine.dispose()
+        if scratch is not None:
+            os.unlink(scratch.name)
+
+    output = json.dumps(run, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+    for entry in run["results"]:
+        params = " ".join(f"{key}={value}" for key, value in entry["params"].items())
+        print(f"{entry['name']:<32} {params:<40} {entry['value']:>14,.2f} {entry['unit']}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        regressions = 0
+        for name, params, before, after, change, regressed in compare(baseline, run, args.threshold):
+            regressions += regressed
+            flag = "REGRESSED" if regressed else ""
+            print(f"{name:<32} {json.dumps(params):<40} {before:>12,.2f} -> {after:>12,.2f} {change:+7.1%} {flag}",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(f"{regressions} case(s) regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# synthetic.py
+# Seeded homeharvest-shaped listings for the benchmarks: the same seed, count and start
+# always give the same frame, so runs on different machines or commits are comparable.
+import numpy as np
+import pandas as pd
+from app.scraper import normalize_listings
+
+STYLES = np.array(["SINGLE_FAMILY", "SINGLE_FAMILY", "SINGLE_FAMILY", "MULTI_FAMILY", "MOBILE", "LAND",
+                   "APARTMENT", "CONDOS"])
+STREETS = np.array(["Main St", "Oak Ave", "Pine Dr", "Maple Ln", "Cedar Ct", "Willamette St", "River Rd",
+                    "None Hill Rd"])
+STATUSES = {"for_sale": "FOR_SALE", "sold": "SOLD", "pending": "PENDING"}
+
+# Listings per zip code when a table is seeded with many rows
+ROWS_PER_ZIPCODE = 5_000
+
+
+def zipcode_for(index, first_zipcode="97400"):
+    return str(int(first_zipcode) + index // ROWS_PER_ZIPCODE).zfill(5)
+
+
+def homeharvest_frame(count, zipcode="97478", listing_type="for_sale", seed=0, start=0):
+    """
+    A DataFrame with the columns scrape_property returns and scraper.py reads, including
+    the gaps real scrapes have (missing sqft, lot sizes as text, no tax history).
+    Rows start..start+count-1 have distinct addresses and property URLs.
+    """
+    rng = np.random.default_rng([seed, start])
+    index = np.arange(start, start + count)
+    sold = listing_type == "sold"
+
+    sqft = rng.integers(600, 4_000, count).astype(float)
+    sqft[rng.random(count) < 0.05] = np.nan
+    list_price = np.round(rng.lognormal(12.7, 0.45, count), -3)
+    sold_price = np.round(list_price * rng.normal(0.99, 0.03, count), -3) if sold else np.full(count, np.nan)
+    list_date = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 300, count), unit="D")
+    sold_date = list_date + pd.to_timedelta(rng.integers(5, 120, count), unit="D")
+
+    lot_sqft = rng.integers(2_000, 40_000, count).astype(object)
+    lot_sqft[rng.random(count) < 0.1] = None
+    text_lots = rng.random(count) < 0.1
+    lot_sqft[text_lots] = [f"{value:,} sqft" for value in rng.integers(2_000, 40_000, text_lots.sum())]
+
+    taxes = rng.integers(800, 9_000, count)
+    tax_history = [
+        [{"year": 2024, "tax": int(tax), "assessment": {}}, {"year": 2023, "tax": int(tax * 0.97), "assessment": {}}]
+        if has_tax else None
+        for tax, has_tax in zip(taxes, rng.random(count) < 0.8)
+    ]
+
+    hoa_fee = np.where(rng.random(count) < 0.2, rng.integers(20, 400, count), np.nan)
+    return pd.DataFrame({
+        "property_url": [f"https://www.realtor.com/realestateandhomes-detail/{zipcode}-{i}" for i in index],
+        "mls": "ORRMLS",
+        "mls_id": [str(20_000_000 + i) for i in index],
+        "status": STATUSES.get(listing_type, "FOR_SALE"),
+        "style": rng.choice(STYLES, count),
+        "street": [f"{i} {street}" for i, street in zip(index, rng.choice(STREETS, count))],
+        "unit": np.where(rng.random(count) < 0.1, "Unit 2", None),
+        "city": "Springfield",
+        "state": "OR",
+        "zip_code": zipcode,
+        "beds": rng.integers(1, 6, count).astype(float),
+        "full_baths": rng.integers(1, 4, count).astype(float),
+        "half_baths": np.where(rng.random(count) < 0.4, 1.0, np.nan),
+        "sqft": sqft,
+        "year_built": rng.integers(1900, 2025, count).astype(float),
+        "days_on_mls": rng.integers(0, 200, count),
+        "list_price": list_price,
+        "list_date": list_date.strftime("%Y-%m-%d"),
+        "sold_price": sold_price,
+        "last_sold_date": np.where(sold, sold_date.strftime("%Y-%m-%d"), None),
+        "lot_sqft": lot_sqft,
+        "price_per_sqft": np.round(list_price / sqft, 0),
+        "latitude": 44.04 + rng.normal(0, 0.03, count),
+        "longitude": -123.0 + rng.normal(0, 0.03, count),
+        "stories": rng.integers(1, 3, count).astype(float),
+        "hoa_fee": hoa_fee,
+        "parking_garage": np.where(rng.random(count) < 0.6, "2", None),
+        "tax_history": tax_history,
+    })
+
+
+def synthetic_rows(count, listing_type="for_sale", seed=0, start=0, first_zipcode="97400"):
+    """
+    Normalized Property rows numbered start..start+count-1, ROWS_PER_ZIPCODE to a zip code,
+    ready for upsert_listings.
+    """
+    rows = []
+    offset, end = start, start + count
+    while offset < end:
+        block = min(ROWS_PER_ZIPCODE - offset % ROWS_PER_ZIPCODE, end - offset)
+        zipcode = zipcode_for(offset, first_zipcode)
+        frame = homeharvest_frame(block, zipcode, listing_type, seed, offset)
+        rows.extend(normalize_listings(frame, zipcode, listing_type).to_dict("records"))
+        offset += block
+    return rows
@@ -2,4 +2,10 @@
 import uvicorn
 
 if __name__ == "__main__":
+    # Once here, not in every reload of the app
+    from app.database import engine, SessionLocal
+    from app.migrations import migrate, backfill
+    migrate(engine)
+    with SessionLocal() as db:
+        backfill(db)
     uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
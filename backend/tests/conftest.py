@@ -1,11 +1,73 @@
+import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import ingest
 from app.main import app
+from app.models import Base
+from app.database import engine, ThreadedSession
+from app.migrations import migrate
+from app.http_cache import response_cache
+from app.routes.properties import get_db, get_async_db, get_session_factory
+
+@pytest.fixture(scope="session", autouse=True)
+def app_schema():
+    # The app no longer creates tables on import; tests without a DB override use the
+    # configured database, so bring it up to date the way a deploy does
+    migrate(engine)
 
 @pytest_asyncio.fixture
 async def async_client():
     client = TestClient(app)
     yield client
 
+@pytest.fixture
+def session_factory():
+    # Isolated in-memory database shared across threads for a single test
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def db_session(session_factory):
+    db = session_factory()
+
+    def override_get_db():
+        yield db
+
+    async def override_get_async_db():
+        yield ThreadedSession(db)
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # Inline scrapes get their own session on the same in-memory database
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    # Every test starts its data versions over, so bodies cached by another test could match
+    response_cache.clear()
+    yield db
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    app.dependency_overrides.pop(get_session_factory, None)
+    db.close()
+
+@pytest.fixture
+def scrape_calls(monkeypatch):
+    """Replaces the realtor.com scrape, recording (zipcode, listingtype) per call."""
+    calls = []
+
+    def fake_scrape(zipcode, listingtype, pastdays, raise_errors=False):
+        calls.append((zipcode, listingtype))
+        return []
+
+    monkeypatch.setattr(ingest, "scrape_realtor_dot_com", fake_scrape)
+    return calls
+
 # Use this command for testing: pytest -v -rA --color=yes --tb=short
 # Ctrl+Shift+P
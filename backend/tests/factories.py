@@ -0,0 +1,72 @@
+# Test data shared across test modules. Fixtures live in conftest.py; these are plain
+# values and builders, imported where needed.
+from pathlib import Path
+
+# Scrape export used as realistic scraper output
+FIXTURE = next(Path(__file__).resolve().parent.parent.glob("realator_97478_for_sale_*.csv"))
+
+
+# Body accepted by every deal analysis endpoint
+valid_payload = {
+    "purchase_price": 300000,
+    "expected_profit": 0,
+    "closing_costs": 6500,
+    "rehab": 25000,
+    "arv": 390000,
+
+    "cash": False,
+    "down_payment": 8.33,
+    "interest_rate": 3.27,
+    "lender_charges": 0,
+    "loan_fees_wrapped": True,
+    "pmi": 81,
+    "years_amortized": 30,
+    "rehab_months": 3,
+    "interest_only": False,
+
+    "refinance_loan_amount": 0,
+    "refinance_interest_rate": 0,
+    "refinance_lender_charges": 0,
+    "refinance_loan_fees_wrapped": True,
+    "refinance_pmi": 0,
+    "refinance_years_amortized": 0,
+
+    "monthly_rent": 2650,
+    "personal_rent_contribution": 0,
+    "other_monthly_income": 450,
+    "selling_months": 0,
+
+    "yearly_taxes": 2450,
+    "monthly_insurance": 1100,
+    "cleaning": 0,
+    "internet": 0,
+    "hoa_fees": 50,
+    "gas": 50,
+    "electricity": 50,
+    "watersewer": 50,
+    "garbage": 50,
+    "other": 0,
+
+    "vacancy": 5,
+    "maintenance": 5,
+    "capex": 5,
+    "managment": 5
+}
+
+
+# One listing row as ingest receives it, for tests that need data in the database
+def make_listing(i, **overrides):
+    home = {
+        "address": f"{i} Main St",
+        "zipcode": "97478",
+        "city": "Springfield",
+        "state": "OR",
+        "listing_price": 300000 + i,
+        "listing_terms": "sold",
+        "beds": 3.0,
+        "baths": 2.0,
+        "sqft": 1500,
+        "image_url": "",
+    }
+    home.update(overrides)
+    return home
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from app.routes.amortization import amortize, cached_schedule, deal_schedule, loan_schedule, yearly
+from app.routes.calculations import calculate_monthly_mortgage
+from app.routes.properties import DealInputs
+from tests.factories import valid_payload
+
+
+def reference_schedule(principal, annual_rate, months, io_months=0):
+    """Plain month-by-month loop to check the closed form against."""
+    rate = annual_rate / 100 / 12
+    amortizing = months - io_months
+    payment = principal * rate / (1 - (1 + rate) ** -amortizing)
+    balance, rows = principal, []
+    for month in range(1, months + 1):
+        interest = balance * rate
+        paid = 0.0 if month <= io_months else payment - interest
+        balance -= paid
+        rows.append((interest + paid, paid, interest, balance))
+    return np.array(rows)
+
+
+def test_matches_loop_and_level_payment():
+    schedule = loan_schedule(250_000, 6.5, 30)
+    expected = reference_schedule(250_000, 6.5, 360)
+    for column, name in enumerate(("payment", "principal", "interest", "balance")):
+        np.testing.assert_allclose(schedule[name], expected[:, column], atol=1e-6)
+
+    inputs = DealInputs(**dict(valid_payload, pmi=0))
+    payment, _, _ = calculate_monthly_mortgage(inputs)
+    assert deal_schedule(inputs)[1]["monthly_payment"] == pytest.approx(payment, abs=0.01)
+    assert schedule["balance"][-1] == pytest.approx(0, abs=1e-6)
+
+
+def test_interest_only_period():
+    schedule = loan_schedule(200_000, 6, 30, interest_only_months=120)
+    assert np.allclose(schedule["principal"][:120], 0)
+    assert np.allclose(schedule["interest"][:120], 1000)
+    np.testing.assert_allclose(schedule["balance"], reference_schedule(200_000, 6, 360, 120)[:, 3], atol=1e-6)
+
+
+def test_pmi_drops_at_78_percent_ltv():
+    schedule = loan_schedule(285_000, 6, 30, pmi=120, home_value=300_000)
+    starting_balance = np.concatenate([[285_000], schedule["balance"][:-1]])
+    assert np.all(schedule["pmi"][starting_balance > 234_000] == 120)
+    assert np.all(schedule["pmi"][starting_balance <= 234_000] == 0)
+
+
+def test_refinance_after_rehab():
+    inputs = DealInputs(**dict(valid_payload, interest_only=True, refinance_loan_amount=292_500,
+                               refinance_interest_rate=7, refinance_years_amortized=30, refinance_pmi=0))
+    schedule, summary = deal_schedule(inputs)
+    assert summary["refinance_month"] == 3
+    assert len(schedule["payment"]) == 3 + 360
+    assert np.allclose(schedule["principal"][:3], 0)
+    assert summary["cash_out"] == pytest.approx(292_500 - summary["loan_amount"], abs=0.01)
+    assert schedule["balance"][3] < 292_500 < schedule["balance"][2] + 292_500
+
+
+def test_yearly_buckets_and_batch_rows_match_single_loans():
+    loans = [(250_000, 6.5, 360, 0), (100_000, 4, 180, 12), (50_000, 0, 120, 0)]
+    batch = amortize(*[np.array(column) for column in zip(*loans)])
+    for row, (principal, rate, months, io) in enumerate(loans):
+        single = loan_schedule(principal, rate, months / 12, io)
+        np.testing.assert_allclose(batch["balance"][row, :months], single["balance"], atol=1e-6)
+        assert np.all(batch["payment"][row, months:] == 0)
+
+    years = yearly(batch)
+    assert years["balance"].shape == (3, 30)
+    np.testing.assert_allclose(years["interest"].sum(axis=1), batch["interest"].sum(axis=1))
+    assert years["principal"][2].sum() == pytest.approx(50_000)
+
+
+def test_schedules_are_memoized():
+    cached_schedule.cache_clear()
+    first = loan_schedule(123_456, 5, 30)
+    second = loan_schedule(123_456, 5, 30)
+    assert first is second and cached_schedule.cache_info().hits == 1
+    with pytest.raises(ValueError):
+        first["balance"][0] = 0
+
+
+def test_amortization_endpoints(async_client):
+    response = async_client.post("/amortization", json={"principal": 250_000, "annual_rate": 6.5, "years": 30,
+                                                        "granularity": "yearly"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["schedule"]["period"] == list(range(1, 31))
+    assert body["summary"]["monthly_payment"] == pytest.approx(1580.17, abs=0.01)
+
+    batch = async_client.post("/amortization/batch", json={"loans": [
+        {"principal": 250_000, "annual_rate": 6.5, "years": 30},
+        {"principal": 100_000, "annual_rate": 4, "years": 15},
+    ]}).json()
+    assert batch["months"] == [360, 180]
+    assert len(batch["schedule"]["balance"]) == 2 and len(batch["schedule"]["balance"][0]) == 30
+
+    deal = async_client.post("/analyze-buy-rent-deal/amortization", json={"base": valid_payload}).json()
+    assert len(deal["schedule"]["payment"]) == 360
+    # 8.33% down: PMI until the balance falls to 78% of the purchase price
+    drop = deal["summary"]["pmi_drop_month"]
+    assert deal["schedule"]["pmi"][drop - 2] == 81 and deal["schedule"]["pmi"][drop - 1] == 0
+    assert deal["schedule"]["balance"][drop - 2] <= 0.78 * valid_payload["purchase_price"]
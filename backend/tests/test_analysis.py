@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from app.routes.analysis import sweep_buy_rent
+from app.routes.properties import DealInputs, analyze_buy_rent_deal
+from tests.factories import valid_payload
+
+
+def test_sweep_grid_matches_scalar_endpoint(async_client):
+    request = {
+        "base": valid_payload,
+        "parameters": [
+            {"name": "interest_rate", "values": [3.0, 5.5, 7.25]},
+            {"name": "down_payment", "start": 5, "stop": 25, "steps": 5},
+            {"name": "monthly_rent", "values": [1800, 2650]},
+        ],
+    }
+    response = async_client.post("/analyze-buy-rent-deal/sweep", json=request)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["shape"] == [3, 5, 2]
+    assert data["axes"]["down_payment"] == [5.0, 10.0, 15.0, 20.0, 25.0]
+
+    for i, rate in enumerate(data["axes"]["interest_rate"]):
+        for j, down in enumerate(data["axes"]["down_payment"]):
+            for k, rent in enumerate(data["axes"]["monthly_rent"]):
+                deal = dict(valid_payload, interest_rate=rate, down_payment=down, monthly_rent=rent)
+                expected = analyze_buy_rent_deal(DealInputs(**deal))
+                assert data["monthly_cash_flow"][i][j][k] == expected["monthly_cash_flow"]
+                assert data["coc_return"][i][j][k] == expected["coc_return"]
+                assert data["cap_rate"][i][j][k] == expected["cap_rate"]
+
+
+def test_break_even_rent_zeroes_cash_flow(async_client):
+    request = {"base": valid_payload, "parameters": [{"name": "interest_rate", "values": [3, 6, 9]}]}
+    data = async_client.post("/analyze-buy-rent-deal/sweep", json=request).json()
+
+    for rate, rent in zip(data["axes"]["interest_rate"], data["break_even_rent"]):
+        deal = dict(valid_payload, interest_rate=rate, monthly_rent=rent)
+        assert analyze_buy_rent_deal(DealInputs(**deal))["monthly_cash_flow"] == pytest.approx(0, abs=0.05)
+
+
+def test_sweep_rejects_bad_parameters(async_client):
+    def sweep(parameters):
+        return async_client.post("/analyze-buy-rent-deal/sweep", json={"base": valid_payload, "parameters": parameters})
+
+    assert sweep([{"name": "cash", "values": [0, 1]}]).status_code == 422
+    assert sweep([{"name": "vacancy"}]).status_code == 422
+    assert sweep([{"name": "vacancy", "values": [1]}] * 2).status_code == 422
+    assert sweep([{"name": n, "start": 0, "stop": 1, "steps": 100} for n in
+                  ("vacancy", "capex", "pmi")]).status_code == 413
+
+
+def test_sweep_100k_points_match_scalar_endpoint():
+    base = DealInputs(**valid_payload)
+    axes = {
+        "interest_rate": np.linspace(3, 9, 50),
+        "down_payment": np.linspace(0, 30, 40),
+        "monthly_rent": np.linspace(1500, 3500, 50),
+    }
+    results = sweep_buy_rent(base, axes)
+    assert results["monthly_cash_flow"].shape == (50, 40, 50)
+
+    # Spot-check grid points against the per-deal calculation (timing lives in benchmarks.suite)
+    rng = np.random.default_rng(0)
+    for i, j, k in zip(rng.integers(0, 50, 100), rng.integers(0, 40, 100), rng.integers(0, 50, 100)):
+        deal = dict(valid_payload, interest_rate=axes["interest_rate"][i],
+                    down_payment=axes["down_payment"][j], monthly_rent=axes["monthly_rent"][k])
+        expected = analyze_buy_rent_deal(DealInputs(**deal))
+        for key in ("monthly_cash_flow", "coc_return", "cap_rate"):
+            assert results[key][i, j, k] == pytest.approx(expected[key], abs=0.01), (i, j, k, key)
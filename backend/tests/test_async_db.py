@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import async_session_factory, async_url, pool_options
+from app.ingest import upsert_listings
+from app.main import app
+from app.models import Base
+from app.routes.properties import get_async_db, get_db, get_session_factory
+from app.sync_state import mark_synced
+from tests.factories import make_listing
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    """Real AsyncSession (aiosqlite) for the read endpoints, sync session for sync state."""
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    upsert_listings(db, [make_listing(i, listing_terms="for_sale", latitude=44.05, longitude=-123.0)
+                         for i in range(12)])
+    mark_synced(db, "97478", "sold")
+
+    def override_get_db():
+        yield db
+
+    async def override_get_async_db():
+        async with async_session_factory(url)() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_session_factory] = lambda: sessionmaker(bind=engine)
+    yield db
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    app.dependency_overrides.pop(get_session_factory, None)
+    db.close()
+    engine.dispose()
+
+
+def test_read_endpoints_on_async_session(async_client, file_db):
+    rows = async_client.get("/properties", params={"zipcode": "97478"}).json()
+    assert len(rows) == 12
+
+    page = async_client.get("/properties", params={"zipcode": "97478", "limit": 5, "sort": "price"}).json()
+    assert len(page["items"]) == 5 and page["next_cursor"]
+
+    property_id = rows[0]["id"]
+    detail = async_client.get(f"/property/{property_id}/buy-rent")
+    assert detail.status_code == 200 and detail.json()["address"] == rows[0]["address"]
+    assert async_client.get("/property/999999/buy-rent").status_code == 404
+
+    comps = async_client.get("/comparables", params={
+        "zipcode": "97478", "sqft": 1500, "lot_size": 0, "year_built": 0, "beds": 3, "baths": 2,
+        "home_type": "Single Family", "address": "nowhere",
+    })
+    assert comps.status_code == 200
+
+
+def test_async_url_and_pool_options():
+    assert async_url("postgresql://u:p@db:5432/app?sslmode=require").render_as_string(hide_password=False) \
+        == "postgresql+asyncpg://u:p@db:5432/app?ssl=require"
+    assert async_url("postgresql+psycopg2://db/app").drivername == "postgresql+asyncpg"
+    assert async_url("sqlite:///local.db").drivername == "sqlite+aiosqlite"
+    assert set(pool_options("postgresql://db/app")) == {
+        "pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping"}
+    assert set(pool_options("sqlite://")) == {"pool_pre_ping"}
@@ -0,0 +1,155 @@
+import threading
+import time
+import pandas as pd
+import pytest
+from app import bulk_scrape, scraper
+from app.bulk_scrape import BulkScraper, RateLimiter
+from app.models import Property, SyncState
+from app.routes import sync
+from tests.factories import FIXTURE
+
+LATENCY = 0.2
+
+
+@pytest.fixture
+def fake_scrape(monkeypatch):
+    """
+    scrape_property with injected latency; zip codes in `failures` fail that many times first.
+    `in_flight` tracks how many calls overlap, and the most that ever did.
+    """
+    frame = pd.read_csv(FIXTURE, dtype={"zip_code": str}).head(5)
+    calls = []
+    failures = {}
+    in_flight = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fake_scrape_property(location, listing_type, past_days):
+        calls.append((location, time.monotonic()))
+        with lock:
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        try:
+            time.sleep(LATENCY)
+        finally:
+            with lock:
+                in_flight["now"] -= 1
+        if failures.get(location, 0) > 0:
+            failures[location] -= 1
+            raise ConnectionError("upstream reset")
+        rows = frame.copy()
+        rows["zip_code"] = location
+        return rows
+
+    monkeypatch.setattr(scraper, "scrape_property", fake_scrape_property)
+    return calls, failures, in_flight
+
+
+ZIPCODES = [f"9740{i}" for i in range(8)]
+
+
+def run(session_factory, workers, **kwargs):
+    settings = dict(rps=0, retries=0, backoff=0.01, timeout=5)
+    settings.update(kwargs)
+    bulk = BulkScraper(session_factory=session_factory, workers=workers, **settings)
+    started = time.perf_counter()
+    result = bulk.run(ZIPCODES, "sold")
+    return result.to_dict(), time.perf_counter() - started
+
+
+def test_scrapes_overlap_with_workers(session_factory, fake_scrape):
+    _, _, in_flight = fake_scrape
+    serial, _ = run(session_factory, workers=1)
+    assert in_flight["peak"] == 1
+
+    # Each call sleeps LATENCY, long enough for every worker to pick up a zip code meanwhile
+    parallel, _ = run(session_factory, workers=4)
+    assert in_flight["peak"] == 4
+    assert serial["succeeded"] == parallel["succeeded"] == len(ZIPCODES)
+
+    db = session_factory()
+    assert db.query(Property).count() == 5 * len(ZIPCODES)
+    assert db.query(SyncState).count() == len(ZIPCODES)
+
+
+def test_rate_limit_spaces_out_calls(session_factory, fake_scrape):
+    calls, _, _ = fake_scrape
+    run(session_factory, workers=8, rps=10)
+    starts = sorted(started for _, started in calls)
+    # One token up front, then one every 0.1s
+    assert starts[-1] - starts[0] >= 0.1 * (len(ZIPCODES) - 1) * 0.9
+
+
+def test_retries_then_records_failures(session_factory, fake_scrape):
+    calls, failures, _ = fake_scrape
+    failures.update({"97400": 1, "97401": 5})
+    summary, _ = run(session_factory, workers=4, retries=2)
+
+    by_zip = {result["zipcode"]: result for result in summary["zipcodes"]}
+    assert by_zip["97400"]["state"] == "done" and by_zip["97400"]["attempts"] == 2
+    assert by_zip["97401"]["state"] == "failed" and by_zip["97401"]["attempts"] == 3
+    assert "upstream reset" in by_zip["97401"]["error"]
+    assert summary["succeeded"] == len(ZIPCODES) - 1
+
+
+def test_timeout_abandons_slow_zip(session_factory, fake_scrape):
+    summary, elapsed = run(session_factory, workers=8, timeout=LATENCY / 2)
+    assert summary["failed"] == len(ZIPCODES)
+    assert {result["state"] for result in summary["zipcodes"]} == {"timeout"}
+    assert elapsed < LATENCY
+
+
+def test_results_stream_as_each_zip_finishes(session_factory, fake_scrape):
+    seen = []
+    bulk = BulkScraper(session_factory=session_factory, workers=1, rps=0, retries=0)
+    check = session_factory()
+
+    def on_result(result):
+        # Already committed when the callback fires, before later zip codes are scraped
+        seen.append(check.query(Property).filter(Property.zipcode == result.zipcode).count())
+
+    bulk.run(ZIPCODES[:3], "sold", on_result=on_result)
+    assert seen == [5, 5, 5]
+
+
+def wait_done(client, batch_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while client.get(f"/sync/batch/{batch_id}").json()["state"] != "done":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_batch_endpoint(async_client, session_factory, fake_scrape, monkeypatch):
+    monkeypatch.setattr(sync, "bulk_scraper", BulkScraper(session_factory=session_factory, workers=4, rps=0))
+    response = async_client.post("/sync/batch", json={"zipcodes": ZIPCODES[:4], "listing_type": "sold"})
+    assert response.status_code == 202
+    batch_id = response.json()["batch_id"]
+
+    wait_done(async_client, batch_id)
+    assert async_client.get(f"/sync/batch/{batch_id}").json()["succeeded"] == 4
+
+    assert async_client.post("/sync/batch", json={"zipcodes": ["nope"]}).status_code == 422
+    assert async_client.get("/sync/batch/missing").status_code == 404
+
+
+def test_one_batch_runs_at_a_time(async_client, session_factory, fake_scrape, monkeypatch):
+    bulk = BulkScraper(session_factory=session_factory, workers=2, rps=0)
+    monkeypatch.setattr(sync, "bulk_scraper", bulk)
+    first = async_client.post("/sync/batch", json={"zipcodes": ZIPCODES[:4]}).json()["batch_id"]
+
+    # Refused while the first batch still runs, pointing at it
+    second = async_client.post("/sync/batch", json={"zipcodes": ZIPCODES[4:]})
+    assert second.status_code == 409
+    assert first in second.json()["detail"] and second.headers["Location"] == f"/sync/batch/{first}"
+
+    wait_done(async_client, first)
+    again = async_client.post("/sync/batch", json={"zipcodes": ZIPCODES[4:]})
+    assert again.status_code == 202
+    wait_done(async_client, again.json()["batch_id"])
+
+
+def test_rate_limiter_without_limit_never_blocks():
+    limiter = RateLimiter(0)
+    started = time.perf_counter()
+    for _ in range(1000):
+        limiter.acquire()
+    assert time.perf_counter() - started < 0.1
@@ -63,3 +63,53 @@ def test_calculate_noi_zero_income():
     inputs = DealInputs(**zero_income_payload)
     noi, _, _ = calculate_noi(inputs)
     assert noi < 0
+
+def random_deals(count, seed=7):
+    import random
+    rng = random.Random(seed)
+    deals = []
+    for i in range(count):
+        deal = valid_payload.copy()
+        deal.update({
+            "purchase_price": rng.choice([0, rng.uniform(50000, 900000)]),
+            "closing_costs": rng.uniform(0, 15000),
+            "rehab": rng.uniform(0, 60000),
+            "cash": rng.random() < 0.2,
+            "down_payment": rng.choice([0, 3.5, 20, rng.uniform(0, 100)]),
+            "interest_rate": rng.choice([0, rng.uniform(2, 9)]),
+            "lender_charges": rng.uniform(0, 5000),
+            "loan_fees_wrapped": rng.random() < 0.5,
+            "pmi": rng.uniform(0, 200),
+            "years_amortized": rng.choice([0, 15, 30]),
+            "monthly_rent": rng.uniform(0, 5000),
+            "yearly_taxes": rng.uniform(0, 8000),
+            "vacancy": rng.uniform(0, 10),
+        })
+        deals.append(deal)
+    return deals
+
+def test_batch_matches_scalar_endpoint(async_client):
+    from app.routes.properties import analyze_buy_rent_deal
+    deals = random_deals(1000)
+    response = async_client.post("/analyze-buy-rent-deal/batch", json={"deals": deals})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == len(deals)
+
+    for i, deal in enumerate(deals):
+        expected = analyze_buy_rent_deal(DealInputs(**deal))
+        for key, value in expected.items():
+            assert data[key][i] == value, (i, key)
+
+def test_batch_accepts_columns(async_client):
+    deals = random_deals(5)
+    columns = {field: [deal[field] for deal in deals] for field in valid_payload}
+    by_columns = async_client.post("/analyze-buy-rent-deal/batch", json={"columns": columns}).json()
+    by_rows = async_client.post("/analyze-buy-rent-deal/batch", json={"deals": deals}).json()
+    assert by_columns == by_rows
+
+def test_batch_rejects_ragged_columns(async_client):
+    columns = {field: [value] for field, value in valid_payload.items()}
+    columns["monthly_rent"] = [1, 2]
+    response = async_client.post("/analyze-buy-rent-deal/batch", json={"columns": columns})
+    assert response.status_code == 422
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from app.comps import CompsCluster, CompsIndex, comps_index, to_km
+from app.ingest import upsert_listings
+from tests.factories import make_listing
+
+
+def sold(i, sqft, year_built=1990, beds=3.0, baths=2.0, lot_size=0.2, **overrides):
+    return make_listing(i, sqft=sqft, year_built=year_built, beds=beds, baths=baths, lot_size=lot_size,
+                        home_type="Single Family", latitude=44.05, longitude=-122.95, **overrides)
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    comps_index.invalidate()
+    yield
+    comps_index.invalidate()
+
+
+def brute_force(cluster, subject, weights, k):
+    x_km, y_km = to_km(subject["latitude"], subject["longitude"], cluster.origin)
+    query = np.array([subject["sqft"], subject["lot_size"], subject["year_built"],
+                      subject["beds"], subject["baths"], x_km, y_km]) / cluster.scale
+    distances = (((cluster.matrix.astype(float) - query) ** 2) * weights).sum(axis=1)
+    order = np.argsort(distances)[:k]
+    return cluster.ids[order].tolist(), np.sqrt(distances[order])
+
+
+def synthetic_cluster(count, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = list(zip(range(count), rng.uniform(600, 4000, count), rng.uniform(0.05, 2, count),
+                    rng.integers(1900, 2024, count), rng.integers(1, 6, count), rng.integers(1, 4, count),
+                    44 + rng.normal(0, 0.02, count), -123 + rng.normal(0, 0.02, count)))
+    return CompsCluster.from_rows(rows)
+
+
+def test_nearest_matches_brute_force():
+    cluster = synthetic_cluster(20_000)
+    rng = np.random.default_rng(1)
+    weights = np.array([3, 1, 1.5, 1, 1, 2, 2])
+    for _ in range(20):
+        subject = {"sqft": rng.uniform(500, 4200), "lot_size": rng.uniform(0, 2),
+                   "year_built": int(rng.integers(1900, 2024)), "beds": 3, "baths": 2,
+                   "latitude": 44.01, "longitude": -123.0}
+        ids, distances = cluster.nearest(subject, k=10)
+        expected_ids, expected_distances = brute_force(cluster, subject, weights, 10)
+        assert distances == pytest.approx(expected_distances, abs=1e-3)
+        assert set(ids.tolist()) == set(expected_ids)
+
+
+def test_pruned_scan_matches_brute_force_at_100k_rows():
+    # Large enough that nearest() narrows the scan by sqft; timing lives in benchmarks.suite
+    cluster = synthetic_cluster(100_000, seed=2)
+    weights = np.array([3, 1, 1.5, 1, 1, 2, 2])
+    for sqft in (300, 600, 1500, 2750.5, 3999, 6000):
+        subject = {"sqft": sqft, "lot_size": 0.2, "year_built": 1990, "beds": 3, "baths": 2,
+                   "latitude": 44.01, "longitude": -123.0}
+        ids, distances = cluster.nearest(subject, k=10)
+        expected_ids, expected_distances = brute_force(cluster, subject, weights, 10)
+        assert distances == pytest.approx(expected_distances, abs=1e-3), sqft
+        assert set(ids.tolist()) == set(expected_ids), sqft
+
+
+def test_similar_endpoint_ranks_and_excludes_subject(async_client, db_session):
+    upsert_listings(db_session, [
+        sold(1, 1500),
+        sold(2, 1520),
+        sold(3, 2600, year_built=1950, beds=5, baths=3),
+        sold(4, 1400, listing_terms="for_sale"),
+    ])
+    response = async_client.get("/comparables/similar", params={
+        "zipcode": "97478", "sqft": 1500, "lot_size": 0.2, "year_built": 1990, "beds": 3,
+        "baths": 2, "home_type": "Single Family", "address": "1 Main St", "k": 5,
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert [row["address"] for row in data] == ["2 Main St", "3 Main St"]
+    assert data[0]["similarity"] > data[1]["similarity"]
+
+
+def test_sync_invalidates_cluster(db_session):
+    index = CompsIndex()
+    upsert_listings(db_session, [sold(1, 1500)])
+    subject = {"sqft": 1500, "lot_size": 0.2, "year_built": 1990, "beds": 3, "baths": 2}
+    assert len(comps_index.nearest(db_session, "97478", "Single Family", subject)) == 1
+
+    upsert_listings(db_session, [sold(2, 1510)])
+    assert len(comps_index.nearest(db_session, "97478", "Single Family", subject)) == 2
+    assert index.cluster(db_session, "97404", "Single Family").ids.size == 0
@@ -0,0 +1,72 @@
+import pytest
+from app.enrichment import DEFAULT_ASSUMPTIONS, refresh_metrics
+from app.ingest import upsert_listings
+from app.models import Property
+from app.query_plans import explain, hot_queries, is_sequential_scan
+from app.routes.properties import DealInputs, analyze_buy_rent_deal
+from app.sync_state import mark_synced
+from tests.factories import make_listing
+
+
+@pytest.fixture
+def listings(db_session):
+    upsert_listings(db_session, [
+        make_listing(i, listing_terms="for_sale", listing_price=200_000 + 15_000 * i, sqft=1200 + 40 * (i % 9),
+                     annual_tax=1800 + 50 * i, hoa_fee=25 * (i % 3))
+        for i in range(30)
+    ] + [make_listing(100 + i, zipcode="97404", listing_terms="for_sale") for i in range(5)])
+    mark_synced(db_session, "97478", "sold")
+    return db_session
+
+
+def test_ingest_matches_deal_analysis(listings):
+    prop = listings.query(Property).filter(Property.address == "7 Main St").one()
+    a = DEFAULT_ASSUMPTIONS
+    deal = dict.fromkeys(DealInputs.model_fields, 0)
+    deal.update({
+        "purchase_price": prop.listing_price, "closing_costs": prop.listing_price * a["closing_costs"] / 100,
+        "cash": False, "loan_fees_wrapped": False, "interest_only": False, "refinance_loan_fees_wrapped": False,
+        "down_payment": a["down_payment"], "interest_rate": a["interest_rate"],
+        "years_amortized": a["years_amortized"], "monthly_rent": prop.sqft * a["rent_per_sqft"],
+        "yearly_taxes": prop.annual_tax, "monthly_insurance": prop.listing_price * a["insurance_rate"] / 1200,
+        "hoa_fees": prop.hoa_fee, "vacancy": a["vacancy"], "maintenance": a["maintenance"],
+        "capex": a["capex"], "managment": a["managment"],
+    })
+    expected = analyze_buy_rent_deal(DealInputs(**deal))
+
+    assert prop.est_noi == pytest.approx(expected["noi"], abs=0.01)
+    assert prop.est_cap_rate == pytest.approx(expected["cap_rate"], abs=0.01)
+    assert prop.est_monthly_cash_flow == pytest.approx(expected["monthly_cash_flow"], abs=0.01)
+    assert prop.est_coc_return == pytest.approx(expected["coc_return"], abs=0.01)
+    assert prop.metrics_version
+
+
+def test_rank_and_filter_by_metrics(async_client, listings):
+    page = async_client.get("/properties", params={"zipcode": "97478", "sort": "cash_flow", "order": "desc",
+                                                   "limit": 5}).json()
+    flows = [item["est_monthly_cash_flow"] for item in page["items"]]
+    best = max(prop.est_monthly_cash_flow for prop in listings.query(Property).filter(Property.zipcode == "97478"))
+    assert flows == sorted(flows, reverse=True) and flows[0] == best
+
+    rows = async_client.get("/properties", params={"zipcode": "97478", "minCapRate": 4}).json()
+    assert rows and all(row["est_cap_rate"] >= 4 for row in rows)
+
+
+def test_refresh_only_recomputes_changed_assumptions(listings):
+    assert refresh_metrics(listings) == 0
+
+    overrides = {"97404": {"rent_per_sqft": 1.6}}
+    before = listings.query(Property).filter(Property.zipcode == "97404").first().est_rent
+    assert refresh_metrics(listings, overrides) == 5
+    assert refresh_metrics(listings, overrides) == 0
+
+    listings.expire_all()
+    assert listings.query(Property).filter(Property.zipcode == "97404").first().est_rent > before
+
+    assert refresh_metrics(listings, {"default": {"interest_rate": 6}}) == 35
+
+
+def test_top_cash_flow_uses_index(db_session):
+    plan = explain(db_session, hot_queries("97478")["properties_top_cash_flow"])
+    assert not is_sequential_scan(plan), plan
+    assert not any("TEMP B-TREE" in line for line in plan), plan
@@ -0,0 +1,112 @@
+import random
+import pytest
+from sqlalchemy import select
+from app.geo import bounding_box, covering_cells, encode_geohash, haversine_km, next_prefix, GEOHASH_ALPHABET
+from app.ingest import backfill_geohashes, upsert_listings
+from app.models import Property
+from app.query_plans import explain, is_sequential_scan
+from app.queries import cell_range, properties_query
+from app.sync_state import data_versions_query, ANY_ZIPCODE
+from tests.factories import make_listing
+
+# Springfield, OR
+CENTER = (44.0462, -122.9300)
+
+
+def test_encode_geohash_known_value():
+    assert encode_geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_covering_cells_contain_every_point_in_box():
+    rng = random.Random(3)
+    for radius in (0.5, 2, 10, 50):
+        box = bounding_box(*CENTER, radius)
+        cells = covering_cells(*box)
+        assert len(cells) <= 32
+        for _ in range(200):
+            lat = rng.uniform(box[0], box[2])
+            lon = rng.uniform(box[1], box[3])
+            assert any(encode_geohash(lat, lon).startswith(cell) for cell in cells)
+
+
+def test_cell_ranges_avoid_punctuation(db_session):
+    assert next_prefix("9q8yy") == "9q8yz"
+    assert next_prefix("c2z") == "c3"
+    assert next_prefix("bzz") == "c"
+    assert next_prefix("zz") is None
+
+    # A cell ending in z used to end its range at "c2z~", which non-C collations sort
+    # before "c2zzzzzzz"; the bounds now only hold geohash characters
+    bounds = cell_range("c2z").compile(compile_kwargs={"literal_binds": True})
+    assert "~" not in str(bounds) and set(next_prefix("c2z")) <= set(GEOHASH_ALPHABET)
+
+    hashes = ["c2yzzzzzz", "c2z000000", "c2zzzzzzz", "c30000000"]
+    upsert_listings(db_session, [make_listing(i, geohash=value) for i, value in enumerate(hashes)])
+    found = db_session.execute(select(Property.geohash).where(cell_range("c2z"))).scalars().all()
+    assert sorted(found) == ["c2z000000", "c2zzzzzzz"]
+    assert len(db_session.execute(select(Property.id).where(cell_range("z"))).all()) == 0
+
+
+def test_haversine_distance():
+    # Eugene to Portland, roughly 170 km
+    assert haversine_km(44.0521, -123.0868, [45.5152], [-122.6784])[0] == pytest.approx(165.7, abs=1.5)
+
+
+def test_radius_search_spans_zipcodes(async_client, db_session):
+    upsert_listings(db_session, [
+        make_listing(1, zipcode="97478", listing_terms="for_sale", latitude=44.0470, longitude=-122.9310),
+        make_listing(2, zipcode="97477", listing_terms="for_sale", latitude=44.0600, longitude=-122.9500),
+        make_listing(3, zipcode="97403", listing_terms="for_sale", latitude=44.0300, longitude=-123.0700),
+        make_listing(4, zipcode="97478", listing_terms="sold", latitude=44.0465, longitude=-122.9305),
+        make_listing(5, zipcode="97478", listing_terms="for_sale", latitude=0.0, longitude=0.0),
+    ])
+    response = async_client.get("/properties", params={"lat": CENTER[0], "lon": CENTER[1], "radiusKm": 3})
+    assert response.status_code == 200
+    data = response.json()
+    assert [row["address"] for row in data] == ["1 Main St", "2 Main St"]
+    assert data[0]["distance_km"] < data[1]["distance_km"] <= 3
+
+    box = {"minLat": 44.0, "minLon": -123.1, "maxLat": 44.1, "maxLon": -122.9}
+    data = async_client.get("/properties", params=box).json()
+    assert {row["address"] for row in data} == {"1 Main St", "2 Main St", "3 Main St"}
+
+
+def test_location_params_must_be_complete(async_client):
+    assert async_client.get("/properties", params={"lat": 44.0, "lon": -123.0}).status_code == 422
+    assert async_client.get("/properties", params={"minLat": 44.0}).status_code == 422
+    assert async_client.get("/properties").status_code == 422
+
+
+def test_radius_comparables(async_client, db_session):
+    upsert_listings(db_session, [
+        make_listing(1, zipcode="97478", listing_terms="sold", home_type="Single Family", sqft=1500,
+                     lot_size=0.2, year_built=1990, latitude=44.0470, longitude=-122.9310),
+        make_listing(2, zipcode="97477", listing_terms="sold", home_type="Single Family", sqft=1500,
+                     lot_size=0.2, year_built=1990, latitude=44.0500, longitude=-122.9350),
+    ])
+    response = async_client.get("/comparables", params={
+        "sqft": 1500, "lot_size": 0.2, "year_built": 1990, "beds": 3, "baths": 2,
+        "home_type": "Single Family", "address": "9 Other St",
+        "lat": CENTER[0], "lon": CENTER[1], "radiusKm": 2,
+    })
+    assert response.status_code == 200
+    assert [row["zipcode"] for row in response.json()] == ["97478", "97477"]
+
+
+def test_radius_query_uses_geohash_index(db_session):
+    stmt = properties_query(box=bounding_box(*CENTER, 2))
+    plan = explain(db_session, stmt)
+    assert not is_sequential_scan(plan), plan
+
+
+def test_backfill_geohashes(db_session):
+    upsert_listings(db_session, [make_listing(1, latitude=44.0470, longitude=-122.9310)])
+    db_session.query(Property).update({"geohash": None})
+    db_session.commit()
+
+    before = dict(db_session.execute(data_versions_query("97478")).all())
+    assert backfill_geohashes(db_session) == 1
+    assert db_session.query(Property).one().geohash == encode_geohash(44.0470, -122.9310)
+    # Cached responses and ETags for the zip code no longer validate
+    after = dict(db_session.execute(data_versions_query("97478")).all())
+    assert after["97478"] == before["97478"] + 1 and after[ANY_ZIPCODE] == before[ANY_ZIPCODE] + 1
@@ -0,0 +1,83 @@
+from app.http_cache import ResponseCache
+from app.ingest import upsert_listings
+from app.models import Property
+from app.routes import properties
+from tests.factories import make_listing
+
+
+def for_sale(i, **overrides):
+    return make_listing(i, listing_terms="for_sale", **overrides)
+
+
+def test_etag_follows_zip_data_version(async_client, db_session, scrape_calls):
+    upsert_listings(db_session, [for_sale(i) for i in range(3)])
+
+    first = async_client.get("/properties?zipcode=97478")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+
+    # Same data: 304 with no body, carrying the validators and the sync status
+    again = async_client.get("/properties?zipcode=97478", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["ETag"] == etag and again.headers["X-Cache"] == "HIT"
+
+    # Another zip code's sync leaves this one's ETag alone
+    upsert_listings(db_session, [for_sale(1, zipcode="97404")])
+    assert async_client.get("/properties?zipcode=97478", headers={"If-None-Match": etag}).status_code == 304
+
+    # An unchanged re-sync writes nothing and keeps the ETag; a price change moves it
+    upsert_listings(db_session, [for_sale(1)])
+    assert async_client.get("/properties?zipcode=97478", headers={"If-None-Match": etag}).status_code == 304
+    upsert_listings(db_session, [for_sale(1, listing_price=1)])
+    changed = async_client.get("/properties?zipcode=97478", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert 1 in {home["listing_price"] for home in changed.json()}
+
+
+def test_not_modified_skips_listing_queries(async_client, db_session, scrape_calls, monkeypatch):
+    home = Property(**make_listing(1))
+    db_session.add(home)
+    db_session.commit()
+    url = f"/property/{home.id}/buy-rent"
+    etag = async_client.get(url).headers["ETag"]
+
+    def unreachable(*args, **kwargs):
+        raise AssertionError("listing query built on a 304")
+
+    monkeypatch.setattr(properties, "comparables_query", unreachable)
+    params = {"sqft": 1500, "lot_size": 0.2, "year_built": 1990, "beds": 3, "baths": 2, "home_type": "SINGLE_FAMILY",
+              "address": "9 Elm St", "zipcode": "97478"}
+    assert async_client.get("/comparables", params=params, headers={"If-None-Match": etag}).status_code == 304
+    assert async_client.get(url, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+
+def test_response_cache_serves_stored_body(async_client, db_session, scrape_calls, monkeypatch):
+    upsert_listings(db_session, [for_sale(i) for i in range(3)])
+    first = async_client.get("/properties?zipcode=97478&sort=price")
+    assert len(first.json()) == 3
+
+    def unreachable(*args, **kwargs):
+        raise AssertionError("listing query built for a cached body")
+
+    monkeypatch.setattr(properties, "properties_query", unreachable)
+    # Parameter order doesn't matter; the body is replayed byte for byte
+    cached = async_client.get("/properties?sort=price&zipcode=97478")
+    assert cached.status_code == 200 and cached.content == first.content
+    assert cached.headers["ETag"] == first.headers["ETag"]
+
+
+def test_response_cache_evicts_by_size():
+    cache = ResponseCache(max_bytes=100)
+    cache.put("a", "1", b"x" * 20, "application/json")
+    cache.put("b", "1", b"x" * 20, "application/json")
+    assert cache.get("a", "1") is not None  # a becomes most recent
+    cache.put("c", "1", b"x" * 20, "application/json")
+    cache.put("d", "1", b"x" * 20, "application/json")
+    cache.put("e", "1", b"x" * 20, "application/json")
+    cache.put("f", "1", b"x" * 20, "application/json")
+    assert cache.size <= 100 and cache.get("b", "1") is None and cache.get("a", "1") is not None
+
+    # Stale ETags miss, and bodies too large for their share are never kept
+    assert cache.get("a", "2") is None
+    cache.put("big", "1", b"x" * 60, "application/json")
+    assert cache.get("big", "1") is None
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+from app.images import ImageResolver, resolve_property_images
+from app.ingest import upsert_listings
+from app.models import ImageCache, Property
+from app.sync_state import utcnow
+from tests.factories import make_listing
+
+
+class StubMicrolink(BaseHTTPRequestHandler):
+    """Answers like Microlink: pages with "found" in the URL have an image, "error" ones fail."""
+    requests = []
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = parse_qs(urlparse(self.path).query)["url"][0]
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append(url)
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.in_flight -= 1
+
+        if "error" in url:
+            self.send_response(500)
+            self.end_headers()
+            return
+        image = {"url": f"https://img.example/{url.rsplit('/', 1)[-1]}.jpg"} if "found" in url else None
+        body = json.dumps({"status": "success", "data": {"image": image}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def microlink():
+    StubMicrolink.requests = []
+    StubMicrolink.peak = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubMicrolink)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def listings(db_session):
+    kinds = ["found"] * 20 + ["missing"] * 5 + ["error"] * 3
+    upsert_listings(db_session, [
+        make_listing(i, property_url=f"https://www.realtor.com/{kind}/{i}") for i, kind in enumerate(kinds)
+    ] + [make_listing(99, property_url=None)])
+    return db_session
+
+
+def images(db):
+    return {prop.property_url: prop.image_url for prop in db.query(Property) if prop.property_url}
+
+
+def test_backfills_images_and_caches_every_answer(listings, microlink):
+    counts = resolve_property_images(listings, microlink_url=microlink, batch_size=10, concurrency=4)
+    assert counts == {"candidates": 28, "cached": 0, "found": 20, "missing": 5, "error": 3, "updated": 20}
+    assert images(listings)["https://www.realtor.com/found/3"] == "https://img.example/3.jpg"
+    assert images(listings)["https://www.realtor.com/missing/21"] == ""
+    assert StubMicrolink.peak <= 4
+    assert listings.query(ImageCache).count() == 28
+
+    # Negative and error entries are served from the cache; nothing is asked again
+    StubMicrolink.requests.clear()
+    counts = resolve_property_images(listings, microlink_url=microlink)
+    assert counts["candidates"] == 8 and counts["cached"] == 8
+    assert StubMicrolink.requests == []
+
+
+def test_expired_entries_are_fetched_again(listings, microlink):
+    resolve_property_images(listings, microlink_url=microlink)
+    for entry in listings.query(ImageCache).filter(ImageCache.status == "error"):
+        entry.expires_at = utcnow() - timedelta(seconds=1)
+    listings.commit()
+
+    StubMicrolink.requests.clear()
+    counts = resolve_property_images(listings, microlink_url=microlink)
+    assert sorted(StubMicrolink.requests) == sorted(f"https://www.realtor.com/error/{i}" for i in range(25, 28))
+    assert counts["error"] == 3 and counts["cached"] == 5
+
+
+def test_resolver_runs_after_ingest(session_factory, microlink, monkeypatch):
+    resolver = ImageResolver(session_factory=session_factory, microlink_url=microlink, concurrency=4)
+    monkeypatch.setattr("app.ingest.image_resolver", resolver)
+    resolver.start()
+    try:
+        db = session_factory()
+        upsert_listings(db, [make_listing(i, property_url=f"https://www.realtor.com/found/{i}") for i in range(3)])
+        resolver.wait()
+    finally:
+        resolver.stop()
+
+    db.expire_all()
+    assert set(images(db).values()) == {f"https://img.example/{i}.jpg" for i in range(3)}
@@ -0,0 +1,72 @@
+import pytest
+from app import importer
+from app.importer import import_file, infer_source, read_chunks
+from app.models import ImportProgress, MarketStats, Property
+from tests.factories import FIXTURE
+
+
+def test_infer_source():
+    assert infer_source("/data/realator_97478_for_sale_20250402_150938.csv") == ("97478", "for_sale")
+    assert infer_source("listings.csv") == (None, None)
+
+
+def test_read_chunks_streams_and_skips():
+    sizes = [len(chunk) for chunk in read_chunks(str(FIXTURE), chunk_size=20)]
+    assert sizes == [20, 20, 20, 20, 6]
+    resumed = list(read_chunks(str(FIXTURE), chunk_size=20, skip_rows=45))
+    assert sum(len(chunk) for chunk in resumed) == 41
+    assert resumed[0]["zip_code"].iloc[0] == "97478"
+
+
+def test_import_is_idempotent(db_session):
+    summary = import_file(db_session, str(FIXTURE), chunk_size=25)
+    assert summary["status"] == "done"
+    assert summary["rows"] == 86 and summary["method"] == "insert"
+    stored = db_session.query(Property).count()
+    assert summary["inserted"] == stored
+    assert db_session.query(Property).filter(Property.listing_terms == "for_sale").count() == stored
+    assert db_session.query(MarketStats).count() > 0
+
+    # Finished files are skipped; forcing reads them again but writes nothing
+    assert import_file(db_session, str(FIXTURE))["status"] == "already imported"
+    again = import_file(db_session, str(FIXTURE), force=True)
+    assert again["inserted"] == again["updated"] == 0 and again["unchanged"] == stored
+    assert db_session.query(Property).count() == stored
+
+
+def test_interrupted_import_resumes_after_last_chunk(db_session, monkeypatch):
+    calls = []
+    upsert = importer.upsert_listings
+
+    def failing_upsert(db, listings):
+        calls.append(len(listings))
+        if len(calls) == 3:
+            raise RuntimeError("connection lost")
+        return upsert(db, listings)
+
+    monkeypatch.setattr(importer, "upsert_listings", failing_upsert)
+    with pytest.raises(RuntimeError):
+        import_file(db_session, str(FIXTURE), chunk_size=30)
+    db_session.rollback()
+    progress = db_session.query(ImportProgress).one()
+    assert (progress.rows_done, progress.status) == (60, "running")
+
+    monkeypatch.setattr(importer, "upsert_listings", upsert)
+    summary = import_file(db_session, str(FIXTURE), chunk_size=30)
+    assert summary["resumed_from"] == 60 and summary["rows"] == 26
+    assert db_session.query(ImportProgress).one().status == "done"
+
+    fresh = import_file(db_session, str(FIXTURE), force=True)
+    assert fresh["inserted"] == 0
+    assert db_session.query(Property).count() == fresh["unchanged"]
+
+
+def test_parquet_import(db_session, tmp_path):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    path = tmp_path / "realator_97478_sold_20250101_000000.parquet"
+    pd.read_csv(FIXTURE, dtype={"zip_code": str}).to_parquet(path)
+    summary = import_file(db_session, str(path), chunk_size=40)
+    assert summary["rows"] == 86
+    assert db_session.query(Property).filter(Property.listing_terms == "sold").count() == summary["inserted"]
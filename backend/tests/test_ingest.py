@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import event
+from app.ingest import upsert_listings
+from app.models import Property, PropertyHistory
+from tests.factories import make_listing
+
+
+def count_statements(db):
+    statements = []
+    engine = db.get_bind()
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_execute)
+
+
+def test_upsert_inserts_new_listings(db_session):
+    counts = upsert_listings(db_session, [make_listing(i) for i in range(3)])
+    assert counts == {"inserted": 3, "updated": 0, "unchanged": 0, "skipped": 0, "changes": {}}
+    assert db_session.query(Property).count() == 3
+
+
+def test_upsert_updates_existing_and_skips_bad_rows(db_session):
+    upsert_listings(db_session, [make_listing(1)])
+
+    listings = [
+        make_listing(1, listing_price=250000),
+        make_listing(2),
+        make_listing(2, listing_price=1),  # repeated key, last one wins
+        make_listing(3, address=None),
+    ]
+    counts = upsert_listings(db_session, listings)
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 0, "skipped": 2, "changes": {"listing_price": 1}}
+
+    db_session.expire_all()
+    prices = {p.address: p.listing_price for p in db_session.query(Property)}
+    assert prices == {"1 Main St": 250000, "2 Main St": 1}
+
+
+def test_upsert_preserves_resolved_image(db_session):
+    upsert_listings(db_session, [make_listing(1)])
+    db_session.query(Property).update({"image_url": "https://img/1.jpg"})
+    db_session.commit()
+
+    upsert_listings(db_session, [make_listing(1, listing_price=1)])
+    db_session.expire_all()
+    assert db_session.query(Property).one().image_url == "https://img/1.jpg"
+
+
+def test_upsert_uses_few_statements(db_session):
+    statements, stop = count_statements(db_session)
+    try:
+        upsert_listings(db_session, [make_listing(i) for i in range(500)], chunk_size=250)
+    finally:
+        stop()
+    # Per chunk: one existence lookup, one upsert, one market stats read and one write;
+    # then one data version bump
+    assert len(statements) == 9
+    assert db_session.query(Property).count() == 500
+
+
+def test_unchanged_listings_are_not_written(db_session):
+    upsert_listings(db_session, [make_listing(i) for i in range(3)])
+
+    statements, stop = count_statements(db_session)
+    try:
+        counts = upsert_listings(db_session, [make_listing(i) for i in range(3)])
+    finally:
+        stop()
+    assert counts["unchanged"] == 3 and counts["updated"] == 0
+    # Only the hash lookup; no upsert, no market stats
+    assert len(statements) == 1
+
+
+def test_changed_listings_record_history(db_session):
+    upsert_listings(db_session, [make_listing(1), make_listing(2)])
+
+    counts = upsert_listings(db_session, [
+        make_listing(1, listing_price=280000, listing_terms="pending"),
+        make_listing(2, sqft=1600),
+    ])
+    assert (counts["updated"], counts["unchanged"]) == (2, 0)
+    assert counts["changes"] == {"listing_price": 1, "listing_terms": 1, "sqft": 1}
+
+    home = db_session.query(Property).filter(Property.address == "1 Main St").one()
+    history = {h.field: (h.old_value, h.new_value)
+               for h in db_session.query(PropertyHistory).filter(PropertyHistory.property_id == home.id)}
+    assert history == {"listing_price": ("300001", "280000"), "listing_terms": ("sold", "pending")}
+    # sqft is compared but not kept in history
+    assert db_session.query(PropertyHistory).count() == 2
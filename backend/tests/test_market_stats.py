@@ -0,0 +1,85 @@
+import random
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from app.ingest import upsert_listings
+from app.market_stats import CountHistogram, QuantileSketch, rebuild_market_stats
+from app.models import MarketStats
+from tests.factories import make_listing
+
+TODAY = date.today()
+
+
+def sold_listing(i, **overrides):
+    listed = TODAY - timedelta(days=60 + i % 30)
+    home = make_listing(i, home_type="Single Family", listing_price=300_000 + 1000 * i,
+                        sold_price=295_000 + 1000 * i, price_per_sqft=200 + i, listing_date=listed.isoformat(),
+                        last_sold_date=(listed + timedelta(days=10 + i % 20)).isoformat())
+    home.update(overrides)
+    return home
+
+
+def test_sketch_quantiles_within_accuracy():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(12.5, 0.4, 20_000)
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    for q in (0.25, 0.5, 0.75, 0.95):
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.01)
+
+    # Removing values is exact: the sketch returns to its previous state
+    for value in values[10_000:]:
+        sketch.add(value, -1)
+    assert sketch.count == 10_000
+    assert sketch.quantile(0.5) == pytest.approx(np.quantile(values[:10_000], 0.5), rel=0.01)
+
+    days = CountHistogram()
+    for value in [3, 5, 5, 9]:
+        days.add(value)
+    assert days.quantile(0.5) == 5 and QuantileSketch.from_json(days.to_json()).buckets == days.buckets
+
+
+def test_ingest_updates_match_rebuild(db_session):
+    listings = [sold_listing(i) for i in range(40)]
+    listings += [make_listing(100 + i, listing_terms="for_sale", home_type="Condo", listing_price=250_000,
+                              listing_date=(TODAY - timedelta(days=5)).isoformat()) for i in range(10)]
+    random.Random(0).shuffle(listings)
+    upsert_listings(db_session, listings, chunk_size=7)
+
+    # Price changes and a listing moving home type flow through as deltas
+    upsert_listings(db_session, [sold_listing(i, sold_price=400_000) for i in range(10)]
+                    + [sold_listing(11, home_type="Condo")])
+
+    def snapshot():
+        return {(row.zipcode, row.home_type, row.listing_terms): (row.count, row.sketches)
+                for row in db_session.query(MarketStats) if row.count}
+
+    incremental = snapshot()
+    rebuild_market_stats(db_session)
+    assert snapshot() == incremental
+
+
+def test_market_stats_endpoint(async_client, db_session):
+    upsert_listings(db_session, [sold_listing(i) for i in range(21)] + [
+        make_listing(100 + i, listing_terms="for_sale", home_type="Condo", listing_price=250_000 + 1000 * i,
+                     listing_date=(TODAY - timedelta(days=5)).isoformat()) for i in range(5)
+    ])
+    body = async_client.get("/market-stats", params={"zipcode": "97478"}).json()
+    groups = {(group["home_type"], group["listing_terms"]): group for group in body["groups"]}
+
+    sold = groups[("Single Family", "sold")]
+    assert sold["count"] == 21
+    assert sold["median_price"] == pytest.approx(305_000, rel=0.005)
+    assert sold["median_price_per_sqft"] == pytest.approx(210, rel=0.005)
+    # 10..29 days, with i=20 wrapping back to 10
+    assert sold["median_days_on_market"] == 19
+    assert sold["median_sold_to_list_ratio"] == pytest.approx(305_000 / 310_000, rel=0.005)
+
+    active = groups[("Condo", "for_sale")]
+    assert active["count"] == 5 and active["median_days_on_market"] == 5
+    assert groups[("all", "sold")]["count"] == 21
+
+    only = async_client.get("/market-stats", params={"zipcode": "97478", "listing_terms": "for_sale"}).json()
+    assert [group["listing_terms"] for group in only["groups"]] == ["for_sale", "for_sale"]
+    assert async_client.get("/market-stats", params={"zipcode": "97404"}).json()["groups"] == []
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+from app import metrics, scraper
+from app.ingest import sync_listings
+from app.metrics import Counter, Histogram
+from app.models import Property
+from tests.factories import make_listing
+from tests.factories import FIXTURE
+
+
+def test_histogram_and_counter_render_prometheus_text():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 3):
+        histogram.observe(value, route='/a"b')
+    counter = Counter("events_total", "Events", ("kind",))
+    counter.inc(kind="x")
+    counter.inc(2, kind="x")
+
+    lines = histogram.render() + counter.render()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a\\"b",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a\\"b"} 3.55' in lines
+    assert 'latency_seconds_count{route="/a\\"b"} 3' in lines
+    assert 'events_total{kind="x"} 3' in lines
+
+
+def test_requests_record_route_latency_and_queries(async_client, db_session, monkeypatch):
+    monkeypatch.setattr(metrics, "TIMING_HEADER_ENABLED", True)
+    home = Property(**make_listing(1))
+    db_session.add(home)
+    db_session.commit()
+    route = "/property/{property_id}/{strategy}"
+    before = metrics.REQUEST_QUERIES.count(route=route)
+
+    response = async_client.get(f"/property/{home.id}/buy-rent")
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    # The listing's zip code and data version for its ETag, then the listing
+    assert timing.startswith("db;dur=") and 'desc="3 queries"' in timing and "total;dur=" in timing
+
+    assert metrics.REQUEST_QUERIES.count(route=route) == before + 1
+    assert metrics.DB_QUERY_DURATION.count(route=route, operation="SELECT") >= 1
+
+    body = async_client.get("/metrics")
+    assert body.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert f'http_request_duration_seconds_count{{method="GET",route="{route}",status="200"}}' in body.text
+
+
+def test_sync_records_scrape_and_outcome(db_session, monkeypatch):
+    frame = pd.read_csv(FIXTURE, dtype={"zip_code": str})
+    monkeypatch.setattr(scraper, "scrape_property", lambda location, listing_type, past_days: frame.copy())
+    ok = metrics.SYNC_OUTCOMES.value(listing_type="for_sale", outcome="ok")
+    rows = metrics.SCRAPE_ROWS.value(zipcode="97478", listing_type="for_sale")
+
+    counts = sync_listings("97478", "for_sale", db_session)
+    assert metrics.SYNC_OUTCOMES.value(listing_type="for_sale", outcome="ok") == ok + 1
+    assert metrics.SCRAPE_ROWS.value(zipcode="97478", listing_type="for_sale") == rows + len(frame)
+    assert metrics.SYNC_ROWS.value(listing_type="for_sale", result="inserted") >= counts["inserted"]
+
+    def broken(location, listing_type, past_days):
+        raise RuntimeError("blocked")
+
+    monkeypatch.setattr(scraper, "scrape_property", broken)
+    failures = metrics.SCRAPE_FAILURES.value(zipcode="97478", listing_type="for_sale")
+    errors = metrics.SYNC_OUTCOMES.value(listing_type="for_sale", outcome="error")
+    with pytest.raises(RuntimeError):
+        sync_listings("97478", "for_sale", db_session, raise_errors=True)
+    assert metrics.SCRAPE_FAILURES.value(zipcode="97478", listing_type="for_sale") == failures + 1
+    assert metrics.SYNC_OUTCOMES.value(listing_type="for_sale", outcome="error") == errors + 1
@@ -0,0 +1,97 @@
+import pytest
+from app.ingest import upsert_listings
+from app.models import Property
+from app.query_plans import explain, is_sequential_scan
+from app.queries import decode_cursor, paginate, properties_query
+from app.sync_state import mark_synced
+from tests.factories import make_listing
+
+
+@pytest.fixture
+def listings(db_session):
+    # Repeated prices so the id tie-breaker matters
+    upsert_listings(db_session, [
+        make_listing(i, listing_terms="for_sale", listing_price=100000 + (i % 7) * 1000,
+                     price_per_sqft=100.0 + i, listing_date=f"2025-04-{i % 28 + 1:02d}")
+        for i in range(60)
+    ])
+    mark_synced(db_session, "97478", "sold")
+    return db_session
+
+
+def walk(client, params):
+    pages, cursor = [], None
+    while True:
+        page = client.get("/properties", params=dict(params, **({"cursor": cursor} if cursor else {}))).json()
+        pages.append(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("sort", ["price", "price_per_sqft", "listing_date", "id"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_cover_every_row_in_stable_order(async_client, listings, sort, order):
+    params = {"zipcode": "97478", "sort": sort, "order": order, "limit": 7}
+    pages = walk(async_client, params)
+    rows = [row for page in pages for row in page]
+
+    everything = async_client.get("/properties", params={"zipcode": "97478", "sort": sort, "order": order}).json()
+    assert [row["id"] for row in rows] == [row["id"] for row in everything]
+    assert len(rows) == 60 and len(pages) == 9
+
+    column = {"price": "listing_price"}.get(sort, sort)
+    keys = [(row[column], row["id"]) for row in rows]
+    assert keys == sorted(keys, reverse=order == "desc")
+
+
+@pytest.mark.parametrize("sort", ["price", "price_per_sqft", "listing_date"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_include_rows_without_a_sort_value(async_client, db_session, sort, order):
+    upsert_listings(db_session, [
+        make_listing(i, listing_terms="for_sale", listing_price=None if i % 3 == 0 else 100000 + i,
+                     price_per_sqft=None if i % 3 == 0 else 100.0 + i,
+                     listing_date=None if i % 3 == 0 else f"2025-04-{i % 28 + 1:02d}")
+        for i in range(20)
+    ])
+    mark_synced(db_session, "97478", "sold")
+
+    pages = walk(async_client, {"zipcode": "97478", "sort": sort, "order": order, "limit": 3})
+    rows = [row for page in pages for row in page]
+    assert len(rows) == len({row["id"] for row in rows}) == 20
+
+    # Rows without a value come last, in either direction
+    field = {"price": "listing_price"}.get(sort, sort)
+    values = [row[field] for row in rows]
+    assert values[-7:] == [None] * 7 and None not in values[:-7]
+
+    everything = async_client.get("/properties", params={"zipcode": "97478", "sort": sort, "order": order}).json()
+    assert [row["id"] for row in rows] == [row["id"] for row in everything]
+
+
+def test_fields_projection(async_client, listings):
+    response = async_client.get("/properties", params={"zipcode": "97478", "fields": "address,listing_price",
+                                                       "sort": "price", "limit": 3})
+    items = response.json()["items"]
+    assert [list(item) for item in items] == [["address", "listing_price"]] * 3
+
+    rows = async_client.get("/properties", params={"zipcode": "97478", "fields": "id"}).json()
+    assert len(rows) == 60 and list(rows[0]) == ["id"]
+    assert async_client.get("/properties", params={"zipcode": "97478", "fields": "nope"}).status_code == 422
+
+
+def test_cursor_validation(async_client, listings):
+    page = async_client.get("/properties", params={"zipcode": "97478", "sort": "price", "limit": 5}).json()
+    assert decode_cursor(page["next_cursor"])[0] == "price"
+
+    mismatch = {"zipcode": "97478", "sort": "id", "cursor": page["next_cursor"]}
+    assert async_client.get("/properties", params=mismatch).status_code == 422
+    garbage = {"zipcode": "97478", "cursor": "not-a-cursor"}
+    assert async_client.get("/properties", params=garbage).status_code == 422
+
+
+def test_deep_page_uses_index(db_session):
+    stmt = paginate(properties_query("97478"), "price_per_sqft", False, 50, after=(250.0, 1234))
+    plan = explain(db_session, stmt)
+    assert not is_sequential_scan(plan), plan
+    assert not any("TEMP B-TREE" in line for line in plan), plan
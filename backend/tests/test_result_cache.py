@@ -0,0 +1,88 @@
+from app.result_cache import AnalysisCache, LocalResults, RedisResults, ANALYSIS_CACHE, analysis_cache, canonical_key
+from app.routes.calculations import compound_growth
+from app.routes.properties import DealInputs
+from tests.factories import valid_payload
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+
+
+def test_repeated_inputs_hit_the_cache(async_client):
+    analysis_cache.local.clear()
+    before = {result: ANALYSIS_CACHE.value(strategy="fix-flip", result=result) for result in ("hit", "miss")}
+    # Same deal sent with ints instead of floats and in another order
+    reordered = {key: int(value) if isinstance(value, float) and value.is_integer() else value
+                 for key, value in reversed(list(valid_payload.items()))}
+    first = async_client.post("/analyze-fix-flip", json=valid_payload)
+    second = async_client.post("/analyze-fix-flip", json=reordered)
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert ANALYSIS_CACHE.value(strategy="fix-flip", result="miss") == before["miss"] + 1
+    assert ANALYSIS_CACHE.value(strategy="fix-flip", result="hit") == before["hit"] + 1
+
+    # Strategies never share entries
+    inputs = DealInputs(**valid_payload)
+    assert canonical_key("fix-flip", inputs) != canonical_key("buy-rent", inputs)
+    assert canonical_key("fix-flip", inputs) != canonical_key("fix-flip", DealInputs(**{**valid_payload, "rehab": 1}))
+
+
+def test_cached_results_are_copies():
+    cache = AnalysisCache(LocalResults(), enabled=True)
+    inputs = DealInputs(**valid_payload)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"noi": 1.0}
+
+    cache.get_or_compute("test", inputs, compute)["noi"] = 99
+    assert cache.get_or_compute("test", inputs, compute) == {"noi": 1.0}
+    assert len(calls) == 1
+
+
+def test_local_results_evict_by_size():
+    local = LocalResults(max_bytes=200)
+    for i in range(10):
+        local.put(f"k{i}", {"i": i}, 40)
+    assert local.size <= 200 and local.get("k0") is None and local.get("k9") == {"i": 9}
+    local.put("huge", {}, 500)
+    assert local.get("huge") is None
+
+
+def test_shared_backend_serves_other_workers():
+    shared = FakeRedis()
+    inputs = DealInputs(**valid_payload)
+    first = AnalysisCache(LocalResults(), RedisResults(shared), enabled=True)
+    second = AnalysisCache(LocalResults(), RedisResults(shared), enabled=True)
+    before = ANALYSIS_CACHE.value(strategy="test", result="shared_hit")
+
+    assert first.get_or_compute("test", inputs, lambda: {"noi": 2.5}) == {"noi": 2.5}
+    assert second.get_or_compute("test", inputs, lambda: {"noi": -1}) == {"noi": 2.5}
+    assert ANALYSIS_CACHE.value(strategy="test", result="shared_hit") == before + 1
+
+    # An unreachable backend is only a miss
+    class Down:
+        def get(self, key):
+            raise ConnectionError("refused")
+
+        set = get
+
+    broken = AnalysisCache(LocalResults(), RedisResults(Down()), enabled=True)
+    assert broken.get_or_compute("test", inputs, lambda: {"noi": 3.0}) == {"noi": 3.0}
+
+
+def test_memoized_helper_is_shared(async_client):
+    compound_growth.cache_clear()
+    async_client.post("/analyze-buy-rent-deal", json=valid_payload)
+    async_client.post("/analyze-fix-flip", json={**valid_payload, "interest_only": False, "rehab": 12345})
+    # Both strategies amortize over the same rate and term
+    assert compound_growth.cache_info().misses == 1 and compound_growth.cache_info().hits >= 1
+    assert 'memoized_calls_total{function="compound_growth",result="miss"}' in async_client.get("/metrics").text
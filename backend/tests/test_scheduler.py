@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+import pandas as pd
+import pytest
+from app import scraper
+from app.models import Property
+from app.routes import properties, sync
+from app.scheduler import SyncScheduler, parse_tracked
+from app.sync_state import mark_synced, utcnow, SYNC_TTL_SECONDS
+from tests.factories import FIXTURE
+
+
+@pytest.fixture
+def stub_scrape(monkeypatch):
+    calls = []
+    frame = pd.read_csv(FIXTURE, dtype={"zip_code": str})
+
+    def fake_scrape_property(location, listing_type, past_days):
+        calls.append((location, listing_type))
+        time.sleep(0.01)
+        return frame.copy()
+
+    monkeypatch.setattr(scraper, "scrape_property", fake_scrape_property)
+    return calls
+
+
+@pytest.fixture
+def scheduler(session_factory, monkeypatch):
+    instance = SyncScheduler(session_factory=session_factory, max_workers=1, interval=3600)
+    monkeypatch.setattr(properties, "scheduler", instance)
+    monkeypatch.setattr(sync, "scheduler", instance)
+    yield instance
+    instance.stop()
+
+
+def test_parse_tracked():
+    assert parse_tracked("97404:for_sale, 97478,") == [("97404", "for_sale"), ("97478", "sold")]
+
+
+def test_enqueue_runs_sync_and_records_status(scheduler, stub_scrape, db_session):
+    scheduler.start()
+    assert scheduler.enqueue("97478", "for_sale")
+    scheduler.wait(timeout=5)
+
+    (job,) = scheduler.status()
+    assert job["state"] == "idle"
+    assert job["runs"] == 1
+    assert job["rows_changed"] > 0
+    assert job["last_error"] is None
+    assert job["duration"] >= 0
+    assert db_session.query(Property).count() == job["rows_changed"]
+
+
+def test_failed_sync_records_error(scheduler, monkeypatch, db_session):
+    def broken_scrape_property(**kwargs):
+        raise RuntimeError("realtor.com unavailable")
+
+    monkeypatch.setattr(scraper, "scrape_property", broken_scrape_property)
+    scheduler.start()
+    scheduler.enqueue("97478", "sold")
+    scheduler.wait(timeout=5)
+
+    (job,) = scheduler.status()
+    assert job["last_error"] == "realtor.com unavailable"
+    assert db_session.query(Property).count() == 0
+
+
+def test_stale_properties_request_is_served_and_queued(async_client, scheduler, stub_scrape, db_session):
+    mark_synced(db_session, "97478", "sold", synced_at=utcnow() - timedelta(seconds=SYNC_TTL_SECONDS + 1))
+    scheduler.start()
+
+    response = async_client.get("/properties?zipcode=97478")
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "STALE"
+
+    scheduler.wait(timeout=5)
+    assert stub_scrape == [("97478", "sold")]
+    assert scheduler.status()[0]["runs"] == 1
+
+
+def test_sync_endpoints(async_client, scheduler, stub_scrape):
+    assert async_client.post("/sync/97478").status_code == 503
+
+    scheduler.start()
+    response = async_client.post("/sync/97478?listing_type=for_sale")
+    assert response.status_code == 202
+    assert response.json()["queued"] is True
+    scheduler.wait(timeout=5)
+
+    status = async_client.get("/sync/status").json()
+    assert status["running"] is True
+    assert status["jobs"][0]["zipcode"] == "97478"
+    assert async_client.post("/sync/abcde").status_code == 422
@@ -0,0 +1,110 @@
+import math
+import pandas as pd
+import pytest
+from app import scraper
+from app.scraper import (
+    safe_float, bath_sum, remove_none, acres, land_type, extract_latest_tax,
+    normalize_listings, scrape_realtor_dot_com,
+)
+from tests.factories import FIXTURE
+
+
+def legacy_records(listings, zip_code, listingtype):
+    """The original iterrows() transform, kept here as the reference for parity."""
+    listings = listings.copy()
+    listings[scraper.STRING_COLS] = listings[scraper.STRING_COLS].fillna("")
+    listings[scraper.NUMERIC_COLS] = listings[scraper.NUMERIC_COLS].fillna(0).infer_objects(copy=False)
+    results = []
+    for _, row in listings.iterrows():
+        results.append({
+            "address": remove_none(row.get("street", "Unknown")),
+            "zipcode": row.get("zip_code", zip_code),
+            "state": row.get("state"),
+            "city": row.get("city"),
+            "unit": row.get("unit"),
+            "listing_price": int(safe_float(row.get("list_price"))),
+            "listing_date": row.get("list_date"),
+            "listing_terms": row.get("listingtype", listingtype),
+            "status": row.get("status"),
+            "beds": safe_float(row.get("beds")),
+            "baths": bath_sum(row.get("full_baths"), row.get("half_baths")),
+            "sqft": int(safe_float(row.get("sqft"))),
+            "lot_size": acres(row.get("lot_sqft")),
+            "year_built": int(safe_float(row.get("year_built"))),
+            "home_type": land_type(row.get("style")),
+            "subtype": None,
+            "image_url": "",
+            "property_url": row.get("property_url"),
+            "mls": row.get("mls"),
+            "mls_id": row.get("mls_id"),
+            "sold_price": int(safe_float(row.get("sold_price"))),
+            "last_sold_date": row.get("last_sold_date"),
+            "price_per_sqft": safe_float(row.get("price_per_sqft")),
+            "latitude": safe_float(row.get("latitude")),
+            "longitude": safe_float(row.get("longitude")),
+            "stories": int(safe_float(row.get("stories"))),
+            "has_hoa": True if safe_float(row.get("hoa_fee")) > 0 else False,
+            "hoa_fee": int(safe_float(row.get("hoa_fee"))),
+            "parking_garage": row.get("parking_garage"),
+            "sewer": None,
+            "water": None,
+            "utilities": None,
+            "annual_tax": extract_latest_tax(row.get("tax_history", [])),
+        })
+    return results
+
+
+def assert_same_records(expected, actual):
+    assert len(expected) == len(actual)
+    for old, new in zip(expected, actual):
+        assert list(old) == list(new)
+        for key in old:
+            assert old[key] == new[key] or (
+                isinstance(old[key], float) and math.isnan(old[key]) and math.isnan(new[key])
+            ), key
+
+
+@pytest.fixture
+def fixture_listings():
+    return pd.read_csv(FIXTURE)
+
+
+def test_normalize_matches_legacy_on_fixture(fixture_listings):
+    expected = legacy_records(fixture_listings, "97478", "for_sale")
+    actual = normalize_listings(fixture_listings, "97478", "for_sale").to_dict("records")
+    assert_same_records(expected, actual)
+
+
+def test_normalize_matches_legacy_on_edge_cases(fixture_listings):
+    listings = fixture_listings.head(6).copy()
+    listings["street"] = ["None None None", "12 none Rd", "", None, "  4  Oak  St ", "NONE"]
+    listings["style"] = ["MOBILE", "LAND", "CONDO", None, "APARTMENT", "MULTI_FAMILY"]
+    listings["half_baths"] = [None, 1, 2, None, 0, 1]
+    listings["lot_sqft"] = [None, 0, 43560, 1234.5, 87120, 6098]
+    listings["tax_history"] = [
+        [{"year": 2023, "tax": 2100.7}, {"year": 2024, "tax": 2250}],
+        [{"year": 2024, "tax": None}, {"year": 2022, "tax": 1900}],
+        [],
+        None,
+        [{"year": 2024}],
+        [{"year": 2021, "tax": "1500"}],
+    ]
+    listings = listings.drop(columns=["zip_code"])
+
+    expected = legacy_records(listings, "97478", "sold")
+    actual = normalize_listings(listings, "97478", "sold").to_dict("records")
+    assert_same_records(expected, actual)
+    assert [row["annual_tax"] for row in actual] == [2250, 1900, 0, 0, 0, 1500]
+
+
+def test_acres_column_parses_strings():
+    lots = pd.Series(["43,560 sqft", "", "n/a", "21780"], dtype=object)
+    assert scraper.acres_column(lots).tolist() == [acres(v) for v in lots]
+
+
+def test_scrape_returns_plain_records(monkeypatch, fixture_listings):
+    monkeypatch.setattr(scraper, "scrape_property", lambda **kwargs: fixture_listings.copy())
+    records = scrape_realtor_dot_com("97478", "for_sale", 10)
+    assert len(records) == len(fixture_listings)
+    assert type(records[0]["listing_price"]) is int
+    assert type(records[0]["has_hoa"]) is bool
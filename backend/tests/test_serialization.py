@@ -0,0 +1,76 @@
+import json
+import pytest
+from app import serialization
+from app.ingest import upsert_listings
+from app.models import Property
+from app.queries import PROPERTY_FIELDS
+from app.sync_state import mark_synced
+from tests.factories import make_listing
+
+
+@pytest.fixture
+def listings(db_session):
+    upsert_listings(db_session, [
+        make_listing(i, listing_terms="for_sale", city="Señora", price_per_sqft=200.5 + i,
+                     latitude=44.05 + i / 1000, longitude=-123.02)
+        for i in range(25)
+    ])
+    mark_synced(db_session, "97478", "sold")
+    return db_session
+
+
+def test_fast_path_matches_to_dict(async_client, listings):
+    response = async_client.get("/properties", params={"zipcode": "97478"})
+    expected = [prop.to_dict() for prop in listings.query(Property).order_by(Property.id)]
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["x-cache"] == "HIT"
+    assert sorted(response.json(), key=lambda row: row["id"]) == expected
+
+    # Same rows, same bytes
+    again = async_client.get("/properties", params={"zipcode": "97478"})
+    assert again.content == response.content
+
+
+def test_ndjson_stream(async_client, listings):
+    response = async_client.get("/properties", params={"zipcode": "97478", "sort": "id", "format": "ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.content.decode().splitlines()
+    assert [json.loads(line) for line in lines] == async_client.get(
+        "/properties", params={"zipcode": "97478", "sort": "id"}).json()
+
+    page = async_client.get("/properties", params={"zipcode": "97478", "limit": 10, "format": "ndjson",
+                                                   "fields": "id,address"})
+    assert len(page.content.splitlines()) == 10
+    assert "x-next-cursor" in page.headers
+
+
+def test_encoders_agree(monkeypatch):
+    rows = [(1, "12 Ñandú Ln", 1500.25, None, True, float("nan"))]
+    fields = ["id", "address", "price_per_sqft", "unit", "has_hoa", "lot_size"]
+    encoded = serialization.encode_rows(fields, rows)
+    assert json.loads(encoded) == [
+        {"id": 1, "address": "12 Ñandú Ln", "price_per_sqft": 1500.25, "unit": None, "has_hoa": True,
+         "lot_size": None}
+    ]
+
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert serialization.encode_rows(fields, rows) == encoded
+    assert list(serialization.iter_ndjson([{"a": 1}] * 3, chunk_rows=2)) == [b'{"a":1}\n{"a":1}\n', b'{"a":1}\n']
+
+
+@pytest.mark.skipif(serialization.orjson is None, reason="orjson not installed")
+def test_encoders_agree_on_edge_floats(monkeypatch):
+    # The bytes may differ (1e16 vs 1e+16); the values they decode to may not
+    floats = [1e16, 1e-7, -0.0, 0.1 + 0.2, 1.7976931348623157e308, 5e-324, 123456789.125,
+              float("inf"), float("-inf"), float("nan")]
+    payload = [{"value": value} for value in floats]
+    fast = json.loads(serialization.dumps(payload))
+    monkeypatch.setattr(serialization, "orjson", None)
+    fallback = json.loads(serialization.dumps(payload))
+
+    assert fast == fallback
+    assert [row["value"] for row in fast] == floats[:7] + [None] * 3
+
+
+def test_property_fields_follow_to_dict():
+    assert PROPERTY_FIELDS == list(Property().to_dict())
@@ -0,0 +1,62 @@
+import pytest
+from app.routes.properties import DealInputs, analyze_buy_rent_deal
+from app.routes.simulation import simulate_buy_rent
+from tests.factories import valid_payload
+
+FIXED = {"rent_growth": {"mean": 0}, "appreciation": {"mean": 0}}
+
+
+def test_fixed_inputs_reproduce_deterministic_analysis():
+    inputs = DealInputs(**valid_payload)
+    expected = analyze_buy_rent_deal(inputs)
+    result = simulate_buy_rent(inputs, FIXED, years=3, paths=50)
+
+    for p, values in result["annual_cash_flow"].items():
+        assert values == pytest.approx([expected["annual_cash_flow"]] * 3, abs=0.05)
+    assert result["coc_return"]["50"][0] == pytest.approx(expected["coc_return"], abs=0.01)
+    assert result["prob_negative_cash_flow"] == [1.0, 1.0, 1.0]
+
+
+def test_equity_grows_with_amortization():
+    inputs = DealInputs(**valid_payload)
+    result = simulate_buy_rent(inputs, FIXED, years=30, paths=10)
+    equity = result["equity"]["50"]
+    assert equity == sorted(equity)
+    assert equity[-1] == pytest.approx(valid_payload["purchase_price"], abs=1)
+
+
+def test_seed_is_reproducible_across_chunks():
+    inputs = DealInputs(**valid_payload)
+    draws = {"rent_growth": {"kind": "normal", "mean": 3, "std": 2},
+             "vacancy": {"kind": "uniform", "low": 0, "high": 15},
+             "appreciation": {"kind": "triangular", "low": -5, "mode": 3, "high": 8}}
+    first = simulate_buy_rent(inputs, draws, years=5, paths=2500, seed=42, chunk_size=1000)
+    second = simulate_buy_rent(inputs, draws, years=5, paths=2500, seed=42, chunk_size=1000)
+    other = simulate_buy_rent(inputs, draws, years=5, paths=2500, seed=43, chunk_size=1000)
+    assert first == second
+    assert first["equity"] != other["equity"]
+
+
+def test_simulate_endpoint(async_client):
+    payload = dict(valid_payload, monthly_rent=3500)
+    request = {
+        "base": payload,
+        "years": 8,
+        "paths": 2000,
+        "seed": 1,
+        "rent_growth": {"kind": "normal", "mean": 2, "std": 3},
+        "rate_reset": {"kind": "uniform", "low": 5, "high": 9},
+        "rate_reset_year": 5,
+    }
+    response = async_client.post("/analyze-buy-rent-deal/simulate", json=request)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["years"] == list(range(1, 9))
+    assert set(data["annual_cash_flow"]) == {"5", "25", "50", "75", "95"}
+    # Rate resets only widen the spread after year five
+    spread = [hi - lo for hi, lo in zip(data["annual_cash_flow"]["95"], data["annual_cash_flow"]["5"])]
+    assert spread[5] > spread[4]
+    assert 0 <= data["prob_any_negative_year"] <= 1
+
+    request["rate_reset"] = {"kind": "uniform", "low": 5}
+    assert async_client.post("/analyze-buy-rent-deal/simulate", json=request).status_code == 422
@@ -0,0 +1,117 @@
+import pytest
+from datetime import timedelta
+from app import ingest
+from app.ingest import sync_listings
+from app.main import app
+from app.routes.properties import get_session_factory
+from app.sync_state import (
+    advance_watermark, get_sync_age, get_sync_state, mark_synced, sync_window_days, utcnow,
+    SYNC_BACKFILL_DAYS, SYNC_OVERLAP_SECONDS, SYNC_TTL_SECONDS,
+)
+from tests.factories import make_listing
+
+
+def test_first_request_misses_then_hits(async_client, db_session, scrape_calls):
+    first = async_client.get("/properties?zipcode=97478")
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+
+    second = async_client.get("/properties?zipcode=97478")
+    assert second.headers["X-Cache"] == "HIT"
+    assert int(second.headers["X-Cache-Age"]) >= 0
+    assert scrape_calls == [("97478", "sold")]
+
+
+def test_fresh_key_opens_no_sync_session(async_client, db_session, scrape_calls, session_factory):
+    opened = []
+
+    def counting_factory():
+        opened.append(1)
+        return session_factory()
+
+    app.dependency_overrides[get_session_factory] = lambda: counting_factory
+    async_client.get("/properties?zipcode=97478")
+    assert len(opened) == 1  # the inline scrape of a cold key
+    assert async_client.get("/properties?zipcode=97478").headers["X-Cache"] == "HIT"
+    assert len(opened) == 1
+
+
+def test_stale_key_triggers_scrape(async_client, db_session, scrape_calls):
+    stale = utcnow() - timedelta(seconds=SYNC_TTL_SECONDS + 60)
+    mark_synced(db_session, "97478", "sold", synced_at=stale)
+
+    response = async_client.get("/properties?zipcode=97478")
+    assert response.headers["X-Cache"] == "MISS"
+    assert scrape_calls == [("97478", "sold")]
+    assert get_sync_age(db_session, "97478", "sold") < SYNC_TTL_SECONDS
+
+
+def test_failed_scrape_is_retried(async_client, db_session, monkeypatch):
+    calls = []
+
+    def failing_scrape(zipcode, listingtype, pastdays, raise_errors=False):
+        calls.append(zipcode)
+        raise ConnectionError("upstream reset")
+
+    monkeypatch.setattr(ingest, "scrape_realtor_dot_com", failing_scrape)
+    first = async_client.get("/properties?zipcode=97478")
+    assert first.status_code == 200 and first.headers["X-Cache"] == "MISS"
+    assert get_sync_age(db_session, "97478", "sold") is None
+
+    # Not recorded as fresh, so the next request scrapes again
+    second = async_client.get("/properties?zipcode=97478")
+    assert second.headers["X-Cache"] == "MISS"
+    assert calls == ["97478", "97478"]
+
+
+def test_keys_are_independent(db_session):
+    mark_synced(db_session, "97478", "sold")
+    assert get_sync_age(db_session, "97478", "sold") is not None
+    assert get_sync_age(db_session, "97478", "for_sale") is None
+    assert get_sync_age(db_session, "97404", "sold") is None
+
+
+def test_sync_window_follows_watermark(db_session, monkeypatch):
+    windows = []
+    outcome = {"fail": False}
+
+    def fake_scrape(zipcode, listingtype, pastdays, raise_errors=False):
+        windows.append(pastdays)
+        if outcome["fail"]:
+            raise ConnectionError("upstream reset")
+        return [make_listing(len(windows), listing_terms=listingtype)]
+
+    monkeypatch.setattr(ingest, "scrape_realtor_dot_com", fake_scrape)
+
+    # A cold key backfills, then only the time since the last success (plus overlap) is asked for
+    sync_listings("97478", "sold", db_session)
+    watermark = get_sync_state(db_session, "97478", "sold").watermark
+    assert watermark is not None
+    sync_listings("97478", "sold", db_session)
+    assert windows == [SYNC_BACKFILL_DAYS, 1]
+
+    # A failed scrape keeps the watermark, so the gap is covered by the next sync
+    state = get_sync_state(db_session, "97478", "sold")
+    state.watermark = utcnow() - timedelta(days=3)
+    db_session.commit()
+    outcome["fail"] = True
+    assert sync_listings("97478", "sold", db_session) == ingest.empty_counts()
+    assert get_sync_state(db_session, "97478", "sold").watermark < utcnow() - timedelta(days=2)
+    outcome["fail"] = False
+    sync_listings("97478", "sold", db_session)
+    assert windows[-2:] == [4, 4]
+    assert get_sync_state(db_session, "97478", "sold").watermark > utcnow() - timedelta(minutes=1)
+
+
+def test_sync_window_bounds(db_session):
+    now = utcnow()
+    assert sync_window_days(db_session, "97404", "sold", now) == SYNC_BACKFILL_DAYS
+
+    advance_watermark(db_session, "97404", "sold", now - timedelta(days=2))
+    expected = -(-(2 * 86400 + SYNC_OVERLAP_SECONDS) // 86400)
+    assert sync_window_days(db_session, "97404", "sold", now) == expected
+
+    # The watermark never moves back, and the window never exceeds the backfill
+    advance_watermark(db_session, "97404", "sold", now - timedelta(days=5))
+    assert sync_window_days(db_session, "97404", "sold", now) == expected
+    assert sync_window_days(db_session, "97404", "sold", now + timedelta(days=1000)) == SYNC_BACKFILL_DAYS
@@ -2,6 +2,8 @@
 
 # Start FastAPI backend on port 8000 in the background
 cd backend
+# Schema and backfills once, before the workers start
+python -m app.migrations || exit 1
 uvicorn app.main:app --host 0.0.0.0 --port 8000 &
 BACKEND_PID=$!
 cd ..